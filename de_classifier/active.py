@@ -0,0 +1,161 @@
+"""
+Active-learning order for labeler3.py's prompt queue.
+
+Entries used to come up in API order, so a lot of annotator time went on
+entries the model already gets right. ActiveQueue keeps a pool of up to
+POOL_SIZE fetched, unlabeled entries and puts the one the online model
+(see online.py) is least sure of in front of the annotator next:
+
+- "uncertainty" picks the entry whose top two label probabilities are
+  closest (the smallest margin);
+- "diverse" weights that by how unlike the entry is to the last RECENT
+  entries picked, so a run of near-identical uncertain entries doesn't
+  take all the annotator's attention.
+
+Each entry is vectorized once, when it joins the pool; the online model's
+features are stateless, so the rows stay valid as the model learns.
+Rescoring the pool as labels come in is one batch predict_proba() over
+those rows, done only when the model has learned something since the last
+scoring. Entries that arrive with a known label need no annotator, so
+they go out first. Before the model has learned anything, entries go out
+in the order they came.
+"""
+
+import logging
+from collections import deque
+
+import numpy as np
+import scipy.sparse
+
+POOL_SIZE = 500
+RECENT = 50
+STRATEGIES = ("uncertainty", "diverse")
+
+log = logging.getLogger(__name__)
+
+
+def margin_uncertainty(proba):
+    """1 minus the gap between each row's top two probabilities."""
+    if proba.shape[1] < 2:
+        return np.zeros(len(proba))
+    top2 = np.partition(proba, -2, axis=1)[:, -2:]
+    return 1.0 - (top2[:, 1] - top2[:, 0])
+
+
+class ActiveQueue:
+    """
+    Iterate over (entry, known_label) pairs from `items` (e.g. a
+    Prefetcher), most informative first. `ready()` says how many items can
+    be taken from `items` without waiting; by default, just one at a time.
+    """
+
+    def __init__(
+        self,
+        items,
+        model,
+        strategy="uncertainty",
+        pool_size=POOL_SIZE,
+        ready=None,
+        describe=lambda entry: entry["description"],
+        recent=RECENT,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                f"Unknown strategy {strategy!r}; expected {STRATEGIES}"
+            )
+        self.items = iter(items)
+        self.model = model
+        self.strategy = strategy
+        self.pool_size = pool_size
+        self.ready = ready or (lambda: 0)
+        self.describe = describe
+        self.known = deque()
+        self.pool = []
+        self.X = None
+        self.scores = np.empty(0)
+        self.recent = deque(maxlen=recent)
+        self._exhausted = False
+        self._scored_with = None
+        self.rescores = 0
+
+    def _take(self, n):
+        """Take up to `n` items, the first of which may wait."""
+        taken = []
+        for _ in range(n):
+            try:
+                item = next(self.items)
+            except StopIteration:
+                self._exhausted = True
+                break
+            if item[1] is not None:
+                self.known.append(item)
+            else:
+                taken.append(item)
+        return taken
+
+    def _fill(self):
+        room = self.pool_size - len(self.pool)
+        if self._exhausted or room <= 0:
+            return
+        n = min(room, self.ready())
+        if not self.pool and not self.known:
+            # Nothing to hand out, so wait for at least one.
+            n = max(n, 1)
+        taken = self._take(n)
+        if not taken:
+            return
+        X = self.model.transform([self.describe(entry) for entry, _ in taken])
+        self.pool.extend(taken)
+        self.X = X if self.X is None else scipy.sparse.vstack([self.X, X])
+        self.X = self.X.tocsr()
+        if self._scored_with == self.model.n_learned:
+            new_scores = self._score(X)
+        else:
+            # The whole pool is about to be rescored anyway.
+            new_scores = np.zeros(X.shape[0])
+        self.scores = np.concatenate([self.scores, new_scores])
+
+    def _score(self, X):
+        if not self.model.fitted:
+            # Equal scores, so the oldest entry goes first.
+            return np.zeros(X.shape[0])
+        return margin_uncertainty(self.model.predict_proba_features(X))
+
+    def _rescore(self):
+        """Score the whole pool again, if the model has learned since."""
+        if self._scored_with == self.model.n_learned or not self.pool:
+            return
+        self._scored_with = self.model.n_learned
+        self.scores = self._score(self.X)
+        self.rescores += 1
+
+    def _pick(self):
+        self._rescore()
+        priority = self.scores
+        if self.strategy == "diverse" and self.recent:
+            R = scipy.sparse.vstack(self.recent).tocsr()
+            # Rows are L2-normalized, so this is cosine similarity.
+            similarity = (self.X @ R.T).max(axis=1).toarray().ravel()
+            priority = (self.scores + 1e-3) * (1.0 - similarity)
+        i = int(np.argmax(priority))
+        log.debug(
+            f"Picked pool entry {i} of {len(self.pool)} "
+            f"(score {self.scores[i]:.3f})."
+        )
+        item = self.pool.pop(i)
+        self.recent.append(self.X[i])
+        keep = np.ones(self.X.shape[0], dtype=bool)
+        keep[i] = False
+        self.X = self.X[keep]
+        self.scores = self.scores[keep]
+        return item
+
+    def __iter__(self):
+        while True:
+            self._fill()
+            if self.known:
+                yield self.known.popleft()
+            elif self.pool:
+                yield self._pick()
+            elif self._exhausted:
+                return
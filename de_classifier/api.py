@@ -0,0 +1,212 @@
+"""
+A shared client for the CourtListener REST API.
+
+APIClient keeps one pooled requests.Session, so long crawls reuse their
+TLS connections, and makes every request:
+
+- wait on a token bucket that holds it to the API quota (RATE_PER_HOUR,
+  with bursts of up to BURST requests), so crawls run at the allowed rate
+  rather than into 429s;
+- retry connection errors, timeouts, 429s and 5xx responses up to
+  MAX_RETRIES times, after the response's Retry-After if it has one (for
+  every thread using the client), or else a jittered exponential backoff;
+- raise requests.HTTPError for any other error status.
+
+An APIClient is a get(url, params) callable returning parsed JSON, so it
+plugs straight into crawler.fetch_entries(). Given a httpcache.ResponseCache,
+it serves JSON from that when it can, and revalidates with conditional
+requests. default_client() is the process-wide one, authenticated with
+$CL_API_TOKEN if it's set, and caching under $DE_CLASSIFIER_HTTP_CACHE
+(default: http_cache; set it empty to turn the cache off).
+"""
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from os import environ
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from de_classifier.httpcache import HTTP_CACHE_DIR, ResponseCache
+
+# CourtListener allows 5,000 API requests an hour per user.
+RATE_PER_HOUR = 5000
+BURST = 10
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+POOL_SIZE = 16
+TIMEOUT = 30
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Allows `rate` acquisitions a second on average, and up to `capacity` in
+    a burst. Thread-safe.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self):
+        """Take a token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+    def pause(self, seconds=0):
+        """
+        Give up all tokens, and `seconds` worth more, e.g. after the server
+        says to slow down. Every waiting thread is held back.
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+def retry_after(response):
+    """Seconds to wait from a response's Retry-After header, or None."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class APIClient:
+    def __init__(
+        self,
+        token=None,
+        rate_per_hour=RATE_PER_HOUR,
+        burst=BURST,
+        max_retries=MAX_RETRIES,
+        backoff_base=BACKOFF_BASE,
+        backoff_max=BACKOFF_MAX,
+        pool_size=POOL_SIZE,
+        timeout=TIMEOUT,
+        cache=None,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if token:
+            self.session.headers["Authorization"] = f"Token {token}"
+        self.bucket = TokenBucket(
+            rate_per_hour / 3600, burst, clock=clock, sleep=sleep
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.cache = cache
+        self.sleep = sleep
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for the given retry attempt."""
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2**attempt)
+        )
+
+    def get(self, url, params=None, **kwargs):
+        """GET `url`, retrying as needed. Returns the Response."""
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.get(
+                    url, params=params, timeout=self.timeout, **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                log.warning(
+                    f"GET {url} failed ({e}); retrying in {delay:.1f}s."
+                )
+                self.sleep(delay)
+                continue
+            if (
+                response.status_code not in RETRY_STATUSES
+                or attempt == self.max_retries
+            ):
+                response.raise_for_status()
+                return response
+            delay = retry_after(response)
+            log.warning(
+                f"GET {url} returned {response.status_code}; retrying "
+                + (f"after {delay:.1f}s." if delay is not None else "soon.")
+            )
+            if delay is not None:
+                # Holds back every thread sharing this client.
+                self.bucket.pause(delay)
+            else:
+                if response.status_code == 429:
+                    self.bucket.pause()
+                self.sleep(self.backoff(attempt))
+
+    def get_json(self, url, params=None):
+        if self.cache is None:
+            return self.get(url, params).json()
+        return self.cache.fetch(
+            lambda url, params, headers: self.get(
+                url, params, headers=headers
+            ),
+            url,
+            params,
+        )
+
+    __call__ = get_json
+
+    def close(self):
+        self.session.close()
+
+
+_default = None
+
+
+def default_client():
+    """The process-wide APIClient."""
+    global _default
+    if _default is None:
+        cache_dir = environ.get("DE_CLASSIFIER_HTTP_CACHE", HTTP_CACHE_DIR)
+        _default = APIClient(
+            environ.get("CL_API_TOKEN"),
+            cache=ResponseCache(cache_dir) if cache_dir else None,
+        )
+    return _default
@@ -0,0 +1,236 @@
+"""
+Label huge files of docket entries with a saved model (see model.py).
+
+Input is streamed in chunks, and each chunk is preprocessed, vectorized
+and scored in a pool of worker processes that each memory-map the model
+once. Results are written as CSV (id, label, probability) in input order,
+with only a few chunks in memory at a time. Progress is checkpointed
+after every chunk, so a crashed run picks up where it left off when rerun
+with --resume.
+
+    python -m de_classifier.batch_predict INPUT OUTPUT [--model model]
+        [--format {csv,jsonl,output3}] [--column description]
+        [--id-column id] [--workers N] [--chunk-size N] [--resume]
+
+Inputs may be gzip- or bzip2-compressed.
+
+With --lookup LABELED_CSV, descriptions whose exact text or template was
+already labeled (see lookup.py) get that label, with probability 1, and
+skip the model; the hit rate is reported with the progress.
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from de_classifier.dataset import LAYOUTS, OUTPUT3_COLUMNS, open_text
+from de_classifier.lookup import CachedPredictor, LabelLookup
+from de_classifier.model import MODEL_DIR, load_model
+
+CHUNK_SIZE = 10_000
+OUTPUT_HEADER_ROW = ("id", "label", "probability")
+FORMATS = ("csv", "jsonl", "output3")
+
+
+def iter_rows(fn, fmt="csv", column="description", id_column="id"):
+    """Yield (id, description) pairs from an input file."""
+    with open_text(fn) as f:
+        if fmt == "jsonl":
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    yield item.get(id_column), item.get(column) or ""
+        elif fmt == "output3":
+            de_id = OUTPUT3_COLUMNS.index("de_id")
+            description = OUTPUT3_COLUMNS.index("description")
+            for row in csv.reader(f):
+                yield row[de_id], row[description]
+        else:
+            for row in csv.DictReader(f):
+                yield row.get(id_column), row[column] or ""
+
+
+def iter_chunks(rows, chunk_size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def predict_chunk(predictor, chunk):
+    """
+    Label a chunk of (id, description) pairs with a CachedPredictor.
+    Returns (id, label, probability) rows, and how many of them came from
+    its lookup.
+    """
+    ids, descriptions = zip(*chunk)
+    labels, probabilities, hits = predictor.predict_best(list(descriptions))
+    rows = [
+        (id_, label, round(p, 4))
+        for id_, label, p in zip(ids, labels, probabilities)
+    ]
+    return rows, hits
+
+
+_worker_predictor = None
+
+
+def _init_worker(model, lookup):
+    global _worker_predictor
+    _worker_predictor = CachedPredictor(model, lookup)
+
+
+def _predict_chunk(chunk):
+    return predict_chunk(_worker_predictor, chunk)
+
+
+class Checkpoint:
+    """
+    How many input rows have been written to the output, and how long the
+    output was at that point, so a resumed run can truncate any partial
+    write and skip the rows already done.
+    """
+
+    def __init__(self, output_fn):
+        self.path = Path(f"{output_fn}.checkpoint")
+        self.rows = 0
+        self.output_bytes = 0
+
+    def load(self):
+        if self.path.exists():
+            with open(self.path) as f:
+                state = json.load(f)
+            self.rows = state["rows"]
+            self.output_bytes = state["output_bytes"]
+
+    def save(self, rows, output_bytes):
+        self.rows, self.output_bytes = rows, output_bytes
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"rows": rows, "output_bytes": output_bytes}, f)
+        os.replace(tmp, self.path)
+
+    def remove(self):
+        self.path.unlink(missing_ok=True)
+
+
+def batch_predict(
+    input_fn,
+    output_fn,
+    model_path=MODEL_DIR,
+    fmt="csv",
+    column="description",
+    id_column="id",
+    workers=None,
+    chunk_size=CHUNK_SIZE,
+    resume=False,
+    lookup=None,
+):
+    """
+    Label every row of `input_fn` into `output_fn`, answering from the
+    LabelLookup `lookup` where possible. Returns the number of rows.
+    """
+    workers = workers or os.cpu_count() or 1
+    checkpoint = Checkpoint(output_fn)
+    if resume:
+        checkpoint.load()
+    rows = iter_rows(input_fn, fmt, column, id_column)
+    # Skip what an earlier run already wrote.
+    rows = islice(rows, checkpoint.rows, None)
+    chunks = iter_chunks(rows, chunk_size)
+
+    if resume and checkpoint.rows:
+        # Drop anything written after the last checkpoint.
+        os.truncate(output_fn, checkpoint.output_bytes)
+        print(f"Resuming after {checkpoint.rows} rows.")
+        output_f = open(output_fn, "a", newline="")
+        writer = csv.writer(output_f)
+    else:
+        output_f = open(output_fn, "w", newline="")
+        writer = csv.writer(output_f)
+        writer.writerow(OUTPUT_HEADER_ROW)
+
+    done = resumed_at = checkpoint.rows
+    hits = 0
+    start = time.perf_counter()
+
+    def write(results):
+        nonlocal done, hits
+        results, chunk_hits = results
+        hits += chunk_hits
+        writer.writerows(results)
+        output_f.flush()
+        os.fsync(output_f.fileno())
+        done += len(results)
+        checkpoint.save(done, os.fstat(output_f.fileno()).st_size)
+        rate = (done - resumed_at) / (time.perf_counter() - start)
+        progress = f"{done} rows; {rate:.0f} rows/s"
+        if lookup is not None:
+            progress += f"; lookup hit rate {hits / (done - resumed_at):.1%}"
+        print(progress)
+
+    model = load_model(model_path)
+    with output_f:
+        if workers <= 1:
+            predictor = CachedPredictor(model, lookup)
+            for chunk in chunks:
+                write(predict_chunk(predictor, chunk))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(model, lookup),
+            ) as executor:
+                # Keep a bounded number of chunks in flight, and write them
+                # out in submission (i.e. input) order.
+                in_flight = deque()
+                for chunk in chunks:
+                    in_flight.append(executor.submit(_predict_chunk, chunk))
+                    if len(in_flight) >= workers * 2:
+                        write(in_flight.popleft().result())
+                while in_flight:
+                    write(in_flight.popleft().result())
+    checkpoint.remove()
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="de_classifier.batch_predict")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--model", default=MODEL_DIR)
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--column", default="description")
+    parser.add_argument("--id-column", default="id")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--lookup", help="labeled CSV to look labels up in")
+    parser.add_argument("--lookup-layout", choices=LAYOUTS, default="output3")
+    args = parser.parse_args()
+
+    lookup = None
+    if args.lookup:
+        print("Building label lookup...")
+        lookup = LabelLookup.from_csv(
+            args.lookup, **LAYOUTS[args.lookup_layout]
+        )
+
+    total = batch_predict(
+        args.input,
+        args.output,
+        model_path=args.model,
+        fmt=args.format,
+        column=args.column,
+        id_column=args.id_column,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        resume=args.resume,
+        lookup=lookup,
+    )
+    print(f"Done: labeled {total} rows.")
@@ -0,0 +1,104 @@
+"""
+Compare feature modes (see features.py) on labeled data: accuracy, fit and
+transform time, peak memory while fitting, and pickled model size.
+
+    python -m de_classifier.bench_features [--input output3.csv]
+        [--layout output3] [--seed 0]
+"""
+
+import argparse
+import pickle
+import time
+import tracemalloc
+
+from sklearn.metrics import accuracy_score
+from sklearn.naive_bayes import MultinomialNB
+
+from de_classifier.dataset import (
+    LABELS3_FN,
+    LAYOUTS,
+    LabeledDataset,
+    load_labels,
+)
+from de_classifier.features import make_vectorizer
+from de_classifier.preprocessing import preprocess_descriptions
+
+CONFIGS = (("tfidf", True), ("hashing", True), ("hashing", False))
+
+
+def pickled_size(obj):
+    return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def bench(dataset, train, test, mode, idf):
+    x_train, x_test = dataset.texts(train), dataset.texts(test)
+
+    tracemalloc.start()
+    make_vectorizer(mode, idf=idf).fit_transform(x_train)
+    _, fit_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    vectorizer = make_vectorizer(mode, idf=idf)
+    start = time.perf_counter()
+    X_train = vectorizer.fit_transform(x_train)
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    X_test = vectorizer.transform(x_test)
+    transform_s = time.perf_counter() - start
+
+    classifier = MultinomialNB().fit(X_train, dataset.y(train))
+    accuracy = accuracy_score(dataset.y(test), classifier.predict(X_test))
+    if hasattr(vectorizer, "stop_words_"):
+        del vectorizer.stop_words_  # as model.py does before saving
+    return {
+        "mode": mode,
+        "idf": idf,
+        "accuracy": accuracy,
+        "fit_s": fit_s,
+        "transform_s": transform_s,
+        "fit_peak_mb": fit_peak / 2**20,
+        "vectorizer_mb": pickled_size(vectorizer) / 2**20,
+        "classifier_mb": pickled_size(classifier) / 2**20,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="de_classifier.bench_features")
+    parser.add_argument("--input", default="output3.csv")
+    parser.add_argument("--layout", choices=LAYOUTS, default="output3")
+    parser.add_argument("--labels", default=LABELS3_FN)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("Loading data...")
+    dataset = LabeledDataset.from_csv(
+        args.input, load_labels(args.labels), **LAYOUTS[args.layout]
+    )
+    print("Preprocessing...")
+    dataset.pp = preprocess_descriptions(dataset.descriptions, workers=None)
+    train, test = dataset.split(seed=args.seed)
+    print(f"Training set: {len(train)}\nTesting set: {len(test)}\n")
+
+    columns = (
+        "mode",
+        "idf",
+        "accuracy",
+        "fit_s",
+        "transform_s",
+        "fit_peak_mb",
+        "vectorizer_mb",
+        "classifier_mb",
+    )
+    print("".join(f"{column:>14}" for column in columns))
+    for mode, idf in CONFIGS:
+        result = bench(dataset, train, test, mode, idf)
+        print(
+            "".join(
+                (
+                    f"{result[column]:>14.4f}"
+                    if isinstance(result[column], float)
+                    else f"{str(result[column]):>14}"
+                )
+                for column in columns
+            )
+        )
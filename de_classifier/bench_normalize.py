@@ -0,0 +1,90 @@
+"""
+Compare preprocessing with and without normalization (see normalize.py):
+TF-IDF vocabulary size, accuracy, and preprocessing, fit and predict time.
+
+    python -m de_classifier.bench_normalize [--input output3.csv]
+        [--layout output3] [--seed 0]
+"""
+
+import argparse
+import time
+
+from sklearn.metrics import accuracy_score
+from sklearn.naive_bayes import MultinomialNB
+
+from de_classifier.dataset import (
+    LABELS3_FN,
+    LAYOUTS,
+    LabeledDataset,
+    load_labels,
+)
+from de_classifier.features import make_vectorizer
+from de_classifier.preprocessing import Preprocessor
+
+
+def bench(dataset, train, test, normalize):
+    preprocessor = Preprocessor(normalize=normalize)
+    preprocessor.preprocess_description("")  # load NLTK outside the timing
+    start = time.perf_counter()
+    dataset.pp = preprocessor.preprocess_descriptions(
+        dataset.descriptions, workers=None
+    )
+    preprocess_s = time.perf_counter() - start
+    x_train, x_test = dataset.texts(train), dataset.texts(test)
+
+    vectorizer = make_vectorizer("tfidf")
+    start = time.perf_counter()
+    X_train = vectorizer.fit_transform(x_train)
+    classifier = MultinomialNB().fit(X_train, dataset.y(train))
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = classifier.predict(vectorizer.transform(x_test))
+    predict_s = time.perf_counter() - start
+
+    return {
+        "normalize": normalize,
+        "vocabulary": len(vectorizer.vocabulary_),
+        "accuracy": accuracy_score(dataset.y(test), y_pred),
+        "preprocess_s": preprocess_s,
+        "fit_s": fit_s,
+        "predict_s": predict_s,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="de_classifier.bench_normalize")
+    parser.add_argument("--input", default="output3.csv")
+    parser.add_argument("--layout", choices=LAYOUTS, default="output3")
+    parser.add_argument("--labels", default=LABELS3_FN)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("Loading data...")
+    dataset = LabeledDataset.from_csv(
+        args.input, load_labels(args.labels), **LAYOUTS[args.layout]
+    )
+    train, test = dataset.split(seed=args.seed)
+    print(f"Training set: {len(train)}\nTesting set: {len(test)}\n")
+
+    columns = (
+        "normalize",
+        "vocabulary",
+        "accuracy",
+        "preprocess_s",
+        "fit_s",
+        "predict_s",
+    )
+    print("".join(f"{column:>14}" for column in columns))
+    for normalize in (False, True):
+        result = bench(dataset, train, test, normalize)
+        print(
+            "".join(
+                (
+                    f"{result[column]:>14.4f}"
+                    if isinstance(result[column], float)
+                    else f"{str(result[column]):>14}"
+                )
+                for column in columns
+            )
+        )
@@ -0,0 +1,265 @@
+"""
+End-to-end benchmarks of the classify3.py pipeline.
+
+Times and memory-profiles each stage (load_dataset, preprocess,
+split_dataset, vectorizer fit and transform, classifier fit and predict)
+on a labeled file and on synthetic corpora scaled up from it, and writes
+the results as JSON:
+
+    python -m de_classifier.bench_pipeline run [--input labeled.csv]
+        [--layout labeled] [--scales 1,10,100,1000] [--out bench.json]
+        [--data-dir bench_data] [--tracemalloc]
+
+Synthetic corpora repeat the source rows with fresh docket entry IDs and
+the digits in each description scrambled, so they grow the vocabulary
+(dates, case numbers, ...) roughly the way more real data would. They're
+written gzipped to --data-dir once and reused.
+
+Each corpus is run in a fresh process, so peak RSS is per corpus. Stages
+report wall time, RSS and peak RSS after the stage, the rows they handled
+and, with --tracemalloc (much slower), the peak traced allocation during
+the stage. Preprocessing workers are separate processes and aren't
+counted.
+
+To spot regressions between versions, compare two result files:
+
+    python -m de_classifier.bench_pipeline compare OLD.json NEW.json
+        [--threshold 1.2]
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import sklearn
+from sklearn.naive_bayes import MultinomialNB
+
+from de_classifier import classify3
+from de_classifier.dataset import LABELS3_FN, LAYOUTS, iter_records, open_text
+from de_classifier.features import make_vectorizer
+from de_classifier.instrument import Recorder
+from de_classifier.preprocessing import (
+    NORMALIZE,
+    PREPROCESSING_VERSION,
+    Preprocessor,
+)
+
+SCALES = (1, 10, 100, 1000)
+DATA_DIR = "bench_data"
+OUTPUT_FN = "bench.json"
+# Digit substitutions to draw from when scrambling synthetic descriptions.
+N_DIGIT_TABLES = 1000
+REGRESSION_THRESHOLD = 1.2
+
+
+def _digit_tables(rng):
+    tables = []
+    for _ in range(N_DIGIT_TABLES):
+        digits = list("0123456789")
+        rng.shuffle(digits)
+        tables.append(str.maketrans("0123456789", "".join(digits)))
+    return tables
+
+
+def synthesize(src_fn, out_fn, scale, layout="labeled", seed=0):
+    """
+    Write `scale` copies of the rows of `src_fn` to `out_fn`, in the same
+    layout, renumbered and with scrambled digits in all but the first copy.
+    Returns the number of rows written.
+    """
+    rng = random.Random(seed)
+    tables = _digit_tables(rng)
+    records = [
+        record
+        for chunk in iter_records(src_fn, **LAYOUTS[layout])
+        for record in chunk
+    ]
+    columns = LAYOUTS[layout]["columns"]
+    de_id = 0
+    tmp = Path(f"{out_fn}.tmp{Path(out_fn).suffix}")
+    with open_text(tmp, "w") as f:
+        writer = csv.writer(f)
+        if LAYOUTS[layout]["header"]:
+            writer.writerow(columns)
+        for copy in range(scale):
+            for record in records:
+                de_id += 1
+                description = record.description
+                if copy:
+                    description = description.translate(
+                        tables[rng.randrange(N_DIGIT_TABLES)]
+                    )
+                record = record._replace(de_id=de_id, description=description)
+                writer.writerow(
+                    [getattr(record, column) or "" for column in columns]
+                )
+    tmp.replace(out_fn)
+    return de_id
+
+
+def corpus_path(data_dir, src_fn, scale):
+    return Path(data_dir) / f"{Path(src_fn).stem}.x{scale}.csv.gz"
+
+
+def run_pipeline(fn, layout="labeled", labels_fn=LABELS3_FN, trace=False):
+    """Run the classify3.py pipeline on `fn`, returning per-stage results."""
+    recorder = Recorder(Path(fn).name, trace=trace)
+    with recorder.stage("load_dataset") as stage:
+        dataset = classify3.load_dataset(fn, labels_fn, layout=layout)
+        stage["rows"] = len(dataset)
+    with recorder.stage("preprocess") as stage:
+        preprocessor = Preprocessor(normalize=NORMALIZE)
+        classify3.preprocess(dataset, preprocessor=preprocessor)
+        stage["rows"] = len(dataset.descriptions)
+    with recorder.stage("split_dataset") as stage:
+        train, test = classify3.split_dataset(dataset, seed=0)
+        stage["rows"] = len(dataset)
+    x_train, x_test = dataset.texts(train), dataset.texts(test)
+    with recorder.stage("vectorizer_fit") as stage:
+        vectorizer = make_vectorizer(classify3.FEATURE_MODE)
+        X_train = vectorizer.fit_transform(x_train)
+        stage["rows"] = len(x_train)
+        stage["features"] = X_train.shape[1]
+    with recorder.stage("vectorizer_transform") as stage:
+        X_test = vectorizer.transform(x_test)
+        stage["rows"] = len(x_test)
+    with recorder.stage("classifier_fit") as stage:
+        classifier = MultinomialNB().fit(X_train, dataset.y(train))
+        stage["rows"] = len(x_train)
+    with recorder.stage("predict") as stage:
+        y_pred = classifier.predict(X_test)
+        stage["rows"] = len(x_test)
+    recorder.close()
+    accuracy = float((y_pred == dataset.y(test)).mean())
+    return {
+        "rows": len(dataset),
+        "accuracy": accuracy,
+        "stages": recorder.stages,
+    }
+
+
+def environment():
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "sklearn": sklearn.__version__,
+        "preprocessing_version": PREPROCESSING_VERSION,
+        "feature_mode": classify3.FEATURE_MODE,
+        "normalize": NORMALIZE,
+    }
+
+
+def run(args):
+    scales = [int(scale) for scale in args.scales.split(",")]
+    report = {"environment": environment(), "corpora": []}
+    # A fresh process per corpus, so peak RSS isn't carried over.
+    context = multiprocessing.get_context("spawn")
+    for scale in scales:
+        fn = args.input
+        if scale != 1:
+            fn = corpus_path(args.data_dir, args.input, scale)
+            if not fn.exists():
+                print(f"Writing {scale}x corpus to {fn}...")
+                fn.parent.mkdir(parents=True, exist_ok=True)
+                synthesize(args.input, fn, scale, args.layout, args.seed)
+        print(f"Running pipeline on {fn}...")
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            result = executor.submit(
+                run_pipeline, str(fn), args.layout, args.labels, args.trace
+            ).result()
+        result.update({"corpus": str(fn), "scale": scale})
+        report["corpora"].append(result)
+        for stage in result["stages"]:
+            print(
+                f"{stage['stage']:>22}{stage['seconds']:>10.3f}s"
+                f"{stage['peak_rss_mb']:>10.0f} MB peak RSS"
+            )
+        # Write as we go; the big corpora take a while.
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}.")
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare two run reports stage by stage. Returns (scale, stage, metric,
+    old, new) for every time or peak RSS that grew by more than
+    `threshold` times.
+    """
+    old_stages = {
+        (corpus["scale"], stage["stage"]): stage
+        for corpus in old["corpora"]
+        for stage in corpus["stages"]
+    }
+    regressions = []
+    for corpus in new["corpora"]:
+        for stage in corpus["stages"]:
+            before = old_stages.get((corpus["scale"], stage["stage"]))
+            if before is None:
+                continue
+            for metric in ("seconds", "peak_rss_mb"):
+                if stage[metric] > before[metric] * threshold:
+                    regressions.append(
+                        (
+                            corpus["scale"],
+                            stage["stage"],
+                            metric,
+                            before[metric],
+                            stage[metric],
+                        )
+                    )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="de_classifier.bench_pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--input", default="labeled.csv")
+    run_parser.add_argument("--layout", choices=LAYOUTS, default="labeled")
+    run_parser.add_argument("--labels", default=LABELS3_FN)
+    run_parser.add_argument(
+        "--scales", default=",".join(str(scale) for scale in SCALES)
+    )
+    run_parser.add_argument("--data-dir", default=DATA_DIR)
+    run_parser.add_argument("--out", default=OUTPUT_FN)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--tracemalloc", dest="trace", action="store_true")
+    compare_parser = commands.add_parser("compare", help="find regressions")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=REGRESSION_THRESHOLD
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        run(args)
+    else:
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        regressions = compare(old, new, args.threshold)
+        for scale, stage, metric, before, after in regressions:
+            print(
+                f"{scale}x {stage}: {metric} {before:.3f} -> {after:.3f} "
+                f"({after / before:.2f}x)"
+            )
+        if regressions:
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Import docket entries from CourtListener bulk data.
+
+Paging through the API at its rate limit would take weeks to gather a
+corpus of millions of entries. CourtListener's bulk data has the same
+tables as (compressed) CSV exports, and import_dump() streams those row
+by row into the output3.csv layout the classifiers and batch_predict.py
+read, with empty labels:
+
+- docket entries (search_docketentry: id, docket_id, description, ...);
+- optionally, RECAP documents (search_recapdocument: id, docket_entry_id,
+  description, ...), for entries without a description of their own,
+  which get a row per document, as crawler.entries_from_results() does;
+- optionally, dockets (search_docket: id, court_id, ...) and courts
+  (search_court: id, jurisdiction, ...), to keep only entries in courts
+  of the given jurisdictions, like labeler3.py's CL_DOCKET_ENDPOINT.
+
+Descriptions are never held in memory: entries are written as they're
+read, in chunks. What's kept are sorted arrays of IDs, 8 bytes apiece:
+the dockets in the wanted courts, and the entries that need their
+documents' descriptions, which a second pass over the documents fills in.
+
+    python -m de_classifier.bulk ENTRIES OUTPUT [--documents DOCUMENTS]
+        [--dockets DOCKETS --courts COURTS] [--jurisdiction FD]
+
+Inputs may be gzip- or bzip2-compressed, and so may the output.
+"""
+
+import argparse
+import csv
+import os
+import sys
+from array import array
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+from de_classifier.crawler import entries_from_results
+from de_classifier.dataset import CHUNK_SIZE, OUTPUT3_COLUMNS, open_text
+
+# Federal district courts, as in labeler3.py's CL_DOCKET_ENDPOINT.
+JURISDICTIONS = ("FD",)
+# Field names for the output3 layout, from entry dicts.
+ENTRY_FIELDS = {
+    "description": "description",
+    "label": "label",
+    "docket_id": "docket_id",
+    "de_id": "docket_entry_id",
+    "doc_id": "doc_id",
+}
+
+
+class BulkDialect(csv.excel):
+    """
+    The bulk data CSV format: PostgreSQL's COPY ... (FORMAT csv, ESCAPE
+    '\\', HEADER), which escapes quotes with backslashes.
+    """
+
+    escapechar = "\\"
+    doublequote = False
+
+
+def _raise_field_size_limit():
+    # Some descriptions run past csv's default 128 KiB field limit.
+    limit = sys.maxsize
+    while True:
+        try:
+            csv.field_size_limit(limit)
+            return
+        except OverflowError:
+            limit //= 10
+
+
+def iter_table(fn):
+    """Yield each row of a bulk data CSV file as a dict."""
+    _raise_field_size_limit()
+    with open_text(fn) as f:
+        yield from csv.DictReader(f, dialect=BulkDialect)
+
+
+def _id_array(ids):
+    """A sorted, unique int64 array of the IDs in an iterable."""
+    collected = array("q", ids)
+    return np.unique(np.frombuffer(collected, dtype=np.int64))
+
+
+def _contains(sorted_ids, ids):
+    """Whether each of `ids` is in the sorted array `sorted_ids`."""
+    if len(sorted_ids) == 0:
+        return np.zeros(len(ids), dtype=bool)
+    positions = np.searchsorted(sorted_ids, ids)
+    positions[positions == len(sorted_ids)] = 0
+    return sorted_ids[positions] == ids
+
+
+def court_ids(courts_fn, jurisdictions=JURISDICTIONS):
+    """IDs of the courts in `jurisdictions`."""
+    return {
+        row["id"]
+        for row in iter_table(courts_fn)
+        if row["jurisdiction"] in jurisdictions
+    }
+
+
+def docket_ids(dockets_fn, courts):
+    """Sorted array of the IDs of dockets in `courts`."""
+    return _id_array(
+        int(row["id"])
+        for row in iter_table(dockets_fn)
+        if row["court_id"] in courts
+    )
+
+
+def _chunks(rows, chunk_size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def _row(entry):
+    return [entry[ENTRY_FIELDS[column]] for column in OUTPUT3_COLUMNS]
+
+
+def import_dump(
+    entries_fn,
+    out_fn,
+    documents_fn=None,
+    dockets_fn=None,
+    courts_fn=None,
+    jurisdictions=JURISDICTIONS,
+    chunk_size=CHUNK_SIZE,
+):
+    """
+    Write the entries of a bulk data dump to `out_fn` in the output3.csv
+    layout, atomically. Entries are filtered to `jurisdictions` if
+    `dockets_fn` and `courts_fn` are given. Returns counts of what was
+    read, skipped and written.
+    """
+    stats = {
+        "entries": 0,
+        "out_of_jurisdiction": 0,
+        "without_description": 0,
+        "documents": 0,
+        "rows": 0,
+    }
+    wanted = None
+    if dockets_fn is not None and courts_fn is not None:
+        wanted = docket_ids(dockets_fn, court_ids(courts_fn, jurisdictions))
+
+    path = Path(out_fn)
+    # Keeps the suffix, so open_text() compresses the same way.
+    tmp = path.with_name(".tmp." + path.name)
+    pending_ids = array("q")
+    pending_dockets = array("q")
+    with open_text(tmp, "w") as f:
+        writer = csv.writer(f)
+        for chunk in _chunks(iter_table(entries_fn), chunk_size):
+            stats["entries"] += len(chunk)
+            docket_col = np.fromiter(
+                (int(row["docket_id"]) for row in chunk),
+                dtype=np.int64,
+                count=len(chunk),
+            )
+            keep = (
+                _contains(wanted, docket_col)
+                if wanted is not None
+                else np.ones(len(chunk), dtype=bool)
+            )
+            stats["out_of_jurisdiction"] += int((~keep).sum())
+            rows = []
+            for row, docket_id in zip(
+                (row for row, k in zip(chunk, keep) if k), docket_col[keep]
+            ):
+                result = {
+                    "id": int(row["id"]),
+                    "description": row["description"],
+                }
+                if result["description"] == "":
+                    # Its documents' descriptions come in the second pass.
+                    pending_ids.append(result["id"])
+                    pending_dockets.append(int(docket_id))
+                    continue
+                rows.extend(
+                    _row(entry)
+                    for entry in entries_from_results([result], int(docket_id))
+                )
+            writer.writerows(rows)
+            stats["rows"] += len(rows)
+        stats["without_description"] = len(pending_ids)
+
+        if documents_fn is not None and len(pending_ids):
+            ids = np.frombuffer(pending_ids, dtype=np.int64)
+            order = np.argsort(ids, kind="stable")
+            ids = ids[order]
+            dockets = np.frombuffer(pending_dockets, dtype=np.int64)[order]
+            for chunk in _chunks(iter_table(documents_fn), chunk_size):
+                de_col = np.fromiter(
+                    (int(row["docket_entry_id"]) for row in chunk),
+                    dtype=np.int64,
+                    count=len(chunk),
+                )
+                found = _contains(ids, de_col)
+                rows = []
+                for row, de_id in zip(
+                    (row for row, k in zip(chunk, found) if k), de_col[found]
+                ):
+                    docket_id = int(dockets[np.searchsorted(ids, de_id)])
+                    result = {
+                        "id": int(de_id),
+                        "description": "",
+                        "recap_documents": [
+                            {
+                                "id": int(row["id"]),
+                                "description": row["description"],
+                            }
+                        ],
+                    }
+                    rows.extend(
+                        _row(entry)
+                        for entry in entries_from_results([result], docket_id)
+                    )
+                writer.writerows(rows)
+                stats["documents"] += len(rows)
+                stats["rows"] += len(rows)
+    os.replace(tmp, path)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="de_classifier.bulk")
+    parser.add_argument("entries", help="docket entries CSV")
+    parser.add_argument("output", help="output3-layout CSV to write")
+    parser.add_argument("--documents", help="RECAP documents CSV")
+    parser.add_argument("--dockets", help="dockets CSV")
+    parser.add_argument("--courts", help="courts CSV")
+    parser.add_argument(
+        "--jurisdiction",
+        action="append",
+        help=f"court jurisdiction to keep (default: {JURISDICTIONS[0]})",
+    )
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    if (args.dockets is None) != (args.courts is None):
+        parser.error("--dockets and --courts go together")
+
+    stats = import_dump(
+        args.entries,
+        args.output,
+        documents_fn=args.documents,
+        dockets_fn=args.dockets,
+        courts_fn=args.courts,
+        jurisdictions=tuple(args.jurisdiction or JURISDICTIONS),
+        chunk_size=args.chunk_size,
+    )
+    print(
+        f"Read {stats['entries']} entries; skipped "
+        f"{stats['out_of_jurisdiction']} out of jurisdiction; "
+        f"{stats['without_description']} had no description, and "
+        f"{stats['documents']} rows came from their documents. "
+        f"Wrote {stats['rows']} rows to {args.output}."
+    )
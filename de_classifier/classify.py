@@ -4,65 +4,49 @@ Uses labeled.csv, which is labeled data created with labeler.py.
 Does some preprocessing that may or may not be a good idea.
 """
 
-import csv
 import random
 
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics import confusion_matrix, classification_report
 import numpy as np
 
+from de_classifier import instrument
+from de_classifier.dataset import LABELED_COLUMNS, iter_records
+from de_classifier.preprocessing import preprocess_descriptions
+
 
 INPUT_FN = "labeled.csv"
 TOP_N = 10
 
 
-def load_dataset():
+@instrument.timed(rows=len)
+def load_dataset(fn=INPUT_FN):
     dataset = {}
-    with open(INPUT_FN, "r") as f:
-        reader = csv.reader(f)
-        rows = [row for row in reader]
-    row_n = 0
-    for row in rows:
-        row_n += 1
-        if row_n == 1:  # skip header row
-            continue
-        else:
-            de_id, doc_id, description, label = row
-            dataset[de_id] = {
-                "doc_id": doc_id,
-                "description": description,
-                "label": label,
+    for chunk in iter_records(fn, LABELED_COLUMNS, header=True, dedupe=False):
+        for record in chunk:
+            dataset[record.de_id] = {
+                "doc_id": record.doc_id,
+                "description": record.description,
+                "label": record.label,
             }
     return dataset
 
 
-def preprocess_description(description):
-    lowered = description.lower()
-    tokens = lowered.split()
-
-    stops = stopwords.words("english")
-    unstopped = [word for word in tokens if word not in stops]
-
-    lemmatizer = WordNetLemmatizer()
-    lemmas = [lemmatizer.lemmatize(word) for word in unstopped]
-
-    return " ".join(lemmas)
-
-
+@instrument.timed(rows=len)
 def preprocess(dataset):
     """
     Do some text preprocessing
     """
-    for de_id in dataset:
-        dataset[de_id]["pp"] = preprocess_description(
-            dataset[de_id]["description"]
-        )
+    pps = preprocess_descriptions(
+        [dataset[de_id]["description"] for de_id in dataset]
+    )
+    for de_id, pp in zip(dataset, pps):
+        dataset[de_id]["pp"] = pp
     return dataset
 
 
+@instrument.timed(rows=lambda split: sum(map(len, split)))
 def split_dataset(dataset, train_size=0.70, wanted="pp", label="label"):
     """
     Split the dataset into training and testing sets
@@ -90,6 +74,7 @@ def split_dataset(dataset, train_size=0.70, wanted="pp", label="label"):
 
 
 if __name__ == "__main__":
+    instrument.start_run("classify")
     print("Loading data...")
     dataset = load_dataset()
     print()
@@ -118,15 +103,19 @@ if __name__ == "__main__":
         strip_accents="unicode",
         norm="l2",
     )
-    X_train = vectorizer.fit_transform(x_train)
-    X_test = vectorizer.transform(x_test)
+    with instrument.stage("vectorizer_fit", rows=len(x_train)):
+        X_train = vectorizer.fit_transform(x_train)
+    with instrument.stage("vectorizer_transform", rows=len(x_test)):
+        X_test = vectorizer.transform(x_test)
     print()
 
     # Naive Bayes classifier
     # https://learning-oreilly-com.rpa.sccl.org/library/view/natural-language-processing/9781787285101/ch06s03.html
     print("Running Naive Bayes classifier...")
-    nb_classifier = MultinomialNB().fit(X_train, y_train)
-    y_pred = nb_classifier.predict(X_test)
+    with instrument.stage("classifier_fit", rows=len(y_train)):
+        nb_classifier = MultinomialNB().fit(X_train, y_train)
+    with instrument.stage("predict", rows=len(y_test)):
+        y_pred = nb_classifier.predict(X_test)
     # cm = confusion_matrix(y_test, y_pred)
     # print("Confusion Matrix:")
     # print(cm)
@@ -141,3 +130,5 @@ if __name__ == "__main__":
     feature_names = vectorizer.get_feature_names_out()
     print(f"Number of features: {len(feature_names)}")
     print(feature_names[:10])
+
+    instrument.finish_run()
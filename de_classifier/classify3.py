@@ -4,128 +4,119 @@ Uses output3.csv, which is labeled data created with labeler3.py.
 Does some preprocessing that may or may not be a good idea.
 """
 
-import csv
-import random
+import os
 
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 from sklearn.naive_bayes import MultinomialNB
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics import confusion_matrix, classification_report
-import numpy as np
+
+from de_classifier.dataset import (
+    LABELS3_FN,
+    LAYOUTS,
+    LabeledDataset,
+    load_labels,
+)
+from de_classifier import instrument
+from de_classifier.features import make_vectorizer
+from de_classifier.ppcache import PreprocessCache
+from de_classifier.preprocessing import (
+    NORMALIZE,
+    Preprocessor,
+    get_preprocessor,
+)
 
 
 INPUT_FN = "output3.csv"
 TOP_N = 10
+# "tfidf" or "hashing"; see features.py.
+FEATURE_MODE = "tfidf"
+# Processes to preprocess with; None means one per CPU.
+PREPROCESS_WORKERS = os.cpu_count()
 
 
-def load_dataset():
-    dataset = {}
-    with open(INPUT_FN, "r") as f:
-        reader = csv.reader(f)
-        rows = [row for row in reader]
-    for row in rows:
-        description, label, docket_id, de_id, doc_id = row
-        if de_id not in dataset:  # ignore duplicate rows
-            dataset[de_id] = {
-                "description": description,
-                "label": label,
-            }
-    return dataset
-
-
-def preprocess_description(description):
-    lowered = description.lower()
-    tokens = lowered.split()
-
-    stops = stopwords.words("english")
-    unstopped = [word for word in tokens if word not in stops]
-
-    lemmatizer = WordNetLemmatizer()
-    lemmas = [lemmatizer.lemmatize(word) for word in unstopped]
-
-    return " ".join(lemmas)
+@instrument.timed(rows=len)
+def load_dataset(fn=INPUT_FN, labels_fn=LABELS3_FN, layout="output3"):
+    """
+    Load labeled data as a columnar LabeledDataset, skipping duplicate rows
+    """
+    return LabeledDataset.from_csv(
+        fn, load_labels(labels_fn), **LAYOUTS[layout]
+    )
 
 
-def preprocess(dataset):
+@instrument.timed(rows=lambda dataset: len(dataset.descriptions))
+def preprocess(
+    dataset, workers=PREPROCESS_WORKERS, cache=None, preprocessor=None
+):
     """
     Do some text preprocessing
     """
-    for de_id in dataset:
-        dataset[de_id]["pp"] = preprocess_description(
-            dataset[de_id]["description"]
-        )
+    preprocessor = preprocessor or get_preprocessor()
+    # Each distinct description is only stored, and preprocessed, once.
+    dataset.pp = preprocessor.preprocess_descriptions(
+        dataset.descriptions, workers=workers, cache=cache
+    )
     return dataset
 
 
-def split_dataset(dataset, train_size=0.70, wanted="pp", label="label"):
+@instrument.timed(rows=lambda split: sum(map(len, split)))
+def split_dataset(dataset, train_size=0.70, seed=None):
     """
-    Split the dataset into training and testing sets
+    Split the dataset into training and testing sets of row indices
     """
-    training_set, testing_set = [], []
-
-    # randomize keys
-    keys = list(dataset.keys())
-    random.shuffle(keys)
-
-    cutoff = round(len(keys) * train_size)
-    n = 0
-    for key in keys:
-        if n < cutoff:
-            # add to training set
-            training_set.append((dataset[key][wanted], dataset[key][label]))
-        else:
-            # add to testing set
-            testing_set.append((dataset[key][wanted], dataset[key][label]))
-        n += 1
-    print(
-        f"Training set: {len(training_set)}\nTesting set: {len(testing_set)}"
-    )
-    return training_set, testing_set
+    train, test = dataset.split(train_size, seed=seed)
+    print(f"Training set: {len(train)}\nTesting set: {len(test)}")
+    return train, test
 
 
 if __name__ == "__main__":
+    instrument.start_run("classify3")
     print("Loading data...")
     dataset = load_dataset()
     print()
 
     print("Preprocessing...")
-    dataset = preprocess(dataset)
-    for de_id in list(dataset.keys())[:20]:
-        print(dataset[de_id]["pp"])
+    pp_cache = PreprocessCache()
+    preprocessor = Preprocessor(normalize=NORMALIZE)
+    dataset = preprocess(dataset, cache=pp_cache, preprocessor=preprocessor)
+    print(f"Preprocessing cache: {pp_cache.stats()}")
+    pp_cache.close()
+    for pp in dataset.texts(slice(20)):
+        print(pp)
     print()
 
     print("Sampling...")
     train, test = split_dataset(dataset)
-    for item in train[:10]:
-        print(item)
+    for pp, label in zip(
+        dataset.texts(train[:10]), dataset.label_names(dataset.y(train[:10]))
+    ):
+        print((pp, label))
     print()
 
     print("Vectorizing...")
-    x_train = np.array([item[0] for item in train])  # features
-    y_train = np.array([item[1] for item in train])  # label
-    x_test = np.array([item[0] for item in test])  # features
-    y_test = np.array([item[1] for item in test])  # label
-    vectorizer = TfidfVectorizer(
-        min_df=2,
-        ngram_range=(1, 2),
-        stop_words="english",
-        strip_accents="unicode",
-        norm="l2",
-    )
-    X_train = vectorizer.fit_transform(x_train)
-    X_test = vectorizer.transform(x_test)
+    x_train = dataset.texts(train)  # features
+    y_train = dataset.y(train)  # label codes
+    x_test = dataset.texts(test)  # features
+    y_test = dataset.y(test)  # label codes
+    vectorizer = make_vectorizer(FEATURE_MODE)
+    with instrument.stage("vectorizer_fit", rows=len(x_train)):
+        X_train = vectorizer.fit_transform(x_train)
+    with instrument.stage("vectorizer_transform", rows=len(x_test)):
+        X_test = vectorizer.transform(x_test)
     print()
 
     # Naive Bayes classifier
     # https://learning-oreilly-com.rpa.sccl.org/library/view/natural-language-processing/9781787285101/ch06s03.html
     print("Running Naive Bayes classifier...")
-    nb_classifier = MultinomialNB().fit(X_train, y_train)
-    y_pred = nb_classifier.predict(X_test)
+    with instrument.stage("classifier_fit", rows=len(y_train)):
+        nb_classifier = MultinomialNB().fit(X_train, y_train)
+    with instrument.stage("predict", rows=len(y_test)):
+        y_pred = nb_classifier.predict(X_test)
     # cm = confusion_matrix(y_test, y_pred)
     # print("Confusion Matrix:")
     # print(cm)
-    cr = classification_report(y_test, y_pred)
+    cr = classification_report(
+        dataset.label_names(y_test), dataset.label_names(y_pred)
+    )
     print("Classification Report:")
     print(cr)
     print()
@@ -133,6 +124,11 @@ if __name__ == "__main__":
     # Try to find out about features
     clf = nb_classifier
     # feature_names = vectorizer.get_feature_names()
-    feature_names = vectorizer.get_feature_names_out()
-    print(f"Number of features: {len(feature_names)}")
-    print(feature_names[:10])
+    if FEATURE_MODE == "tfidf":
+        feature_names = vectorizer.get_feature_names_out()
+        print(f"Number of features: {len(feature_names)}")
+        print(feature_names[:10])
+    else:
+        print(f"Number of hashed features: {X_train.shape[1]}")
+
+    instrument.finish_run()
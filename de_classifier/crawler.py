@@ -0,0 +1,113 @@
+"""
+Concurrent fetching of docket entries from the CourtListener API.
+
+Getting the entries of a page of dockets one docket at a time costs one
+round trip after another. fetch_entries() gets them for many dockets at
+once on an asyncio event loop, with at most `concurrency` requests in
+flight, following each docket's `next` links until all its pages are in.
+Requests are made by a blocking `get(url, params)` callable, run in worker
+threads: by default the shared api.APIClient, but anything that can GET
+JSON will do. Results come back in the order the dockets were asked for,
+however the requests interleave.
+
+Requests use the API's field selection to ask for DE_FIELDS only, which
+is all entries_from_results() reads, rather than whole RECAP documents.
+entries_from_results() turns API results into the labelers' entry dicts,
+falling back to the descriptions of an entry's RECAP documents when the
+entry itself has none.
+"""
+
+import asyncio
+import logging
+
+from de_classifier.api import default_client
+
+CL_DE_ENDPOINT = "https://www.courtlistener.com/api/rest/v4/docket-entries/"
+CONCURRENCY = 8
+# https://www.courtlistener.com/help/api/rest/v4/#field-selection
+DE_FIELDS = ",".join(
+    (
+        "id",
+        "description",
+        "recap_documents__id",
+        "recap_documents__description",
+    )
+)
+
+log = logging.getLogger(__name__)
+
+
+def entries_from_results(results, docket_id):
+    """Entry dicts for a list of docket entry results."""
+    entries = []
+    for result in results:
+        de_id = result["id"]
+        description = result["description"]
+        if description != "":
+            documents = [(None, description)]
+        else:
+            documents = [
+                (doc["id"], doc["description"])
+                for doc in result.get("recap_documents", ())
+            ]
+        for doc_id, description in documents:
+            entries.append(
+                {
+                    "docket_entry_id": de_id,
+                    "docket_id": docket_id,
+                    "doc_id": doc_id,
+                    "description": description,
+                    "label": None,
+                }
+            )
+    return entries
+
+
+async def _get(get, semaphore, url, params=None):
+    async with semaphore:
+        return await asyncio.to_thread(get, url, params)
+
+
+async def crawl_docket(get, semaphore, docket_id, endpoint=CL_DE_ENDPOINT):
+    """All of a docket's entry results, following `next` links in order."""
+    page = await _get(
+        get, semaphore, endpoint, {"docket": docket_id, "fields": DE_FIELDS}
+    )
+    results = list(page["results"])
+    while page.get("next"):
+        # `next` already carries the query string.
+        page = await _get(get, semaphore, page["next"])
+        results.extend(page["results"])
+    log.debug(f"Got {len(results)} entries for docket {docket_id}.")
+    return results
+
+
+async def crawl_dockets(
+    get, docket_ids, concurrency=CONCURRENCY, endpoint=CL_DE_ENDPOINT
+):
+    """[(docket_id, results)] for each docket, in `docket_ids` order."""
+    semaphore = asyncio.Semaphore(concurrency)
+    pages = await asyncio.gather(
+        *(
+            crawl_docket(get, semaphore, docket_id, endpoint)
+            for docket_id in docket_ids
+        )
+    )
+    return list(zip(docket_ids, pages))
+
+
+def fetch_entries(
+    docket_ids, get=None, concurrency=CONCURRENCY, endpoint=CL_DE_ENDPOINT
+):
+    """
+    [(docket_id, entries)] for each docket, in `docket_ids` order, fetched
+    concurrently. `get` defaults to api.default_client().
+    """
+    get = get or default_client()
+    crawled = asyncio.run(
+        crawl_dockets(get, docket_ids, concurrency, endpoint)
+    )
+    return [
+        (docket_id, entries_from_results(results, docket_id))
+        for docket_id, results in crawled
+    ]
@@ -0,0 +1,193 @@
+"""
+Streaming loaders for labeled docket entry data.
+
+Both labelers write CSV files, in different layouts:
+- labeled.csv (labeler.py) has a header row and LABELED_COLUMNS.
+- output3.csv (labeler3.py) has no header and OUTPUT3_COLUMNS.
+
+iter_records() reads either one in fixed-size chunks of Records, skipping
+repeated docket entry IDs, so callers never hold the raw rows in memory.
+
+LabeledDataset is the columnar form the classifiers train on: parallel
+arrays of IDs, description codes and small integer label codes, with each
+distinct description stored (and preprocessed) once.
+"""
+
+import bz2
+import csv
+import gzip
+import json
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+CHUNK_SIZE = 10_000
+LABELS3_FN = "labels3.json"
+LABELED_COLUMNS = ("de_id", "doc_id", "description", "label")
+OUTPUT3_COLUMNS = ("description", "label", "docket_id", "de_id", "doc_id")
+# iter_records() arguments for each file layout, by name.
+LAYOUTS = {
+    "output3": {"columns": OUTPUT3_COLUMNS, "header": False},
+    "labeled": {"columns": LABELED_COLUMNS, "header": True},
+}
+
+Record = namedtuple(
+    "Record", ("de_id", "description", "label", "docket_id", "doc_id")
+)
+
+
+def open_text(fn, mode="r"):
+    """open() for text files that may be gzip- or bzip2-compressed."""
+    fn = str(fn)
+    if fn.endswith(".gz"):
+        return gzip.open(fn, mode + "t", newline="", encoding="utf-8")
+    if fn.endswith(".bz2"):
+        return bz2.open(fn, mode + "t", newline="", encoding="utf-8")
+    return open(fn, mode, newline="")
+
+
+def _compact_id(de_id):
+    # Docket entry IDs are numeric; an int takes about half the memory of
+    # the equivalent str in a set.
+    try:
+        return int(de_id)
+    except ValueError:
+        return de_id
+
+
+def iter_records(
+    fn,
+    columns=OUTPUT3_COLUMNS,
+    header=False,
+    chunk_size=CHUNK_SIZE,
+    dedupe=True,
+):
+    """
+    Yield lists of up to `chunk_size` Records from the CSV file `fn`.
+
+    `columns` gives the CSV layout; Record fields missing from it are None.
+    With `dedupe`, only the first row for each docket entry ID is kept.
+    """
+    positions = [
+        columns.index(field) if field in columns else None
+        for field in Record._fields
+    ]
+    seen = set()
+    chunk = []
+    with open_text(fn) as f:
+        reader = csv.reader(f)
+        if header:
+            next(reader, None)
+        for row in reader:
+            record = Record(
+                *(row[i] if i is not None else None for i in positions)
+            )
+            if dedupe:
+                key = _compact_id(record.de_id)
+                if key in seen:
+                    continue
+                seen.add(key)
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def load_labels(fn=LABELS3_FN):
+    with open(fn) as f:
+        return json.load(f)
+
+
+class LabeledDataset:
+    """
+    Column-oriented labeled docket entries.
+
+    Row i is docket entry `de_ids[i]`, with description
+    `descriptions[desc_codes[i]]` and label `labels[label_codes[i]]`.
+    `pp` is filled in by preprocessing and is parallel to `descriptions`.
+    Train/test splits are arrays of row indices, not copies of the rows.
+    """
+
+    def __init__(self, labels=()):
+        self.labels = list(labels)
+        self._label_codes = {label: i for i, label in enumerate(self.labels)}
+        self._desc_codes_by_text = {}
+        self.descriptions = []
+        self.pp = None
+        # Columns are appended to compact arrays while loading, then frozen
+        # into numpy arrays by finalize().
+        self._columns = (array("q"), array("l"), array("l"))
+        self.de_ids = self.desc_codes = self.label_codes = None
+
+    @classmethod
+    def from_chunks(cls, chunks, labels=()):
+        """Build from an iterable of Record lists, e.g. iter_records()."""
+        dataset = cls(labels)
+        for chunk in chunks:
+            dataset.extend(chunk)
+        dataset.finalize()
+        return dataset
+
+    @classmethod
+    def from_csv(cls, fn, labels=(), **kwargs):
+        return cls.from_chunks(iter_records(fn, **kwargs), labels)
+
+    def _label_code(self, label):
+        code = self._label_codes.get(label)
+        if code is None:
+            # Labels can be added while labeling; keep them rather than fail.
+            code = len(self.labels)
+            self.labels.append(label)
+            self._label_codes[label] = code
+        return code
+
+    def extend(self, records):
+        """Append Records. Call finalize() once all have been added."""
+        de_ids, desc_codes, label_codes = self._columns
+        desc_codes_by_text = self._desc_codes_by_text
+        for record in records:
+            desc_code = desc_codes_by_text.get(record.description)
+            if desc_code is None:
+                desc_code = len(self.descriptions)
+                desc_codes_by_text[record.description] = desc_code
+                self.descriptions.append(record.description)
+            de_ids.append(int(record.de_id))
+            desc_codes.append(desc_code)
+            label_codes.append(self._label_code(record.label))
+
+    def finalize(self):
+        """Freeze the columns into numpy arrays with compact dtypes."""
+        de_ids, desc_codes, label_codes = self._columns
+        label_dtype = np.int8 if len(self.labels) <= 127 else np.int16
+        self.de_ids = np.array(de_ids, dtype=np.int64)
+        self.desc_codes = np.array(desc_codes, dtype=np.int32)
+        self.label_codes = np.array(label_codes, dtype=label_dtype)
+        self._columns = None
+        self._desc_codes_by_text = None
+
+    def __len__(self):
+        return len(self.de_ids)
+
+    def split(self, train_size=0.70, seed=None):
+        """Shuffle and return (train, test) arrays of row indices."""
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(self))
+        cutoff = round(len(self) * train_size)
+        return order[:cutoff], order[cutoff:]
+
+    def texts(self, idx=None, column="pp"):
+        """The preprocessed (or raw, with column="description") texts."""
+        store = self.pp if column == "pp" else self.descriptions
+        codes = self.desc_codes if idx is None else self.desc_codes[idx]
+        return [store[code] for code in codes]
+
+    def y(self, idx=None):
+        """Label codes for the given rows."""
+        return self.label_codes if idx is None else self.label_codes[idx]
+
+    def label_names(self, codes):
+        """Map an array of label codes back to label strings."""
+        return np.asarray(self.labels, dtype=object)[codes]
@@ -4,20 +4,23 @@
 # reading data
 
 import pandas as pd
-import re
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 from sklearn.model_selection import train_test_split
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn import metrics
 
+from de_classifier import instrument
+from de_classifier.preprocessing import Preprocessor
 
-data = pd.read_csv(
-    # "https://raw.githubusercontent.com/mohitgupta-omg/Kaggle-SMS-Spam-Collection-Dataset-/master/spam.csv",
-    "labeled-1.csv",
-    encoding="latin-1",
-)
+
+instrument.start_run("dc_example")
+with instrument.stage("read_csv") as stage:
+    data = pd.read_csv(
+        # "https://raw.githubusercontent.com/mohitgupta-omg/Kaggle-SMS-Spam-Collection-Dataset-/master/spam.csv",
+        "labeled-1.csv",
+        encoding="latin-1",
+    )
+    stage["rows"] = len(data)
 print(data.head())
 
 # drop unnecessary columns and rename cols
@@ -30,31 +33,13 @@ print(data.isna().sum())
 text = list(data["text"])
 
 # preprocessing loop
-lemmatizer = WordNetLemmatizer()
-corpus = []
-pattern = "[^a-zA-Z]"
-comp = re.compile(pattern)
+preprocessor = Preprocessor(strip_pattern="[^a-zA-Z]")
 print(text[:10])
 print(len(text))
-for i in range(len(text)):
-    r = None
-    # print(text[i])
-    # print(type(text[i]))
-    if (
-        text[i] is None or type(text[i]) is float
-    ):  # or text[i] is pd.isnull(text[i]) or text[i]:
-        r = ""
-        # print("it's None.")
-    else:
-        # print("it's not None.")
-        # r = re.sub(pattern, " ", text[i])
-        r = comp.sub(" ", text[i])
-        r = r.lower()
-        r = r.split()
-        r = [word for word in r if word not in stopwords.words("english")]
-        r = [lemmatizer.lemmatize(word) for word in r]
-        r = " ".join(r)
-    corpus.append(r)
+# blank descriptions come back from pandas as NaN floats
+text = ["" if t is None or type(t) is float else t for t in text]
+with instrument.stage("preprocess", rows=len(text)):
+    corpus = preprocessor.preprocess_descriptions(text)
 
 # assign corpus to data['text']
 data["text"] = corpus
@@ -73,19 +58,23 @@ print("Testing Data : ", X_test.shape)
 
 # Train Bag of Words model
 cv = CountVectorizer()
-X_train_cv = cv.fit_transform(X_train)
+with instrument.stage("vectorizer_fit", rows=len(X_train)):
+    X_train_cv = cv.fit_transform(X_train)
 print(X_train_cv.shape)
 
 
 # Training Logistic Regression model
 lr = LogisticRegression()
-lr.fit(X_train_cv, y_train)
+with instrument.stage("classifier_fit", rows=len(y_train)):
+    lr.fit(X_train_cv, y_train)
 
 # transform X_test using CV
-X_test_cv = cv.transform(X_test)
+with instrument.stage("vectorizer_transform", rows=len(X_test)):
+    X_test_cv = cv.transform(X_test)
 
 # generate predictions
-predictions = lr.predict(X_test_cv)
+with instrument.stage("predict", rows=len(X_test)):
+    predictions = lr.predict(X_test_cv)
 print("Predictions:")
 print(predictions)
 print()
@@ -95,3 +84,5 @@ all_labels = ("pleading", "motion", "declaration", "judgment", "order", "other")
 df = pd.DataFrame(metrics.confusion_matrix(y_test,predictions), index=all_labels, columns=all_labels)
                   #index=['ham','spam'], columns=['ham','spam'])
 print(df)
+
+instrument.finish_run()
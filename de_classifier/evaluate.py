@@ -0,0 +1,203 @@
+"""
+Stratified k-fold evaluation of the classify3.py pipeline.
+
+A single random 70/30 split gives a different classification report every
+run, and labels with a handful of examples (e.g. "pro hac vice") can land
+almost entirely on one side. cross_validate() instead splits the data into
+`k` stratified folds from a seed, so every label is spread evenly and runs
+are reproducible, then trains and scores each fold and reports per-label
+precision, recall and F1 as a mean and standard deviation across folds.
+
+Descriptions are preprocessed once, up front, and shared with the folds,
+which run in parallel worker processes.
+
+    python -m de_classifier.evaluate [--input output3.csv]
+        [--layout output3] [--folds 5] [--seed 0] [--workers N]
+        [--features {tfidf,hashing}]
+"""
+
+import argparse
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import precision_recall_fscore_support
+from sklearn.model_selection import StratifiedKFold
+from sklearn.naive_bayes import MultinomialNB
+
+from de_classifier.classify3 import load_dataset, preprocess
+from de_classifier.dataset import LABELS3_FN, LAYOUTS
+from de_classifier.features import FEATURE_MODES, make_vectorizer
+from de_classifier.ppcache import PreprocessCache
+from de_classifier.preprocessing import NORMALIZE, Preprocessor
+
+FOLDS = 5
+SEED = 0
+METRICS = ("precision", "recall", "f1")
+
+
+def stratified_folds(y, k=FOLDS, seed=SEED):
+    """(train, test) row index arrays for `k` stratified folds of `y`."""
+    splitter = StratifiedKFold(n_splits=k, shuffle=True, random_state=seed)
+    with warnings.catch_warnings():
+        # Labels with fewer than k examples just miss some folds.
+        warnings.simplefilter("ignore", UserWarning)
+        return list(splitter.split(np.zeros(len(y)), y))
+
+
+def run_fold(data, fold):
+    """
+    Fit on a fold's train rows and return predicted codes for its test
+    rows. `data` is (preprocessed texts, description codes, label codes,
+    feature mode, classifier).
+    """
+    texts, desc_codes, y, feature_mode, classifier = data
+    train, test = fold
+    vectorizer = make_vectorizer(feature_mode)
+    X_train = vectorizer.fit_transform(texts[desc_codes[train]])
+    X_test = vectorizer.transform(texts[desc_codes[test]])
+    classifier = clone(classifier).fit(X_train, y[train])
+    return classifier.predict(X_test)
+
+
+_worker_data = None
+
+
+def _init_worker(data):
+    global _worker_data
+    _worker_data = data
+
+
+def _run_fold(fold):
+    return run_fold(_worker_data, fold)
+
+
+def cross_validate(
+    dataset,
+    k=FOLDS,
+    seed=SEED,
+    workers=None,
+    feature_mode="tfidf",
+    classifier=None,
+):
+    """
+    Evaluate a preprocessed LabeledDataset with stratified k-fold
+    cross-validation. `classifier` is an unfitted estimator (default:
+    MultinomialNB, as classify3.py uses), cloned for each fold.
+
+    Returns a dict with the folds' accuracy, and for each label that
+    occurs, its support and the mean and standard deviation across folds
+    of each of METRICS. A label missing from a fold's test rows doesn't
+    count towards that metric.
+    """
+    if classifier is None:
+        classifier = MultinomialNB()
+    y = dataset.y()
+    folds = stratified_folds(y, k, seed)
+    # Preprocessed once, for all the folds.
+    texts = np.asarray(dataset.pp, dtype=object)
+    data = (texts, dataset.desc_codes, y, feature_mode, classifier)
+    workers = min(workers or os.cpu_count() or 1, k)
+    if workers <= 1:
+        predictions = [run_fold(data, fold) for fold in folds]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(data,)
+        ) as executor:
+            predictions = list(executor.map(_run_fold, folds))
+
+    codes = np.arange(len(dataset.labels))
+    accuracy = []
+    per_fold = {metric: [] for metric in METRICS}
+    for (_, test), y_pred in zip(folds, predictions):
+        accuracy.append(float(np.mean(y_pred == y[test])))
+        scores = precision_recall_fscore_support(
+            y[test], y_pred, labels=codes, zero_division=np.nan
+        )
+        support = scores[3]
+        for metric, values in zip(METRICS, scores[:3]):
+            # Only score labels that are in this fold's test rows.
+            per_fold[metric].append(np.where(support > 0, values, np.nan))
+
+    means, stds = {}, {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        for metric in METRICS:
+            values = np.vstack(per_fold[metric])
+            means[metric] = np.nanmean(values, axis=0)
+            stds[metric] = np.nanstd(values, axis=0)
+    support = np.bincount(y, minlength=len(codes))
+    labels = {}
+    for code in np.flatnonzero(support):
+        labels[dataset.labels[code]] = {"support": int(support[code])}
+        for metric in METRICS:
+            labels[dataset.labels[code]][metric] = {
+                "mean": float(means[metric][code]),
+                "std": float(stds[metric][code]),
+            }
+    return {
+        "folds": k,
+        "seed": seed,
+        "accuracy": {
+            "mean": float(np.mean(accuracy)),
+            "std": float(np.std(accuracy)),
+            "per_fold": accuracy,
+        },
+        "labels": labels,
+    }
+
+
+def format_report(result):
+    width = max(len(label) for label in result["labels"]) + 2
+    lines = [
+        f"{'':>{width}}"
+        + "".join(f"{metric:>18}" for metric in METRICS)
+        + f"{'support':>10}"
+    ]
+    for label, scores in sorted(result["labels"].items()):
+        lines.append(
+            f"{label:>{width}}"
+            + "".join(
+                f"{scores[m]['mean']:>10.3f} ± {scores[m]['std']:.3f}"
+                for m in METRICS
+            )
+            + f"{scores['support']:>10}"
+        )
+    accuracy = result["accuracy"]
+    lines.append(
+        f"\n{result['folds']}-fold accuracy: "
+        f"{accuracy['mean']:.3f} ± {accuracy['std']:.3f}"
+    )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="de_classifier.evaluate")
+    parser.add_argument("--input", default="output3.csv")
+    parser.add_argument("--layout", choices=LAYOUTS, default="output3")
+    parser.add_argument("--labels", default=LABELS3_FN)
+    parser.add_argument("--folds", type=int, default=FOLDS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--features", choices=FEATURE_MODES, default="tfidf")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    dataset = load_dataset(args.input, args.labels, layout=args.layout)
+    print("Preprocessing...")
+    pp_cache = PreprocessCache()
+    preprocess(
+        dataset, cache=pp_cache, preprocessor=Preprocessor(normalize=NORMALIZE)
+    )
+    pp_cache.close()
+    print(f"Cross-validating {len(dataset)} entries...\n")
+    result = cross_validate(
+        dataset,
+        k=args.folds,
+        seed=args.seed,
+        workers=args.workers,
+        feature_mode=args.features,
+    )
+    print(format_report(result))
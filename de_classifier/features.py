@@ -0,0 +1,117 @@
+"""
+Feature extraction modes.
+
+- "tfidf": TfidfVectorizer over unigrams and bigrams, as classify3.py has
+  always used. It keeps a vocabulary of every term it has seen, which
+  dominates memory and pickle size on big corpora.
+- "hashing": HashingVectorizer over the same n-grams, hashed into a fixed
+  number of columns, optionally followed by a separately fitted IDF. There
+  is no vocabulary to hold or ship, and transform() needs no fitted state
+  (without IDF), so chunks can be vectorized independently.
+
+vectorize_chunks() transforms a big list of texts chunk by chunk across a
+process pool with any fitted vectorizer. fit_vectorize() is fit_transform()
+that uses it for the hashing, which is how model.py trains in "hashing"
+mode.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import scipy.sparse
+from sklearn.feature_extraction.text import (
+    HashingVectorizer,
+    TfidfTransformer,
+    TfidfVectorizer,
+)
+from sklearn.pipeline import Pipeline, make_pipeline
+
+FEATURE_MODES = ("tfidf", "hashing")
+# Naive Bayes keeps two dense (labels x features) arrays, so this trades
+# hash collisions against classifier size.
+HASHING_N_FEATURES = 2**18
+CHUNK_SIZE = 20_000
+
+TFIDF_PARAMS = {
+    "min_df": 2,
+    "ngram_range": (1, 2),
+    "stop_words": "english",
+    "strip_accents": "unicode",
+    "norm": "l2",
+}
+HASHING_PARAMS = {
+    "n_features": HASHING_N_FEATURES,
+    "ngram_range": (1, 2),
+    "stop_words": "english",
+    "strip_accents": "unicode",
+    # Keep counts non-negative; MultinomialNB needs it.
+    "alternate_sign": False,
+}
+
+
+def make_vectorizer(mode="tfidf", idf=True):
+    """A fresh, unfitted vectorizer for the given feature mode."""
+    if mode == "tfidf":
+        return TfidfVectorizer(**TFIDF_PARAMS)
+    if mode == "hashing":
+        if not idf:
+            return HashingVectorizer(norm="l2", **HASHING_PARAMS)
+        return make_pipeline(
+            HashingVectorizer(norm=None, **HASHING_PARAMS),
+            TfidfTransformer(norm="l2"),
+        )
+    raise ValueError(
+        f"Unknown feature mode {mode!r}; expected one of {FEATURE_MODES}"
+    )
+
+
+_worker_vectorizer = None
+
+
+def _init_worker(vectorizer):
+    global _worker_vectorizer
+    _worker_vectorizer = vectorizer
+
+
+def _transform_chunk(texts):
+    return _worker_vectorizer.transform(texts)
+
+
+def vectorize_chunks(vectorizer, texts, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    transform() `texts` in chunks across `workers` processes (None means
+    one per CPU) and stack the results in order. `vectorizer` must already
+    be fitted, unless it's a bare HashingVectorizer.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(texts) <= chunk_size:
+        return vectorizer.transform(texts)
+    chunks = [
+        texts[i : i + chunk_size] for i in range(0, len(texts), chunk_size)
+    ]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(vectorizer,),
+    ) as executor:
+        return scipy.sparse.vstack(
+            list(executor.map(_transform_chunk, chunks)), format="csr"
+        )
+
+
+def fit_vectorize(vectorizer, texts, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    `vectorizer`.fit_transform(`texts`) for a vectorizer from
+    make_vectorizer(). In "hashing" mode the texts are hashed with
+    vectorize_chunks(), and only the IDF, if any, is fitted on the result;
+    TF-IDF has to see every text to build its vocabulary.
+    """
+    if isinstance(vectorizer, HashingVectorizer):
+        return vectorize_chunks(vectorizer, texts, workers, chunk_size)
+    if isinstance(vectorizer, Pipeline) and isinstance(
+        vectorizer[0], HashingVectorizer
+    ):
+        counts = vectorize_chunks(vectorizer[0], texts, workers, chunk_size)
+        return vectorizer[-1].fit_transform(counts)
+    return vectorizer.fit_transform(texts)
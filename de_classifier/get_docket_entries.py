@@ -1,50 +1,36 @@
 from os import environ
 import csv
-import json
 
-import requests
+from de_classifier.api import default_client
+from de_classifier.crawler import DE_FIELDS
 
 CL_API_TOKEN = environ["CL_API_TOKEN"]
 CL_SEARCH_ENDPOINT = (
     "https://www.courtlistener.com/api/rest/v4/docket-entries/"
 )
-JSON_OUTPUT_FN = "response.json"
 CSV_OUTPUT_FN = "docket_entries.csv"
 CSV_HEADER_ROW = ("Docket Entry ID", "Document ID", "Description")
 HOW_MANY = 500
 
-headers = {
-    "Authorization": f"Token {CL_API_TOKEN}"
-}
-
 # order_by=-date_filed
 
 # Select only fields we need
 # https://www.courtlistener.com/help/api/rest/v4#field-selection
-# fields=["id", "description"]
-
-# params = {
-#     "fields": ",".join(fields)
-# }
+params = {"fields": DE_FIELDS}
 
 def get_docket_entries(next=None):
     # print("GETting...")
     print("Getting more docket entries...")
     url = CL_SEARCH_ENDPOINT
+    query = params
     if next is not None:
+        # `next` already carries the query string.
         url = next
-    response = requests.get(
-        url, 
-        headers=headers, 
-        # params=params
-    )
-    assert response.status_code == 200
-
-    with open(JSON_OUTPUT_FN, "wb") as output_fp:
-        output_fp.write(response.content)
+        query = None
+    # Retries, backs off, keeps to the API rate limit and caches responses;
+    # see api.py.
+    response_data = default_client().get_json(url, query)
 
-    response_data = response.json()
-    
     return response_data
 
 if __name__ == "__main__":
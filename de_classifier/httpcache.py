@@ -0,0 +1,156 @@
+"""
+Compressed on-disk cache of CourtListener API responses.
+
+Rerunning a crawl used to fetch every page again. ResponseCache keeps each
+page's parsed JSON gzipped under `path`, keyed by its full URL (including
+the query parameters), with the ETag and Last-Modified headers it came
+with. api.APIClient.get_json() consults it:
+
+- a page cached less than `max_age` seconds ago (or at any time, with
+  max_age=None) is served without a request, so rerunning or replaying a
+  crawl makes no round trips;
+- an older one is revalidated with If-None-Match / If-Modified-Since, and
+  served from the cache if the server answers 304 Not Modified;
+- anything else is fetched and cached.
+
+Entries are written atomically, so several threads (and processes) can
+share a cache.
+
+    python -m de_classifier.httpcache [--path http_cache] {stats,clear}
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+HTTP_CACHE_DIR = "http_cache"
+# Serve cached pages for a day before revalidating them.
+MAX_AGE = 24 * 3600
+
+
+def cache_url(url, params=None):
+    """The full URL `params` make of `url`, as requests would send it."""
+    return requests.Request("GET", url, params=params).prepare().url
+
+
+class ResponseCache:
+    def __init__(self, path=HTTP_CACHE_DIR, max_age=MAX_AGE, clock=time.time):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.clock = clock
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _file(self, url):
+        key = hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+        return self.path / key[:2] / f"{key}.json.gz"
+
+    def get(self, url):
+        """The cached entry for a full URL, or None."""
+        try:
+            with gzip.open(self._file(url), "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, EOFError, OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def fresh(self, entry):
+        return (
+            self.max_age is None
+            or self.clock() - entry["fetched_at"] < self.max_age
+        )
+
+    def conditional_headers(self, entry):
+        """Headers to revalidate a cached entry with."""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, body, headers=None):
+        headers = headers or {}
+        entry = {
+            "url": url,
+            "fetched_at": self.clock(),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "body": body,
+        }
+        fn = self._file(url)
+        fn.parent.mkdir(parents=True, exist_ok=True)
+        tmp = fn.with_name(f".{fn.name}.{os.getpid()}.{threading.get_ident()}")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, separators=(",", ":"))
+        os.replace(tmp, fn)
+        return entry
+
+    def fetch(self, get, url, params=None):
+        """
+        Parsed JSON for `url` and `params`, from the cache if it can be.
+        `get(url, params, headers)` makes the request and returns the
+        requests.Response.
+        """
+        full_url = cache_url(url, params)
+        entry = self.get(full_url)
+        if entry is not None and self.fresh(entry):
+            self._count("hits")
+            return entry["body"]
+        response = get(url, params, self.conditional_headers(entry))
+        if response.status_code == 304 and entry is not None:
+            self._count("revalidated")
+            # Fresh again, for another max_age.
+            self.put(full_url, entry["body"], response.headers)
+            return entry["body"]
+        self._count("misses")
+        body = response.json()
+        self.put(full_url, body, response.headers)
+        return body
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        files = list(self.path.glob("*/*.json.gz"))
+        return {
+            "entries": len(files),
+            "bytes": sum(fn.stat().st_size for fn in files),
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+        }
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="de_classifier.httpcache")
+    parser.add_argument("command", choices=("stats", "clear"))
+    parser.add_argument("--path", default=HTTP_CACHE_DIR)
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.path)
+    if args.command == "clear":
+        cache.clear()
+        print(f"Cleared {args.path}.")
+    else:
+        stats = cache.stats()
+        print(
+            f"{args.path}: {stats['entries']} responses, "
+            f"{stats['bytes'] / 1e6:.1f} MB compressed"
+        )
@@ -0,0 +1,222 @@
+"""
+Stage-level timing and memory metrics for the classifier scripts.
+
+Off by default. Turn it on with an environment variable naming where each
+run's metrics record goes, either a JSON lines file or the logging module:
+
+    DE_CLASSIFIER_METRICS=metrics.jsonl python -m de_classifier.classify3
+    DE_CLASSIFIER_METRICS=log python -m de_classifier.classify3
+
+Set DE_CLASSIFIER_TRACEMALLOC=1 as well to record each stage's peak traced
+allocation (much slower), or call enable() from code.
+
+A script wraps its work in run() (or start_run() and finish_run()), and its
+stages in stage() or functions decorated with @timed(). Each stage records
+its wall time, RSS and peak RSS at its end and, optionally, its row count.
+When the run finishes, one record is emitted:
+
+    {"run": "classify3", "timestamp": ..., "seconds": ..., "peak_rss_mb":
+     ..., "stages": [{"stage": "load_dataset", "rows": 9283, "seconds":
+     ..., "rss_mb": ..., "peak_rss_mb": ...}, ...]}
+
+While disabled, stage() hands back a shared no-op context manager and
+@timed() functions just call through, so instrumented code pays for one
+check.
+"""
+
+import json
+import logging
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+METRICS_ENV = "DE_CLASSIFIER_METRICS"
+TRACEMALLOC_ENV = "DE_CLASSIFIER_TRACEMALLOC"
+LOG_SINK = "log"
+
+log = logging.getLogger(__name__)
+
+
+def rss_mb():
+    """Current resident set size, or None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def peak_rss_mb():
+    """This process's peak resident set size so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+class Recorder:
+    """Collects the stages of one run."""
+
+    def __init__(self, name, trace=False):
+        self.name = name
+        self.trace = trace
+        self.stages = []
+        self._start = time.perf_counter()
+        self._timestamp = datetime.now(timezone.utc).isoformat()
+        self._started_tracing = trace and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Record a stage; `rows` can also be set on the yielded dict."""
+        result = {"stage": name, "rows": rows}
+        if self.trace:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield result
+        finally:
+            result["seconds"] = time.perf_counter() - start
+            result["rss_mb"] = rss_mb()
+            result["peak_rss_mb"] = peak_rss_mb()
+            if self.trace:
+                result["tracemalloc_peak_mb"] = (
+                    tracemalloc.get_traced_memory()[1] / 2**20
+                )
+            self.stages.append(result)
+
+    def record(self):
+        """The run's metrics record."""
+        return {
+            "run": self.name,
+            "timestamp": self._timestamp,
+            "seconds": time.perf_counter() - self._start,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+        }
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+
+
+class _NullStage(dict):
+    """Stands in for a stage's result dict while disabled; drops writes."""
+
+    def __setitem__(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+_sink = None
+_trace = False
+_recorder = None
+
+
+def enable(sink=None, trace=None):
+    """
+    Turn metrics on. `sink` is a JSON lines file path, or "log" to emit
+    records through logging; both default to the environment variables.
+    """
+    global _sink, _trace
+    _sink = sink or os.environ.get(METRICS_ENV) or LOG_SINK
+    if _sink == LOG_SINK:
+        log.setLevel(logging.INFO)
+        logging.basicConfig()  # unless the script already configured it
+    if trace is None:
+        trace = os.environ.get(TRACEMALLOC_ENV, "") not in ("", "0")
+    _trace = trace
+
+
+def disable():
+    global _sink, _recorder
+    _sink = _recorder = None
+
+
+def enabled():
+    return _sink is not None
+
+
+def start_run(name):
+    """Start recording a run, if metrics are enabled."""
+    global _recorder
+    if _recorder is None and _sink is not None:
+        _recorder = Recorder(name, trace=_trace)
+    return _recorder
+
+
+def finish_run():
+    """Emit the current run's record, if any, and stop recording."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is None:
+        return None
+    recorder.close()
+    record = recorder.record()
+    if _sink == LOG_SINK:
+        log.info(json.dumps(record))
+    else:
+        with open(_sink, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    return record
+
+
+@contextmanager
+def run(name):
+    """Record everything in the block as one run."""
+    start_run(name)
+    try:
+        yield
+    finally:
+        finish_run()
+
+
+def stage(name, rows=None):
+    """
+    A context manager recording a stage of the current run. Yields a dict;
+    set its "rows" (or other keys) to add them to the record.
+    """
+    if _recorder is None:
+        return _NULL_STAGE
+    return _recorder.stage(name, rows)
+
+
+def timed(name=None, rows=None):
+    """
+    Decorator recording each call as a stage, named `name` or after the
+    function. `rows`, if given, is called on the return value to count
+    rows, e.g. @timed(rows=len).
+    """
+
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with _recorder.stage(stage_name) as result:
+                value = func(*args, **kwargs)
+                if rows is not None:
+                    result["rows"] = rows(value)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+if os.environ.get(METRICS_ENV):
+    enable()
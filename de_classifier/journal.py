@@ -0,0 +1,152 @@
+"""
+Append-only persistence of labeler3.py's fetcher state.
+
+DocketEntryFetcher used to rewrite all of entries.json and dockets.json
+after every page of dockets, so saving got slower the longer a session ran,
+and nothing read them back. FetcherJournal instead appends one JSON line
+per change to fetcher.jsonl:
+
+    {"docket": <id>, "data": <docket result>}       a docket was queued
+    {"entries": <docket id>, "data": [<entry>, ...]}  its entries came in
+
+so saving costs one small write. replay() reads the file back in one pass,
+which lets a new session pick up the queued dockets and fetched entries
+instead of refetching them. A torn final line (from a crash mid-append) is
+dropped. When dockets are re-queued or refetched, superseded lines pile up;
+load() rewrites the file from the live state once they make up more than
+half of it.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+
+JOURNAL_FN = "fetcher.jsonl"
+# Compact when this fraction of the lines are superseded.
+COMPACT_RATIO = 0.5
+
+log = logging.getLogger(__name__)
+
+
+class FetcherState:
+    """Dockets and entries replayed from a journal."""
+
+    def __init__(self):
+        # docket id -> {"docket": result, "entries": [entry, ...]}
+        self.dockets = {}
+        # Docket ids whose entries haven't been fetched, in queue order.
+        self.pending = {}
+        self.lines = 0
+
+    def apply(self, record):
+        self.lines += 1
+        if "docket" in record:
+            docket_id = record["docket"]
+            self.dockets[docket_id] = {"docket": record["data"], "entries": []}
+            self.pending[docket_id] = None
+        elif "entries" in record:
+            docket_id = record["entries"]
+            docket = self.dockets.setdefault(
+                docket_id, {"docket": None, "entries": []}
+            )
+            docket["entries"] = record["data"]
+            self.pending.pop(docket_id, None)
+        else:
+            log.warning(f"Skipping unknown journal record: {record}")
+
+    def records(self):
+        """The fewest records that replay to this state."""
+        for docket_id, docket in self.dockets.items():
+            if docket["docket"] is not None:
+                yield {"docket": docket_id, "data": docket["docket"]}
+            if docket_id not in self.pending:
+                yield {"entries": docket_id, "data": docket["entries"]}
+
+    def live_lines(self):
+        return sum(1 for _ in self.records())
+
+    def entries(self):
+        """Every fetched entry, in the order they came in."""
+        for docket in self.dockets.values():
+            yield from docket["entries"]
+
+
+class FetcherJournal:
+    def __init__(self, path=JOURNAL_FN):
+        self.path = Path(path)
+        self._f = None
+
+    def _file(self):
+        if self._f is None:
+            self._f = open(self.path, "a", encoding="utf-8")
+        return self._f
+
+    def _append(self, record):
+        self._file().write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def add_docket(self, docket_id, docket):
+        self._append({"docket": docket_id, "data": docket})
+
+    def add_entries(self, docket_id, entries):
+        self._append({"entries": docket_id, "data": entries})
+
+    def sync(self):
+        """Make what's been appended so far durable."""
+        if self._f is not None:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def close(self):
+        if self._f is not None:
+            self.sync()
+            self._f.close()
+            self._f = None
+
+    def replay(self):
+        """The FetcherState the journal's records add up to."""
+        state = FetcherState()
+        try:
+            f = open(self.path, encoding="utf-8")
+        except FileNotFoundError:
+            return state
+        torn = False
+        with f:
+            for line in f:
+                if not line.endswith("\n"):
+                    torn = True
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    torn = True
+                    break
+                state.apply(record)
+        if torn:
+            log.warning(f"{self.path} ends in a torn record; dropping it.")
+            self.compact(state)
+        return state
+
+    def compact(self, state):
+        """Rewrite the journal with just the records that `state` needs."""
+        self.close()
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        lines = 0
+        with open(tmp, "w", encoding="utf-8") as f:
+            for record in state.records():
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                lines += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        log.info(f"Compacted {self.path} from {state.lines} to {lines} lines.")
+        state.lines = lines
+
+    def load(self):
+        """Replay the journal, compacting it if it's mostly superseded."""
+        state = self.replay()
+        if state.lines and state.live_lines() < state.lines * (
+            1 - COMPACT_RATIO
+        ):
+            self.compact(state)
+        return state
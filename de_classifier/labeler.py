@@ -1,17 +1,22 @@
 """
 labeler.py
 Improved interactive docket entry labeler
-Adds to labeled.csv.
+Adds to labeled.sqlite3 (see labelstore.py), exported to labeled.csv.
+Applies the label of near-duplicates of labeled entries (see neardup.py).
+Fetches entries in the background, ahead of the prompt (see prefetch.py).
 Press Ctrl-D to quit.
 """
 
-import csv
 import json
 
 from de_classifier.get_docket_entries import get_docket_entries
+from de_classifier.labelstore import open_store
+from de_classifier.neardup import open_index
+from de_classifier.prefetch import Prefetcher
 
 OUTPUT_CSV_FN = "labeled.csv"
 OUTPUT_JSON_FN = "labeled.json"
+STORE_FN = "labeled.sqlite3"
 LABELS_FN = "labels.json"
 OUTPUT_HEADER_ROW = ("Docket Entry ID", "Document ID", "Description", "Label")
 LABELS = json.load(open(LABELS_FN, "r"))
@@ -20,9 +25,14 @@ INSTRUCTIONS = (
     "Enter a letter below to apply a label, ? for help, or Ctrl-D to quit."
 )
 PROMPT = "> "
+# Near-duplicate index of labeled entries, and how similar (0-1) an entry
+# must be to one of them to get its label automatically, or suggested.
+NEARDUP_FN = "labeled.minhash"
+NEARDUP_AUTO_THRESHOLD = 0.9
+NEARDUP_SUGGEST_THRESHOLD = 0.5
 
-dataset = {}
-knowns = {}
+store = None
+neardup = None
 
 
 def instruct():
@@ -32,34 +42,11 @@ def instruct():
     print()
 
 
-# load existing labeled data from CSV file
+# open the label store, importing labeled.csv the first time
 def load_existing():
-    global dataset, knowns
-    rows = None
-    try:
-        with open(OUTPUT_CSV_FN, "r") as f:
-            reader = csv.reader(f)
-            rows = [row for row in reader]
-        row_n = 0
-        for row in rows:
-            row_n += 1
-            if row_n == 1:  # skip header row
-                continue
-            else:
-                de_id, doc_id, description, label = row
-                dataset[de_id] = {
-                    "doc_id": doc_id,
-                    "description": description,
-                    "label": label,
-                }
-                upperized = description.upper()
-                if upperized not in knowns:
-                    knowns[upperized] = label
-        print(f"Loaded existing labeled data: {row_n} rows.")
-        return
-    except FileNotFoundError:
-        print("No dataset file found.")
-        return
+    global store
+    store = open_store(STORE_FN, OUTPUT_CSV_FN, layout="labeled")
+    print(f"Loaded existing labeled data: {len(store)} rows.")
 
 
 class Fetcher:
@@ -79,7 +66,7 @@ class Fetcher:
                 de_id = result["id"]
                 doc_id = None
                 description = result["description"]
-                
+
                 # Check sub-items if description is empty
                 if description == "":
                     if not "recap_documents" in result:
@@ -97,85 +84,121 @@ class Fetcher:
 
 # save labeled data
 def save_json():
-    global dataset
+    dataset = {}
+    for chunk in store.records():
+        for record in chunk:
+            dataset[record.de_id] = {
+                "doc_id": record.doc_id,
+                "description": record.description,
+                "label": record.label,
+            }
     with open(OUTPUT_JSON_FN, "w") as f:
         json.dump(dataset, f)
     print(f"Saved labeled data to {OUTPUT_JSON_FN}.")
 
 
 def save_csv():
-    global dataset
-    with open(OUTPUT_CSV_FN, "w") as f:
-        writer = csv.writer(f)
-        writer.writerow(OUTPUT_HEADER_ROW)
-        for de_id in dataset:
-            row = [
-                de_id,
-                dataset[de_id]["doc_id"],
-                dataset[de_id]["description"],
-                dataset[de_id]["label"],
-            ]
-            writer.writerow(row)
+    store.export_csv(OUTPUT_CSV_FN, "labeled", header_row=OUTPUT_HEADER_ROW)
+
+
+def prompt_label(description, similar_label=None):
+    """
+    Ask for a label for `description` until one is given. Enter accepts
+    `similar_label`, if there is one; otherwise it's the label for "".
+    """
+    while True:
+        try:
+            response = input(PROMPT).upper()
+        except EOFError:
+            print("Exiting...")
+            exit()
+        # Before LABELS, which has a label for "" too.
+        if response == "" and similar_label is not None:
+            return similar_label
+        if response == "?":
+            instruct()
+            print()
+            print(description)
+        elif response in LABELS:
+            return LABELS[response]
+        else:
+            print(f"Huh? I don't know what '{response}' means.")
+            instruct()
 
 
 # add to labeled data
 def add_label(de_id, doc_id, description, label):
-    global dataset
-    dataset[de_id] = {
-        "doc_id": doc_id,
-        "description": description,
-        "label": label,
-    }
+    store.add(de_id, description, label, doc_id=doc_id)
+    neardup.add(description, label)
+
+
+def load_neardup():
+    global neardup
+    neardup = open_index(NEARDUP_FN, store.records())
 
 
 if __name__ == "__main__":
     fetcher = Fetcher()
     load_existing()
+    load_neardup()
+    letters = {label: letter for letter, label in LABELS.items()}
     print(f"Ready with {len(LABELS.keys())} labels.")
 
     instruct()
 
-    # label new docket entries
-    while True:
-        label = None
+    # Fetch ahead in the background, skipping entries already labeled.
+    prefetcher = Prefetcher(
+        iter(fetcher.next_item, None),
+        store,
+        describe=lambda item: item[2],
+        skip=lambda item: store.has(item[0], item[1]),
+    ).start()
 
-        de_id, doc_id, description = fetcher.next_item()
-        if de_id in dataset:
-            continue
+    try:
+        # label new docket entries
+        for (de_id, doc_id, description), known_label in prefetcher:
+            label = None
 
-        # Don't bother if it's blank!
-        if description == "":
-            label = LABEL_DEFAULT
+            if store.has(de_id, doc_id):
+                continue
 
-        else:
-            upperized = description.upper()
-            if upperized in knowns:
-                label = knowns[upperized]
+            # Don't bother if it's blank!
+            if description == "":
+                label = LABEL_DEFAULT
 
             else:
-                print(description)
-                response = None
-
-                # prompt loop
-                while True:
-                    try:
-                        response = input(PROMPT).upper()
-                    except EOFError:
-                        print("Exiting...")
-                        save_json()
-                        save_csv()
-                        exit()
-                    if response == "?":
-                        instruct()
-                        print()
-                        print(description)
-                    elif response in LABELS:
-                        label = LABELS[response]
-                        knowns[upperized] = label
-                        break
-                    else:
-                        print(f"Huh? I don't know what '{response}' means.")
-                        instruct()
-                print()
+                if known_label is None:
+                    # It may have been labeled since it was prefetched.
+                    known_label = store.known_label(description)
+                similar_label, similarity = None, 0.0
+                if known_label is None:
+                    similar_label, similarity = neardup.query(description)
 
-        add_label(de_id, doc_id, description, label)
+                if known_label is not None:
+                    label = known_label
+
+                elif similarity >= NEARDUP_AUTO_THRESHOLD:
+                    label = similar_label
+
+                else:
+                    print(description)
+                    if similarity >= NEARDUP_SUGGEST_THRESHOLD:
+                        letter = letters.get(similar_label)
+                        print(
+                            f"A similar entry ({similarity:.0%}) is labeled "
+                            f"'{similar_label}' ({letter}). "
+                            "Press Enter to accept."
+                        )
+                    else:
+                        similar_label = None
+                    label = prompt_label(description, similar_label)
+                    print()
+
+            add_label(de_id, doc_id, description, label)
+    finally:
+        # However the loop ends (Ctrl-D, Ctrl-C or an error), keep every
+        # label: the store commits in batches.
+        prefetcher.close()
+        save_json()
+        save_csv()
+        store.close()
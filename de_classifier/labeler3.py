@@ -5,11 +5,21 @@ Improves on laberler.py by:
 - ✨ Auto-completion of labels! ✨
 - Limiting to civil and criminal cases. Bankruptcy is too crazy for now!
 - Explicitly do a whole case at a time.
-- Saves API query state so we don't restart from the same point every time.
+- Saves API query state so we don't restart from the same point every time,
+  and journals fetched dockets and entries so a new session picks up where
+  the last one left off (see journal.py).
 - Better logging.
+- Gets the entries of a page of dockets concurrently (see crawler.py), in
+  the background, ahead of the prompt (see prefetch.py).
+- Keeps an online model up to date as labels are added (see online.py),
+  and asks about the entries it's least sure of first (see active.py).
+- Pre-fills the model's likeliest label, and shows its top 3 (see
+  suggest.py).
+- Applies, or pre-fills, the label of near-duplicate entries (see neardup.py).
+- Keeps labels in an indexed SQLite store, exported to output3.csv on quit
+  (see labelstore.py).
 """
 
-import csv
 import json
 import logging
 import sys
@@ -17,11 +27,20 @@ import sys
 from os import environ
 from pathlib import Path
 
-import requests
 from prompt_toolkit import prompt
 from prompt_toolkit.completion import WordCompleter
 from prompt_toolkit.validation import Validator, ValidationError
 
+from de_classifier.active import ActiveQueue
+from de_classifier.api import default_client
+from de_classifier.crawler import fetch_entries
+from de_classifier.journal import JOURNAL_FN, FetcherJournal
+from de_classifier.labelstore import LABELS3_DB_FN, open_store
+from de_classifier.neardup import open_index
+from de_classifier.online import load_online_model
+from de_classifier.prefetch import Prefetcher
+from de_classifier.suggest import Suggester, format_suggestions
+
 
 __NAME__ = "labeler3.py"
 LOG_LEVEL = "DEBUG"
@@ -32,9 +51,9 @@ CL_DE_ENDPOINT = "https://www.courtlistener.com/api/rest/v4/docket-entries/"
 CL_DOCKET_ENDPOINT = (
     "https://www.courtlistener.com/api/rest/v4/dockets/?court__jurisdiction=FD"
 )
+# Only the docket fields we keep; `next` links carry this along.
+CL_DOCKET_FIELDS = "id,court_id,case_name,docket_number"
 
-ENTRIES_FN = "entries.json"
-DOCKETS_FN = "dockets.json"
 OUTPUT_FN = "output3.csv"
 OUTPUT_HEADER_ROW = (
     "Description",
@@ -43,8 +62,21 @@ OUTPUT_HEADER_ROW = (
     "Docket ID",
     "Document ID",
 )
+STORE_FN = LABELS3_DB_FN
 LABELS_FN = "labels3.json"
 LABELS = json.load(open(LABELS_FN))
+# How many API requests to have in flight when getting docket entries.
+FETCH_CONCURRENCY = 8
+
+# Near-duplicate index of labeled entries, and how similar (0-1) an entry
+# must be to one of them to get its label automatically, or pre-filled.
+NEARDUP_FN = "output3.minhash"
+NEARDUP_AUTO_THRESHOLD = 0.9
+NEARDUP_SUGGEST_THRESHOLD = 0.5
+
+# Which entries to ask about first: "uncertainty", "diverse" (see
+# active.py), or None for the order they're fetched in.
+ACTIVE_LEARNING = "uncertainty"
 
 INSTRUCTIONS = """Enter a label from the list below. Press Tab to auto-complete!
 ? to repeat these instructions. Ctrl-D to quit.
@@ -69,40 +101,48 @@ try:
 except FileNotFoundError:
     log.info(f"No next.json file found. Starting from scratch.")
 
-auth_headers = {"Authorization": f"Token {CL_API_TOKEN}"}
-
 
 class DocketEntryFetcher:
-    def __init__(self, next=None):
+    def __init__(self, next=None, journal_fn=JOURNAL_FN):
         self.dockets = {}
         self.entries = {}
         self.docket_next = next
         self.docket_queue = []
+        # Entries fetched in an earlier session, to be yielded first.
+        self.backlog = []
+        self.get = default_client()
+        self.journal = FetcherJournal(journal_fn)
         log.debug(f"Initialized DocketEntryFetcher: {self}")
 
     def load(self):
-        """Load state from file."""
-        raise NotImplementedError
+        """Load state from the journal."""
+        state = self.journal.load()
+        self.dockets = state.dockets
+        self.entries = {
+            entry["docket_entry_id"]: entry for entry in state.entries()
+        }
+        self.docket_queue = list(state.pending)
+        self.backlog = list(state.entries())
+        log.info(
+            f"Loaded {len(self.dockets)} dockets ({len(self.docket_queue)} "
+            f"queued) and {len(self.entries)} entries from "
+            f"{self.journal.path}."
+        )
+        return self
 
     def save(self):
-        """Save state to file."""
+        """Make the journaled state durable."""
         log.debug("Saving state...")
-        with open(ENTRIES_FN, "w") as f:
-            json.dump(self.entries, f)
-            log.info(f"Saved docket entries to {ENTRIES_FN}.")
-        with open(DOCKETS_FN, "w") as f:
-            json.dump(self.dockets, f)
-        log.info(f"Saved dockets to {DOCKETS_FN}.")
+        self.journal.sync()
 
     def get_dockets(self, flush=False):
         log.debug("Getting dockets.")
-        url = (
-            self.docket_next
-            if self.docket_next is not None
-            else CL_DOCKET_ENDPOINT
-        )
-        response = requests.get(url, headers=auth_headers)
-        response_data = response.json()
+        if self.docket_next is not None:
+            response_data = self.get(self.docket_next)
+        else:
+            response_data = self.get(
+                CL_DOCKET_ENDPOINT, {"fields": CL_DOCKET_FIELDS}
+            )
         self.docket_next = response_data["next"]
         json.dump(self.docket_next, open(NEXT_FN, "w"))
         for result in response_data["results"]:
@@ -111,71 +151,53 @@ class DocketEntryFetcher:
                 "docket": result,
                 "entries": [],
             }
+            self.journal.add_docket(docket_id, result)
             self.docket_queue.append(docket_id)
         if flush:
             self.flush_docket_queue()
 
     def flush_docket_queue(self, save=True):
         """
-        Get entries for dockets in the docket queue.
+        Get entries for dockets in the docket queue, concurrently.
         Returns a list of docket entries.
         """
         log.debug("Flushing docket queue.")
+        # The queue is worked from the end.
+        docket_ids = self.docket_queue[::-1]
+        self.docket_queue = []
         ret = []
-        while len(self.docket_queue) > 0:
-            docket_id = self.docket_queue.pop()
-            entries = self.get_entries(docket_id)
-            if save:
-                self.save()
-            ret.extend(entries)
+        for docket_id, entries in fetch_entries(
+            docket_ids,
+            get=self.get,
+            concurrency=FETCH_CONCURRENCY,
+            endpoint=CL_DE_ENDPOINT,
+        ):
+            ret.extend(self.add_entries(docket_id, entries))
+        if save and docket_ids:
+            self.save()
         return ret
 
     def get_entries(self, docket_id):
         log.debug(f"Getting docket entries for docket {docket_id}.")
-        ret = []
-        url = f"{CL_DE_ENDPOINT}?docket={docket_id}"
-        response = requests.get(url, headers=auth_headers)
-        response_data = response.json()
+        [(_, entries)] = fetch_entries(
+            [docket_id], get=self.get, endpoint=CL_DE_ENDPOINT
+        )
+        return self.add_entries(docket_id, entries)
 
-        for result in response_data["results"]:
-            de_id = result["id"]
-            doc_id = None
-            description = result["description"]
-            if description == "":
-                if not "recap_documents" in result:
-                    continue
-                else:
-                    for doc in result["recap_documents"]:
-                        description = doc["description"]
-                        doc_id = doc["id"]
-                        entry = {
-                            "docket_entry_id": de_id,
-                            "docket_id": docket_id,
-                            "doc_id": doc_id,
-                            "description": description,
-                            "label": None,
-                        }
-                        self.entries[de_id] = entry
-                        self.dockets[docket_id]["entries"].append(entry)
-                        ret.append(entry)
-            else:
-                entry = {
-                    "docket_entry_id": de_id,
-                    "docket_id": docket_id,
-                    "doc_id": doc_id,
-                    "description": description,
-                    "label": None,
-                }
-                self.entries[de_id] = entry
-                self.dockets[docket_id]["entries"].append(entry)
-                ret.append(entry)
-        return ret
+    def add_entries(self, docket_id, entries):
+        self.journal.add_entries(docket_id, entries)
+        for entry in entries:
+            self.entries[entry["docket_entry_id"]] = entry
+            self.dockets[docket_id]["entries"].append(entry)
+        return entries
 
     def generate(self, save=True):
         """Generator for infinite docket entries!"""
+        backlog, self.backlog = self.backlog, []
+        yield from backlog
         while True:
             if len(self.docket_queue) == 0:
-                print("Getting more dockets...\n")
+                log.info("Getting more dockets...")
                 self.get_dockets()
                 self.save()
             for entry in self.flush_docket_queue(save=save):
@@ -188,28 +210,25 @@ class DocketEntryFetcher:
 def add_label(
     entry: dict,
     label: str,
-    csv_writer: csv.writer,
-    completed_de_ids: list,
-    knowns: dict,
+    store,
+    model=None,
+    neardup=None,
 ):
-    row = [
+    store.add(
+        entry["docket_entry_id"],
         entry["description"],
         label,
-        entry["docket_id"],
-        entry["docket_entry_id"],
-        entry["doc_id"],
-    ]
-    csv_writer.writerow(row)
-    csv_writer
-    output_f.flush()
-    completed_de_ids.append(entry["docket_entry_id"])
-    upperized = entry["description"].upper()
-    if upperized not in knowns:
-        knowns[upperized] = label
+        docket_id=entry["docket_id"],
+        doc_id=entry["doc_id"],
+    )
+    if model is not None:
+        model.add(entry["description"], label)
+    if neardup is not None:
+        neardup.add(entry["description"], label)
     log.info(
         f"Added label '{label}' to docket entry {entry['docket_entry_id']}"
     )
-    print(f"Labeled {len(completed_de_ids)} entries.")
+    print(f"Labeled {len(store)} entries.")
 
 
 class YNValidator(Validator):
@@ -227,90 +246,170 @@ def print_instructions():
 if __name__ == "__main__":
     print(__NAME__)
     log.debug("This is a debug line.")
-    fetcher = DocketEntryFetcher(next=NEXT)
+    fetcher = DocketEntryFetcher(next=NEXT).load()
     completer = WordCompleter(LABELS)
-    completed_de_ids = []
-    knowns = {}
-
-    # prepare output CSV file of labeled data
-    output_f = open(OUTPUT_FN, "r")
-    output_reader = csv.reader(output_f)
-    for row in output_reader:
-        description = row[0]
-        label = row[1]
-        docket_id = row[2]
-        de_id = row[3]
-        doc_id = row[4]
-        completed_de_ids.append(de_id)
-        knowns[description.upper()] = label
-    output_f.close()
-
-    output_f = open(OUTPUT_FN, "a")
-    output_writer = csv.writer(output_f)
+    store = open_store(STORE_FN, OUTPUT_FN)
+
+    # Start fetching while the models load. The store stands in for a dict
+    # of known descriptions, and entries journaled in an earlier session
+    # may already be labeled.
+    prefetcher = Prefetcher(
+        fetcher.generate(),
+        store,
+        skip=lambda entry: store.has(
+            entry["docket_entry_id"], entry["doc_id"]
+        ),
+    ).start()
+
+    print("Loading online model...")
+    model = load_online_model(LABELS, store)
+    print("Loading near-duplicate index...")
+    neardup = open_index(NEARDUP_FN, store.records())
+    suggester = Suggester(model).warm_up()
+
+    queue = prefetcher
+    if ACTIVE_LEARNING is not None:
+        queue = ActiveQueue(
+            prefetcher, model, ACTIVE_LEARNING, ready=prefetcher.ready
+        )
 
     print_instructions()
 
-    for entry in fetcher.generate():
-        label = None
-        labeled_it = False
-
-        upperized = entry["description"].upper()
-        if upperized in knowns:
-            label = knowns[upperized]
-            add_label(entry, label, output_writer, completed_de_ids, knowns)
-            labeled_it = True
-
-        while not labeled_it:
-            print(entry["description"])
-
-            try:
-                label = prompt(
-                    PROMPT, completer=completer, complete_while_typing=True
-                )
-            except EOFError:
-                log.info("User quit.")
-                print("Goodbye!")
-                sys.exit()
-
-            if label == "":
-                label = "other"
-
-            if label == "?":
-                print_instructions()
-                print()
-                continue
-
-            if label not in LABELS:
-                log.info(f"User entered invalid label: {label}")
-                add_yn = prompt(
-                    f"Do you want to add '{label}' as a new label? (y/n) >",
-                    validator=YNValidator(),
+    try:
+        for entry, known_label in queue:
+            label = None
+            labeled_it = False
+            suggestion = None
+            suggestions = []
+
+            if known_label is None:
+                # It may have been labeled since it was prefetched.
+                known_label = store.known_label(entry["description"])
+            if known_label is not None:
+                label = known_label
+                add_label(
+                    entry,
+                    label,
+                    store,
+                    model,
+                    neardup,
                 )
-                if add_yn.upper() == "Y":
-                    LABELS.append(label)
-                    with open(LABELS_FN, "w") as f:
-                        json.dump(LABELS, f)
-                    print(f"Added '{label}' to labels.")
-
+                labeled_it = True
+            else:
+                similar_label, similarity = neardup.query(entry["description"])
+                if similarity >= NEARDUP_AUTO_THRESHOLD:
+                    log.info(
+                        f"Near-duplicate ({similarity:.0%} similar) is "
+                        f"labeled '{similar_label}'; applying it."
+                    )
                     add_label(
-                        entry, label, output_writer, completed_de_ids, knowns
+                        entry,
+                        similar_label,
+                        store,
+                        model,
+                        neardup,
                     )
                     labeled_it = True
+                elif similarity >= NEARDUP_SUGGEST_THRESHOLD:
+                    suggestion = similar_label
+
+            default = suggestion or ""
+            entry_completer = completer
+            if not labeled_it:
+                suggestions = suggester.suggest(entry["description"])
+            if suggestions:
+                if suggestion is None:
+                    default = suggestions[0][0]
+                # Likeliest labels first when completing.
+                ranked = [label for label, _ in suggestions]
+                entry_completer = WordCompleter(
+                    ranked + [label for label in LABELS if label not in ranked]
+                )
+
+            while not labeled_it:
+                print(entry["description"])
+                if suggestion is not None:
+                    print(
+                        f"A similar entry ({similarity:.0%}) is labeled "
+                        f"'{suggestion}'. Press Enter to accept."
+                    )
+                    if suggestions:
+                        print(f"Suggested: {format_suggestions(suggestions)}")
+                elif suggestions:
+                    print(
+                        f"Suggested: {format_suggestions(suggestions)}. "
+                        "Press Enter to accept the first."
+                    )
+
+                try:
+                    label = prompt(
+                        PROMPT,
+                        completer=entry_completer,
+                        complete_while_typing=True,
+                        default=default,
+                    )
+                except EOFError:
+                    log.info("User quit.")
+                    print("Goodbye!")
+                    sys.exit()
+
+                if label == "":
+                    label = "other"
+
+                if label == "?":
+                    print_instructions()
                     print()
-                elif add_yn.upper() == "N":
-                    log.info("User chose not to add new label.")
-                    print("OK. Now what?")
                     continue
+
+                if label not in LABELS:
+                    log.info(f"User entered invalid label: {label}")
+                    add_yn = prompt(
+                        f"Do you want to add '{label}' as a new label? "
+                        "(y/n) >",
+                        validator=YNValidator(),
+                    )
+                    if add_yn.upper() == "Y":
+                        LABELS.append(label)
+                        with open(LABELS_FN, "w") as f:
+                            json.dump(LABELS, f)
+                        print(f"Added '{label}' to labels.")
+
+                        add_label(
+                            entry,
+                            label,
+                            store,
+                            model,
+                            neardup,
+                        )
+                        labeled_it = True
+                        print()
+                    elif add_yn.upper() == "N":
+                        log.info("User chose not to add new label.")
+                        print("OK. Now what?")
+                        continue
+                    else:
+                        print("Try again.")
+                        print()
                 else:
-                    print("Try again.")
+                    add_label(
+                        entry,
+                        label,
+                        store,
+                        model,
+                        neardup,
+                    )
+                    labeled_it = True
                     print()
-            else:
-                add_label(
-                    entry, label, output_writer, completed_de_ids, knowns
-                )
-                labeled_it = True
-                print()
+            suggester.record(suggestions, label)
+    finally:
+        # However the loop ends (Ctrl-D, Ctrl-C or an error), keep every
+        # label: the store commits in batches.
+        prefetcher.close()
+        log.info(f"Suggestions: {suggester.summary()}")
+        model.flush()
+        model.checkpoint()
+        store.export_csv(OUTPUT_FN)
+        store.close()
 
-    output_f.close()
     log.info("Done.")
     print("Done!")
@@ -0,0 +1,284 @@
+"""
+SQLite store of labeled docket entries, for the labelers.
+
+The labelers used to read all of their CSV file at startup into a list of
+labeled IDs and a dict of known descriptions, and labeler.py rewrote all
+of labeled.csv on exit, so both got slower as the labeled set grew.
+LabelStore keeps the labels in an SQLite database in WAL mode, indexed by
+docket entry ID, docket ID and description key (the upper-cased
+description the labelers match on), so opening it, checking whether an
+entry or description is already labeled, and adding a label all cost the
+same however many labels there are. Labels are committed in batches of
+COMMIT_EVERY, or every COMMIT_INTERVAL seconds, and on close().
+
+The classifiers still read CSV: export_csv() writes the store out in
+either dataset layout. The first time a store is opened next to an
+existing CSV file, the labelers import it, and exporting over a CSV file
+first imports any of its rows the store doesn't have (from an older
+session, say, or added by hand), so they aren't lost. The store keeps one
+row per docket entry and RECAP document: importing skips repeats, like
+the exact duplicates in labeled.csv.
+
+    python -m de_classifier.labelstore [--db labels3.sqlite3]
+        {stats,import,export} [--csv output3.csv] [--layout output3]
+"""
+
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from de_classifier.dataset import (
+    CHUNK_SIZE,
+    LAYOUTS,
+    Record,
+    iter_records,
+    open_text,
+)
+
+LABELS3_DB_FN = "labels3.sqlite3"
+COMMIT_EVERY = 20
+COMMIT_INTERVAL = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS labels (
+    id INTEGER PRIMARY KEY,
+    de_id INTEGER NOT NULL,
+    doc_id INTEGER,
+    docket_id INTEGER,
+    description TEXT NOT NULL,
+    desc_key TEXT NOT NULL,
+    label TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS labels_de_id ON labels (de_id);
+CREATE INDEX IF NOT EXISTS labels_docket_id ON labels (docket_id);
+CREATE INDEX IF NOT EXISTS labels_desc_key ON labels (desc_key);
+"""
+
+
+def description_key(description):
+    """What the labelers match descriptions on."""
+    return description.upper()
+
+
+def _id(value):
+    # CSV files have "" for missing IDs.
+    return None if value == "" else value
+
+
+class LabelStore:
+    """
+    Labeled docket entries in the SQLite database at `path`. Reads work
+    from any thread (the prefetcher looks labels up in the background);
+    writes should come from one.
+    """
+
+    def __init__(self, path=LABELS3_DB_FN, commit_every=COMMIT_EVERY):
+        self.path = str(path)
+        self.commit_every = commit_every
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self._count = conn.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+        self._uncommitted = 0
+        self._committed_at = time.monotonic()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            # Durable at checkpoints rather than at every commit; WAL keeps
+            # the database consistent either way.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def __len__(self):
+        return self._count
+
+    def has(self, de_id, doc_id=None):
+        """
+        Whether docket entry `de_id` is labeled. Entries without a
+        description have a row per RECAP document, so `doc_id` tells them
+        apart.
+        """
+        return (
+            self._conn()
+            .execute(
+                "SELECT 1 FROM labels WHERE de_id = ? AND doc_id IS ? "
+                "LIMIT 1",
+                (de_id, _id(doc_id)),
+            )
+            .fetchone()
+            is not None
+        )
+
+    def get(self, key, default=None):
+        """
+        The first label given to a description with description_key()
+        `key`, or `default`. Lets the store stand in for a dict of knowns.
+        """
+        row = (
+            self._conn()
+            .execute(
+                "SELECT label FROM labels WHERE desc_key = ? "
+                "ORDER BY id LIMIT 1",
+                (key,),
+            )
+            .fetchone()
+        )
+        return row[0] if row is not None else default
+
+    def known_label(self, description):
+        return self.get(description_key(description))
+
+    def add(self, de_id, description, label, docket_id=None, doc_id=None):
+        """Add a label, committing once a batch is due."""
+        self._conn().execute(
+            "INSERT INTO labels "
+            "(de_id, doc_id, docket_id, description, desc_key, label) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                de_id,
+                doc_id,
+                docket_id,
+                description,
+                description_key(description),
+                label,
+            ),
+        )
+        self._count += 1
+        self._uncommitted += 1
+        if (
+            self._uncommitted >= self.commit_every
+            or time.monotonic() - self._committed_at >= COMMIT_INTERVAL
+        ):
+            self.commit()
+
+    def commit(self):
+        self._conn().commit()
+        self._uncommitted = 0
+        self._committed_at = time.monotonic()
+
+    def import_csv(self, fn, layout="output3"):
+        """
+        Add the Records of a CSV file whose docket entry and document
+        aren't in the store yet. Returns how many were added.
+        """
+        conn = self._conn()
+        before = conn.total_changes
+        # Every row, including each document of an entry without a
+        # description, but each only once.
+        for chunk in iter_records(fn, **LAYOUTS[layout], dedupe=False):
+            conn.executemany(
+                "INSERT INTO labels "
+                "(de_id, doc_id, docket_id, description, desc_key, label) "
+                "SELECT ?, ?, ?, ?, ?, ? WHERE NOT EXISTS ("
+                "SELECT 1 FROM labels WHERE de_id = ? AND doc_id IS ?)",
+                [
+                    (
+                        r.de_id,
+                        _id(r.doc_id),
+                        _id(r.docket_id),
+                        r.description,
+                        description_key(r.description),
+                        r.label,
+                        r.de_id,
+                        _id(r.doc_id),
+                    )
+                    for r in chunk
+                ],
+            )
+        self.commit()
+        added = conn.total_changes - before
+        self._count += added
+        return added
+
+    def records(self, chunk_size=CHUNK_SIZE, start=0):
+        """
+        Yield lists of up to `chunk_size` Records, oldest first, skipping
+        the first `start`.
+        """
+        cursor = self._conn().execute(
+            "SELECT de_id, description, label, docket_id, doc_id "
+            "FROM labels ORDER BY id LIMIT -1 OFFSET ?",
+            (start,),
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield [Record(*row) for row in rows]
+
+    def export_csv(self, fn, layout="output3", header_row=None):
+        """
+        Write every label to `fn` (compressed if it ends in .gz or .bz2) in
+        a dataset layout, atomically. Layouts with a header get
+        `header_row`, or their column names. Rows of an existing `fn` that
+        the store doesn't have are imported first. Returns how many.
+        """
+        self.commit()
+        path = Path(fn)
+        merged = self.import_csv(fn, layout) if path.exists() else 0
+        columns = LAYOUTS[layout]["columns"]
+        # Keeps the suffix, so open_text() compresses the same way.
+        tmp = path.with_name(".tmp." + path.name)
+        with open_text(tmp, "w") as f:
+            writer = csv.writer(f)
+            if LAYOUTS[layout]["header"]:
+                writer.writerow(header_row or columns)
+            for chunk in self.records():
+                writer.writerows(
+                    [getattr(record, column) for column in columns]
+                    for record in chunk
+                )
+        os.replace(tmp, path)
+        return merged
+
+    def close(self):
+        self.commit()
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def open_store(path, csv_fn, layout="output3"):
+    """
+    Open the store at `path`, importing `csv_fn` into it first if the
+    store is new and the CSV file exists.
+    """
+    store = LabelStore(path)
+    if len(store) == 0 and Path(csv_fn).exists():
+        added = store.import_csv(csv_fn, layout)
+        print(f"Imported {added} labels from {csv_fn} into {path}.")
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="de_classifier.labelstore")
+    parser.add_argument("command", choices=("stats", "import", "export"))
+    parser.add_argument("--db", default=LABELS3_DB_FN)
+    parser.add_argument("--csv", default="output3.csv")
+    parser.add_argument("--layout", choices=LAYOUTS, default="output3")
+    args = parser.parse_args()
+
+    store = LabelStore(args.db)
+    if args.command == "import":
+        added = store.import_csv(args.csv, args.layout)
+        print(f"Imported {added} labels from {args.csv}.")
+    elif args.command == "export":
+        store.export_csv(args.csv, args.layout)
+        print(f"Exported {len(store)} labels to {args.csv}.")
+    print(f"{args.db}: {len(store)} labels.")
+    store.close()
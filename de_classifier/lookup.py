@@ -0,0 +1,134 @@
+"""
+Label lookup in front of the model.
+
+A lot of docket entries are boilerplate that only differs in dates, case
+numbers, phone numbers and names, e.g.
+
+    Minute Entry for proceedings held before Judge Lewis A. Kaplan:
+    Video-Conference held on 11/25/2024. (Court Reporter Devon Gerber)
+
+template() masks those spans (the ones normalize.py replaces), so every
+such entry shares one template. LabelLookup maps exact descriptions (like
+the labelers' `knowns`) and templates to the label they were given, and
+CachedPredictor only sends the descriptions it can't find to the model.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+from de_classifier.dataset import iter_records
+from de_classifier.normalize import PLACEHOLDERS, masker
+
+# Marks a key that was seen with more than one label. A string, rather
+# than a sentinel object, so it survives pickling to worker processes.
+AMBIGUOUS = "\0ambiguous"
+
+# The spans normalize.py replaces, masked as "<DATE>" etc.
+_mask = masker({kind: f"<{kind.upper()}>" for kind in PLACEHOLDERS})
+_SPACE = re.compile(r"\s+")
+
+
+def template(description):
+    """`description`, uppercased, with its variable spans masked."""
+    return _SPACE.sub(" ", _mask(description)).strip().upper()
+
+
+def _key(text):
+    return hashlib.blake2b(text.encode(), digest_size=8).digest()
+
+
+class LabelLookup:
+    """
+    Exact and template lookups of known labels. Keys are 8-byte hashes, so
+    the descriptions themselves aren't kept. Keys seen with conflicting
+    labels are left to the model.
+    """
+
+    def __init__(self):
+        self.exact = {}
+        self.templates = {}
+        self.exact_hits = 0
+        self.template_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _set(mapping, key, label):
+        existing = mapping.get(key)
+        if existing is None:
+            mapping[key] = label
+        elif existing != label:
+            mapping[key] = AMBIGUOUS
+
+    def add(self, description, label):
+        self._set(self.exact, _key(description.upper()), label)
+        self._set(self.templates, _key(template(description)), label)
+
+    def get(self, description):
+        """The known label for `description`, or None."""
+        label = self.exact.get(_key(description.upper()))
+        if label is not None and label != AMBIGUOUS:
+            self.exact_hits += 1
+            return label
+        label = self.templates.get(_key(template(description)))
+        if label is not None and label != AMBIGUOUS:
+            self.template_hits += 1
+            return label
+        self.misses += 1
+        return None
+
+    def stats(self):
+        lookups = self.exact_hits + self.template_hits + self.misses
+        hits = self.exact_hits + self.template_hits
+        return {
+            "exact_hits": self.exact_hits,
+            "template_hits": self.template_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    @classmethod
+    def from_csv(cls, fn, **kwargs):
+        """Build from a labeled CSV file; see iter_records()."""
+        lookup = cls()
+        for chunk in iter_records(fn, **kwargs):
+            for record in chunk:
+                lookup.add(record.description, record.label)
+        return lookup
+
+
+class CachedPredictor:
+    """
+    Wraps a model (see model.py), answering from a LabelLookup where it
+    can. Without a lookup, everything goes to the model.
+    """
+
+    def __init__(self, model, lookup=None):
+        self.model = model
+        self.lookup = lookup
+
+    def predict_best(self, descriptions):
+        """
+        The likeliest label for each description and its probability, as
+        two lists, and how many of them came from the lookup (those have
+        probability 1).
+        """
+        labels = [None] * len(descriptions)
+        if self.lookup is not None:
+            labels = [self.lookup.get(d) for d in descriptions]
+        probabilities = [1.0] * len(descriptions)
+        misses = [i for i, label in enumerate(labels) if label is None]
+        if misses:
+            proba = self.model.predict_proba([descriptions[i] for i in misses])
+            best = proba.argmax(axis=1)
+            classes = self.model.classes
+            for i, code, p in zip(
+                misses, best, proba[np.arange(len(best)), best]
+            ):
+                labels[i] = classes[code]
+                probabilities[i] = float(p)
+        return labels, probabilities, len(descriptions) - len(misses)
+
+    def predict(self, descriptions):
+        return self.predict_best(descriptions)[0]
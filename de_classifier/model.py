@@ -0,0 +1,276 @@
+"""
+Train-once model artifacts.
+
+`train` fits the classify3.py pipeline (TF-IDF or hashed features, then
+Naive Bayes) on all of output3.csv and saves it as an artifact directory:
+
+    meta.json           artifact version, labels, feature mode,
+                        preprocessing config
+    vectorizer.joblib   the fitted vectorizer
+    classifier.joblib   the fitted classifier
+
+`predict` loads an artifact and labels descriptions given as arguments, or
+one per line on stdin, without retraining. With --lookup LABELED_CSV,
+descriptions already labeled there (see lookup.py) get that label:
+
+    python -m de_classifier.model train [--input output3.csv] [--out model]
+        [--features {tfidf,hashing}] [--no-idf] [--[no-]normalize]
+        [--workers N]
+    python -m de_classifier.model predict [--model model]
+        [--lookup LABELED_CSV] "MOTION to seal"
+
+Artifacts are loaded lazily, and large numpy arrays are memory-mapped
+rather than read into memory.
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import sklearn
+from sklearn.naive_bayes import MultinomialNB
+
+from de_classifier.dataset import LABELS3_FN, LAYOUTS
+from de_classifier.features import (
+    FEATURE_MODES,
+    fit_vectorize,
+    make_vectorizer,
+)
+from de_classifier.lookup import CachedPredictor, LabelLookup
+from de_classifier.preprocessing import (
+    NORMALIZE,
+    Preprocessor,
+    get_preprocessor,
+)
+
+ARTIFACT_VERSION = 1
+MODEL_DIR = "model"
+META_FN = "meta.json"
+VECTORIZER_FN = "vectorizer.joblib"
+CLASSIFIER_FN = "classifier.joblib"
+
+
+class Model:
+    """
+    A fitted vectorizer and classifier, plus what's needed to use them on
+    raw descriptions: the label list (the classifier predicts label codes)
+    and the preprocessing it was trained with.
+    """
+
+    def __init__(
+        self,
+        vectorizer,
+        classifier,
+        labels,
+        preprocessor,
+        features=None,
+        path=None,
+    ):
+        self._vectorizer = vectorizer
+        self._classifier = classifier
+        self.labels = list(labels)
+        self.preprocessor = preprocessor
+        self.features = features or {"mode": "tfidf", "idf": True}
+        self.path = Path(path) if path is not None else None
+
+    def __getstate__(self):
+        # A saved model is sent to worker processes without its arrays;
+        # each one memory-maps them from `path`.
+        state = self.__dict__.copy()
+        if self.path is not None:
+            state["_vectorizer"] = state["_classifier"] = None
+        return state
+
+    @property
+    def vectorizer(self):
+        if self._vectorizer is None:
+            self._vectorizer = joblib.load(
+                self.path / VECTORIZER_FN, mmap_mode="r"
+            )
+        return self._vectorizer
+
+    @property
+    def classifier(self):
+        if self._classifier is None:
+            self._classifier = joblib.load(
+                self.path / CLASSIFIER_FN, mmap_mode="r"
+            )
+        return self._classifier
+
+    @property
+    def classes(self):
+        """Label names, in the column order of predict_proba()."""
+        return [self.labels[code] for code in self.classifier.classes_]
+
+    def transform(self, descriptions):
+        return self.vectorizer.transform(
+            self.preprocessor.preprocess_descriptions(descriptions)
+        )
+
+    def predict(self, descriptions):
+        codes = self.classifier.predict(self.transform(descriptions))
+        return [self.labels[code] for code in codes]
+
+    def predict_proba(self, descriptions):
+        return self.classifier.predict_proba(self.transform(descriptions))
+
+    def save(self, path=MODEL_DIR):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        vectorizer = self.vectorizer
+        # stop_words_ holds every term min_df dropped; it's only there for
+        # introspection and can dwarf the rest of the model.
+        if hasattr(vectorizer, "stop_words_"):
+            del vectorizer.stop_words_
+        joblib.dump(vectorizer, path / VECTORIZER_FN)
+        joblib.dump(self.classifier, path / CLASSIFIER_FN)
+        meta = {
+            "artifact_version": ARTIFACT_VERSION,
+            "created": datetime.now(timezone.utc).isoformat(),
+            "sklearn_version": sklearn.__version__,
+            "labels": self.labels,
+            "features": self.features,
+            "preprocessing": self.preprocessor.config(),
+        }
+        with open(path / META_FN, "w") as f:
+            json.dump(meta, f, indent=2)
+        self.path = path
+
+    @classmethod
+    def load(cls, path=MODEL_DIR):
+        """
+        Read an artifact's metadata. The vectorizer and classifier are only
+        loaded when first used.
+        """
+        path = Path(path)
+        with open(path / META_FN) as f:
+            meta = json.load(f)
+        if meta["artifact_version"] != ARTIFACT_VERSION:
+            raise ValueError(
+                f"{path} is a version {meta['artifact_version']} artifact; "
+                f"expected version {ARTIFACT_VERSION}. Retrain it."
+            )
+        return cls(
+            None,
+            None,
+            meta["labels"],
+            Preprocessor.from_config(meta["preprocessing"]),
+            features=meta["features"],
+            path=path,
+        )
+
+
+def train(
+    dataset,
+    idx=None,
+    preprocessor=None,
+    feature_mode="tfidf",
+    idf=True,
+    workers=1,
+):
+    """
+    Fit a Model on the rows `idx` (default: all) of a preprocessed
+    LabeledDataset. In "hashing" mode, texts are hashed in chunks across
+    `workers` processes (None means one per CPU).
+    """
+    if preprocessor is None:
+        preprocessor = get_preprocessor()
+    vectorizer = make_vectorizer(feature_mode, idf=idf)
+    X = fit_vectorize(vectorizer, dataset.texts(idx), workers=workers)
+    classifier = MultinomialNB().fit(X, dataset.y(idx))
+    return Model(
+        vectorizer,
+        classifier,
+        dataset.labels,
+        preprocessor,
+        features={"mode": feature_mode, "idf": idf},
+    )
+
+
+def load_model(path=MODEL_DIR):
+    return Model.load(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="de_classifier.model")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_parser = commands.add_parser("train", help="train and save")
+    train_parser.add_argument("--input", default="output3.csv")
+    train_parser.add_argument("--labels", default=LABELS3_FN)
+    train_parser.add_argument("--out", default=MODEL_DIR)
+    train_parser.add_argument(
+        "--features", choices=FEATURE_MODES, default="tfidf"
+    )
+    train_parser.add_argument(
+        "--no-idf",
+        dest="idf",
+        action="store_false",
+        help="with --features hashing, skip fitting IDF weights",
+    )
+    train_parser.add_argument(
+        "--normalize",
+        action=argparse.BooleanOptionalAction,
+        default=NORMALIZE,
+        help="replace dates, case numbers etc. with placeholders first",
+    )
+    train_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="processes to hash features in (default: one per CPU)",
+    )
+    predict_parser = commands.add_parser("predict", help="label entries")
+    predict_parser.add_argument("--model", default=MODEL_DIR)
+    predict_parser.add_argument(
+        "--lookup", help="labeled CSV to look labels up in"
+    )
+    predict_parser.add_argument(
+        "--lookup-layout", choices=LAYOUTS, default="output3"
+    )
+    predict_parser.add_argument("descriptions", nargs="*")
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        from de_classifier.classify3 import load_dataset, preprocess
+        from de_classifier.ppcache import PreprocessCache
+
+        print("Loading data...")
+        dataset = load_dataset(args.input, args.labels)
+        print("Preprocessing...")
+        pp_cache = PreprocessCache()
+        preprocessor = Preprocessor(normalize=args.normalize)
+        preprocess(dataset, cache=pp_cache, preprocessor=preprocessor)
+        pp_cache.close()
+        print(f"Training on {len(dataset)} entries...")
+        model = train(
+            dataset,
+            preprocessor=preprocessor,
+            feature_mode=args.features,
+            idf=args.idf,
+            workers=args.workers,
+        )
+        model.save(args.out)
+        print(f"Saved model to {args.out}.")
+    else:
+        model = load_model(args.model)
+        descriptions = args.descriptions or [
+            line.rstrip("\n") for line in sys.stdin
+        ]
+        if not descriptions:
+            return
+        lookup = None
+        if args.lookup:
+            lookup = LabelLookup.from_csv(
+                args.lookup, **LAYOUTS[args.lookup_layout]
+            )
+        predictor = CachedPredictor(model, lookup)
+        labels, probabilities, _ = predictor.predict_best(descriptions)
+        for description, label, p in zip(descriptions, labels, probabilities):
+            print(f"{label}\t{p:.3f}\t{description}")
+
+
+if __name__ == "__main__":
+    main()
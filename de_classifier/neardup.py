@@ -0,0 +1,215 @@
+"""
+Near-duplicate lookup of labeled docket entries, with MinHash and LSH.
+
+The labelers already skip entries whose description exactly matches one
+they've seen, but entries that only differ in a date, a name or a docket
+number still go to a human one at a time. NearDuplicateIndex finds the
+most similar labeled description in well under a millisecond, so the
+labelers can apply or pre-fill its label.
+
+Descriptions are compared as sets of word 3-grams of their lowercased text,
+with dates, case numbers and other IDs masked as normalize.py does, so
+those don't count as differences. Names aren't masked: a capitalized word
+after a title isn't always a name, and entries like "Attorney Appearance"
+and "Attorney Substitution" mustn't look identical. Each one gets
+a MinHash signature of NUM_PERM values, and signatures are banded for
+locality-sensitive hashing: two descriptions become candidates if any band
+matches, and candidates are ranked by the fraction of signature values they
+share, which estimates their Jaccard similarity.
+
+The index is persisted as an append-only file (e.g. output3.minhash next
+to output3.csv): a header, then one record per labeled signature, so adding
+a label costs one small append.
+"""
+
+import logging
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from de_classifier.normalize import PLACEHOLDERS, fingerprint, masker
+
+# Bump when the signature computation changes; older files get rebuilt, as
+# they are when normalize.py's patterns change.
+INDEX_VERSION = 2
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 3
+SEED = 1
+# Largest prime below 2**32, so (a * x + b) fits in a uint64.
+_PRIME = np.uint64(4294967291)
+_MAGIC = b"DEMH"
+_HEADER = struct.Struct("<4sHHHI12s")
+_LABEL_LENGTH = struct.Struct("<H")
+
+log = logging.getLogger(__name__)
+
+_mask_ids = masker(
+    {kind: f"<{kind}>" for kind in PLACEHOLDERS if kind != "name"}
+)
+
+
+def shingles(description):
+    tokens = _mask_ids(description).lower().split()
+    if len(tokens) < SHINGLE_SIZE:
+        return {" ".join(tokens)}
+    return {
+        " ".join(tokens[i : i + SHINGLE_SIZE])
+        for i in range(len(tokens) - SHINGLE_SIZE + 1)
+    }
+
+
+class NearDuplicateIndex:
+    def __init__(self, path=None, num_perm=NUM_PERM, bands=BANDS, seed=SEED):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = Path(path) if path is not None else None
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)
+        self.signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._n = 0
+        self.labels = []
+        self._buckets = {}
+        self._seen = set()
+
+    def __len__(self):
+        return self._n
+
+    def signature(self, description):
+        hashed = np.fromiter(
+            (zlib.crc32(s.encode()) for s in shingles(description)),
+            dtype=np.uint64,
+        )
+        permuted = (np.outer(self._a, hashed) + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, signature[start : start + self.rows].tobytes()
+
+    def _insert(self, signature, label):
+        # Skip exact repeats; boilerplate would otherwise fill the buckets.
+        key = (signature.tobytes(), label)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        if self._n == len(self.signatures):
+            grown = np.empty(
+                (max(1024, 2 * self._n), self.num_perm), dtype=np.uint32
+            )
+            grown[: self._n] = self.signatures[: self._n]
+            self.signatures = grown
+        self.signatures[self._n] = signature
+        self.labels.append(label)
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(self._n)
+        self._n += 1
+        return True
+
+    def add(self, description, label):
+        """Index a labeled description, appending it to the file if any."""
+        signature = self.signature(description)
+        if not self._insert(signature, label) or self.path is None:
+            return
+        if not self.path.exists():
+            self.save()
+            return
+        with open(self.path, "ab") as f:
+            f.write(self._record(signature, label))
+
+    def extend(self, records):
+        """Index Records in memory, without touching the file."""
+        for record in records:
+            self._insert(self.signature(record.description), record.label)
+
+    def query(self, description):
+        """
+        The most similar labeled description's (label, similarity), or
+        (None, 0.0) if no description shares a band with it.
+        """
+        signature = self.signature(description)
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        if not candidates:
+            return None, 0.0
+        candidates = np.fromiter(candidates, dtype=np.int64)
+        similarity = (self.signatures[candidates] == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        return self.labels[candidates[best]], float(similarity[best])
+
+    def _header(self):
+        return _HEADER.pack(
+            _MAGIC,
+            INDEX_VERSION,
+            self.num_perm,
+            self.bands,
+            self.seed,
+            fingerprint().encode(),
+        )
+
+    def _record(self, signature, label):
+        encoded = label.encode()
+        return signature.tobytes() + _LABEL_LENGTH.pack(len(encoded)) + encoded
+
+    def save(self):
+        """Rewrite the whole file from memory."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(self._header())
+            for i in range(self._n):
+                f.write(self._record(self.signatures[i], self.labels[i]))
+        tmp.replace(self.path)
+
+    def load(self):
+        """
+        Read the file at `path`. Returns False, leaving the index empty, if
+        it's missing or was written with different settings.
+        """
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return False
+        if len(data) < _HEADER.size or data[: _HEADER.size] != self._header():
+            log.info(f"{self.path} is stale or unreadable; ignoring it.")
+            return False
+        size = self.num_perm * 4
+        offset = _HEADER.size
+        while offset + size + _LABEL_LENGTH.size <= len(data):
+            signature = np.frombuffer(
+                data, dtype=np.uint32, count=self.num_perm, offset=offset
+            )
+            offset += size
+            (length,) = _LABEL_LENGTH.unpack_from(data, offset)
+            offset += _LABEL_LENGTH.size
+            if offset + length > len(data):
+                break
+            label = data[offset : offset + length].decode()
+            offset += length
+            self._insert(signature.copy(), label)
+        if offset != len(data):
+            # A torn final append; rewrite so later appends stay aligned.
+            self.save()
+        return True
+
+
+def open_index(path, records):
+    """
+    Load the index at `path`, or build it from `records` (an iterable of
+    chunks of Records, e.g. iter_records()) and save it there.
+    """
+    index = NearDuplicateIndex(path)
+    if not index.load():
+        log.info(f"Building near-duplicate index at {path}.")
+        for chunk in records:
+            index.extend(chunk)
+        index.save()
+    return index
@@ -0,0 +1,125 @@
+"""
+Docket-text normalization ahead of preprocessing.
+
+Descriptions are full of high-cardinality spans: dates, times, case numbers
+like 1:21-cv-05807-LAK-VF, phone numbers, conference IDs and names. Each
+distinct one becomes its own feature (and, with bigrams, several), which
+inflates the vocabulary and slows fitting and prediction without telling
+the classifier much. normalize() replaces each such span with a typed
+placeholder token, e.g.
+
+    Status Conference held on 11/25/2024 before Judge Lewis A. Kaplan
+    Status Conference held on xxdate before Judge xxname
+
+All the patterns are alternatives of one compiled regex, so a description
+is scanned once; lookup.py's template() masks the same spans with its own
+placeholders (see masker()). Placeholders are plain lowercase words, so
+they survive lowercasing, strip patterns like "[^a-zA-Z]", lemmatizing and
+the vectorizers' tokenizers unchanged.
+
+Use it through Preprocessor(normalize=True), or compare vocabulary size and
+timings with and without it:
+
+    python -m de_classifier.bench_normalize [--input output3.csv]
+"""
+
+import hashlib
+import re
+from functools import partial
+
+PLACEHOLDERS = {
+    "email": "xxemail",
+    "confid": "xxconfid",
+    "case": "xxcase",
+    "phone": "xxphone",
+    "date": "xxdate",
+    "time": "xxtime",
+    "name": "xxname",
+    "num": "xxnum",
+}
+
+# Capitalized docket vocabulary that can follow a title without being a
+# name: "Attorney Appearance", "Judge Assignment", "Magistrate Judge".
+DOCKET_WORDS = (
+    "Admission Appearance Appointed Appointment Assignment Attorney "
+    "Bankruptcy Case Certificate Chief Civil Clerk Conference Consent "
+    "Counsel Court Courtroom Criminal Defender Deputy Designation "
+    "Discipline District Docket Entry Error Expenses Federal Fee Fees "
+    "Filing General Hac Hearing Information Judge Judgment Justice "
+    "Letter Magistrate Manual Minute Motion Notice Office Opening "
+    "Order Please Pro Proceedings Public Re Reassigned Reassignment "
+    "Recusal Referral Registration Report Reporter Request Review "
+    "Senior Service Signed States Status Substitution Terminated The "
+    "Transcript Transfer United Vice Withdrawal"
+).split()
+
+# A word of a name: "Lewis", "LaKeysha", "A." or "R", "Mr.", "II".
+_NAME_WORD = (
+    r"(?:(?:Mr|Ms|Mrs|Dr|Jr|Sr)\.|II|III|IV|[A-Z]\.?(?![\w'-])"
+    rf"|(?!(?:{'|'.join(DOCKET_WORDS)})\b)[A-Z][a-z][a-zA-Z'-]*)"
+)
+
+# Alternatives are tried in order at each position, so the more specific
+# patterns come first. The case-insensitive parts are scoped with (?i:...),
+# since names are recognized by their capitalization.
+_PATTERN = re.compile(
+    r"(?P<email>\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+)"
+    # "Conference ID: 123 456 789", "access code 1234567#".
+    r"|(?P<confid>(?i:\b(?:conference|meeting|access|participant)"
+    r"\s+(?:id|code|number|no\.?)|\bpasscode)[\s:#.]*\d[\d\s-]{2,}\d#?)"
+    # "1:21-cv-05807-LAK-VF", "21CV5807".
+    r"|(?P<case>(?i:\b\d:\d{2}-[a-z]{2}-\d{3,5}(?:-[a-z]{2,4})*"
+    r"|\b\d{2}[a-z]{2}\d{3,5}\b))"
+    r"|(?P<phone>(?:\+?1[ .-]?)?(?:\(\d{3}\)\s?|\b\d{3}[ .-])"
+    r"\d{3}[ .-]\d{4}\b)"
+    r"|(?P<date>\b\d{1,2}/\d{1,2}/\d{2,4}\b|\b\d{4}-\d{2}-\d{2}\b"
+    r"|(?i:\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)"
+    r"[a-z]*\.?\s+\d{1,2},\s+\d{4}\b))"
+    r"|(?P<time>(?i:\b\d{1,2}:\d{2}(?:\s*[ap]\.?m\b\.?)?))"
+    # A title followed by a name: "Judge Lewis A. Kaplan". The name has to
+    # end the run of capitalized words, so "Attorney Civil Case Opening"
+    # isn't one.
+    r"|(?P<name>(?P<title>\b(?:Judge|Justice|Magistrate|Reporter|Clerk"
+    r"|Attorney|Counsel|Deputy))"
+    rf"(?:\s+{_NAME_WORD}){{1,4}}(?![\w'-]|\s+[A-Z]))"
+    # The filer: "(Mohan, Andrew)", or clerk's initials at the end: "(jar)".
+    r"|(?P<filer>\([A-Z][\w'-]+, [A-Z][\w'. -]+\)|\([a-z]{2,4}\)(?=\s*$))"
+    r"|(?P<num>\b\d+(?:[.,]\d+)*\b)"
+)
+
+
+def masker(placeholders):
+    """
+    A function that replaces each high-cardinality span in a description
+    with the placeholder for its kind, from a dict like PLACEHOLDERS. Kinds
+    without a placeholder are left as they are.
+    """
+
+    def replace(match):
+        kind = match.lastgroup
+        if kind in ("name", "filer"):
+            if "name" not in placeholders:
+                return match[0]
+            if kind == "name":
+                return f"{match['title']} {placeholders['name']}"
+            return f"({placeholders['name']})"
+        return placeholders.get(kind, match[0])
+
+    return partial(_PATTERN.sub, replace)
+
+
+_mask = masker(PLACEHOLDERS)
+
+
+def normalize(description):
+    """`description` with its high-cardinality spans replaced."""
+    return _mask(description)
+
+
+def fingerprint():
+    """
+    A digest of the pattern and placeholders, which changes whenever
+    normalize()'s output can.
+    """
+    parts = [_PATTERN.pattern, *(f"{k}={v}" for k, v in PLACEHOLDERS.items())]
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()[:12]
@@ -0,0 +1,131 @@
+"""
+On-disk cache of preprocessed descriptions.
+
+Rows are keyed by a hash of the preprocessing version tag plus the raw
+description, so rerunning the classifiers over a mostly unchanged
+output3.csv only preprocesses the new rows. Changing the stopwords,
+lemmatizer or strip pattern changes the version tag, which makes the old
+rows unreachable; invalidate() deletes them. The invalidate command keeps
+the rows of the classifiers' preprocessing configuration (normalizing as
+NORMALIZE says), or of the one --normalize/--no-normalize gives.
+
+    python -m de_classifier.ppcache [stats|invalidate|clear]
+        [--normalize | --no-normalize]
+"""
+
+import argparse
+import hashlib
+import sqlite3
+
+PP_CACHE_FN = "pp_cache.sqlite3"
+# SQLite's default limit on host parameters is 999.
+LOOKUP_BATCH = 500
+
+
+def cache_key(description, version):
+    return hashlib.blake2b(
+        f"{version}\0{description}".encode(), digest_size=16
+    ).digest()
+
+
+class PreprocessCache:
+    def __init__(self, path=PP_CACHE_FN):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pp ("
+            "key BLOB PRIMARY KEY, version TEXT NOT NULL, pp TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def get_many(self, descriptions, version):
+        """Returns a dict of description -> preprocessed text for hits."""
+        found = {}
+        descriptions = list(descriptions)
+        for i in range(0, len(descriptions), LOOKUP_BATCH):
+            batch = {
+                cache_key(d, version): d
+                for d in descriptions[i : i + LOOKUP_BATCH]
+            }
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT key, pp FROM pp WHERE key IN ({placeholders})",
+                list(batch),
+            )
+            for key, pp in rows:
+                found[batch[key]] = pp
+        self.hits += len(found)
+        self.misses += len(descriptions) - len(found)
+        return found
+
+    def put_many(self, pairs, version):
+        """Stores (description, preprocessed text) pairs."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pp (key, version, pp) "
+                "VALUES (?, ?, ?)",
+                (
+                    (cache_key(description, version), version, pp)
+                    for description, pp in pairs
+                ),
+            )
+
+    def invalidate(self, version):
+        """
+        Drop every row not made under `version`. Returns the number of rows
+        deleted.
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM pp WHERE version != ?", (version,)
+            )
+        return cursor.rowcount
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM pp")
+
+    def stats(self):
+        rows = self.conn.execute("SELECT COUNT(*) FROM pp").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "rows": rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    from de_classifier.preprocessing import NORMALIZE, Preprocessor
+
+    parser = argparse.ArgumentParser(prog="de_classifier.ppcache")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=("stats", "invalidate", "clear"),
+        default="stats",
+    )
+    parser.add_argument(
+        "--normalize",
+        action=argparse.BooleanOptionalAction,
+        default=NORMALIZE,
+        help="the preprocessing whose rows invalidate keeps",
+    )
+    args = parser.parse_args()
+
+    cache = PreprocessCache()
+    if args.command == "invalidate":
+        version = Preprocessor(normalize=args.normalize).version_tag
+        print(f"Deleted {cache.invalidate(version)} stale rows.")
+    elif args.command == "clear":
+        cache.clear()
+        print("Cleared.")
+    print(cache.stats())
+    cache.close()
@@ -0,0 +1,94 @@
+"""
+Background prefetching for the labelers.
+
+Getting more dockets and their entries takes HTTP round trips, and the
+labelers used to make them between prompts, with the annotator waiting.
+Prefetcher runs the fetching in a background thread instead, keeping a
+bounded queue of up to `maxsize` items ready ahead of the prompt loop.
+
+It also looks each item up in `knowns` (upper-cased description -> label)
+as it goes, so items that will be auto-labeled come out with their label
+attached. The prompt loop still does the labeling, so the CSV writer, the
+online model and the near-duplicate index are only touched from one
+thread.
+"""
+
+import logging
+import queue
+import threading
+
+PREFETCH_SIZE = 200
+
+log = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class Prefetcher:
+    """
+    Iterate over (item, known_label) pairs from `items`, fetched ahead in a
+    background thread. `known_label` is None unless the item's description
+    (`describe(item)`) is in `knowns`. Items for which `skip(item)` is true
+    are dropped. An exception while fetching is raised from the iteration.
+    """
+
+    def __init__(
+        self,
+        items,
+        knowns=None,
+        describe=lambda item: item["description"],
+        skip=None,
+        maxsize=PREFETCH_SIZE,
+    ):
+        self.items = items
+        self.knowns = knowns if knowns is not None else {}
+        self.describe = describe
+        self.skip = skip
+        self.queue = queue.Queue(maxsize)
+        self._stop = threading.Event()
+        # A daemon, so quitting the labeler doesn't wait on the network.
+        self._thread = threading.Thread(
+            target=self._produce, name="prefetch", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _put(self, value):
+        while not self._stop.is_set():
+            try:
+                self.queue.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            for item in self.items:
+                if self.skip is not None and self.skip(item):
+                    continue
+                label = self.knowns.get(self.describe(item).upper())
+                if not self._put((item, label)):
+                    return
+        except Exception as e:
+            log.exception("Prefetching failed.")
+            self._put(e)
+        self._put(_DONE)
+
+    def __iter__(self):
+        while True:
+            value = self.queue.get()
+            if value is _DONE:
+                return
+            if isinstance(value, Exception):
+                raise value
+            yield value
+
+    def ready(self):
+        """How many items are waiting."""
+        return self.queue.qsize()
+
+    def close(self):
+        self._stop.set()
@@ -0,0 +1,228 @@
+"""
+Shared text preprocessing for the classifiers.
+
+Lowercases, drops English stopwords and lemmatizes docket entry
+descriptions. The stopword set and the lemmatizer are loaded once per
+process, and lemmas are memoized in a bounded LRU cache, so preprocessing a
+large corpus doesn't keep paying for NLTK setup.
+
+Big batches can be spread over a process pool; each worker process loads
+NLTK once and gets its descriptions in chunks. Results can also be kept in
+an on-disk PreprocessCache (see ppcache.py), keyed by `version_tag`.
+
+With `normalize`, high-cardinality spans like dates and case numbers are
+replaced with placeholder tokens first (see normalize.py). The default
+preprocessor, and everything that preprocesses for the classifiers, does
+that if NORMALIZE is set, so they all agree on the version tag. It's off
+until evaluate.py shows it doesn't cost accuracy.
+"""
+
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from de_classifier.normalize import fingerprint as normalize_fingerprint
+from de_classifier.normalize import normalize as normalize_description
+
+# Bump when preprocess_description() changes in a way that changes output.
+PREPROCESSING_VERSION = 1
+LEMMA_CACHE_SIZE = 2**16
+# Below this many unique descriptions, starting a pool costs more than it
+# saves.
+PARALLEL_MIN = 20_000
+CHUNK_SIZE = 5_000
+# Replace dates, case numbers, names etc. with placeholder tokens before
+# preprocessing; see normalize.py. Off until evaluate.py shows it doesn't
+# cost accuracy.
+NORMALIZE = False
+
+
+class Preprocessor:
+    """
+    Turns raw descriptions into lowercased, unstopped, lemmatized text.
+
+    `stops` and `lemmatizer` default to NLTK's English stopwords and
+    WordNetLemmatizer, loaded lazily on first use. `strip_pattern` is an
+    optional regex whose matches are replaced with spaces before tokenizing.
+    With `normalize`, descriptions are run through normalize.normalize()
+    first.
+    """
+
+    def __init__(
+        self,
+        stops=None,
+        lemmatizer=None,
+        strip_pattern=None,
+        cache_size=LEMMA_CACHE_SIZE,
+        normalize=False,
+    ):
+        self.stops = frozenset(stops) if stops is not None else None
+        self.lemmatizer = lemmatizer
+        self.strip_pattern = strip_pattern
+        self.cache_size = cache_size
+        self.normalize = normalize
+        self._strip_re = re.compile(strip_pattern) if strip_pattern else None
+        self._lemmatize = None
+
+    def __getstate__(self):
+        # lru_cache wrappers can't be pickled; workers build their own.
+        state = self.__dict__.copy()
+        state["_lemmatize"] = None
+        return state
+
+    def _load(self):
+        if self.stops is None:
+            from nltk.corpus import stopwords
+
+            self.stops = frozenset(stopwords.words("english"))
+        if self.lemmatizer is None:
+            from nltk.stem import WordNetLemmatizer
+
+            self.lemmatizer = WordNetLemmatizer()
+        self._lemmatize = lru_cache(maxsize=self.cache_size)(
+            self.lemmatizer.lemmatize
+        )
+
+    @property
+    def version_tag(self):
+        """
+        Identifies this preprocessing configuration: the code version plus a
+        digest of the stopwords, lemmatizer, strip pattern and whether (and
+        with which patterns) it normalizes. Output cached under one tag is not valid under another.
+        """
+        if self._lemmatize is None:
+            self._load()
+        lemmatizer = type(self.lemmatizer)
+        parts = [
+            f"{lemmatizer.__module__}.{lemmatizer.__qualname__}",
+            self.strip_pattern or "",
+            *sorted(self.stops),
+        ]
+        if self.normalize:
+            # Only when set, so existing tags (and caches) stay valid.
+            parts.extend(["\0normalize", normalize_fingerprint()])
+        digest = hashlib.sha1("\n".join(parts).encode()).hexdigest()
+        return f"{PREPROCESSING_VERSION}-{digest[:12]}"
+
+    def config(self):
+        """
+        A JSON-serializable description of this preprocessing, for storing
+        alongside trained models. See from_config().
+        """
+        if self._lemmatize is None:
+            self._load()
+        return {
+            "version": PREPROCESSING_VERSION,
+            "version_tag": self.version_tag,
+            "strip_pattern": self.strip_pattern,
+            "stops": sorted(self.stops),
+            "normalize": self.normalize,
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        """Rebuild a Preprocessor from config(), with NLTK's lemmatizer."""
+        return cls(
+            stops=config["stops"],
+            strip_pattern=config["strip_pattern"],
+            # Configs from before normalizing didn't record it.
+            normalize=config.get("normalize", False),
+        )
+
+    def preprocess_description(self, description):
+        if self._lemmatize is None:
+            self._load()
+        if self.normalize:
+            description = normalize_description(description)
+        lowered = description.lower()
+        if self._strip_re is not None:
+            lowered = self._strip_re.sub(" ", lowered)
+        stops = self.stops
+        lemmatize = self._lemmatize
+        return " ".join(
+            lemmatize(word) for word in lowered.split() if word not in stops
+        )
+
+    def preprocess_descriptions(
+        self, descriptions, workers=1, chunk_size=CHUNK_SIZE, cache=None
+    ):
+        """
+        Preprocess a list of descriptions, returning a list in the same
+        order. Repeated descriptions are only processed once.
+
+        With `workers` > 1 (None means one per CPU), large batches are split
+        into chunks of `chunk_size` and preprocessed in worker processes.
+
+        If a PreprocessCache is given, cached results are reused and only
+        the misses are preprocessed (and then added to the cache).
+        """
+        unique = list(dict.fromkeys(descriptions))
+        done = {}
+        if cache is not None:
+            version = self.version_tag
+            done = cache.get_many(unique, version)
+            unique = [d for d in unique if d not in done]
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1 or len(unique) < PARALLEL_MIN:
+            pps = [self.preprocess_description(d) for d in unique]
+        else:
+            chunks = [
+                unique[i : i + chunk_size]
+                for i in range(0, len(unique), chunk_size)
+            ]
+            pps = []
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self,),
+            ) as executor:
+                for chunk_pps in executor.map(_preprocess_chunk, chunks):
+                    pps.extend(chunk_pps)
+        if cache is not None and unique:
+            cache.put_many(zip(unique, pps), version)
+        done.update(zip(unique, pps))
+        return [done[description] for description in descriptions]
+
+    def cache_info(self):
+        """Hit/miss statistics for the lemma cache."""
+        if self._lemmatize is None:
+            return None
+        return self._lemmatize.cache_info()
+
+
+_worker = None
+
+
+def _init_worker(preprocessor):
+    global _worker
+    _worker = preprocessor
+
+
+def _preprocess_chunk(descriptions):
+    return [_worker.preprocess_description(d) for d in descriptions]
+
+
+_default = None
+
+
+def get_preprocessor():
+    """The process-wide default Preprocessor."""
+    global _default
+    if _default is None:
+        _default = Preprocessor(normalize=NORMALIZE)
+    return _default
+
+
+def preprocess_description(description):
+    return get_preprocessor().preprocess_description(description)
+
+
+def preprocess_descriptions(
+    descriptions, workers=1, chunk_size=CHUNK_SIZE, cache=None
+):
+    return get_preprocessor().preprocess_descriptions(
+        descriptions, workers=workers, chunk_size=chunk_size, cache=cache
+    )
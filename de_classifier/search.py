@@ -0,0 +1,341 @@
+"""
+Model and hyperparameter search.
+
+Tries every combination of a TF-IDF vectorizer config from VECTORIZER_GRID
+(n-gram range, min_df, sublinear tf) and a classifier from CLASSIFIERS
+(Naive Bayes, Complement NB, logistic regression, linear SVM, SGD) on one
+seeded train/test split, and prints a leaderboard of accuracy and macro F1
+against fit time and per-row prediction latency.
+
+Each vectorizer config is fitted once: its train and test matrices are
+saved under --cache-dir, keyed by the data, the split and the config, and
+shared by every classifier (and by later runs). Candidates are evaluated
+in parallel worker processes. With --budget, no new candidates are started
+once that many seconds have passed, and the leaderboard shows those that
+finished.
+
+    python -m de_classifier.search [--input output3.csv] [--layout output3]
+        [--seed 0] [--workers N] [--budget SECONDS] [--out search.json]
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.naive_bayes import ComplementNB, MultinomialNB
+from sklearn.svm import LinearSVC
+
+from de_classifier.classify3 import load_dataset, preprocess
+from de_classifier.dataset import LABELS3_FN, LAYOUTS
+from de_classifier.features import TFIDF_PARAMS
+from de_classifier.ppcache import PreprocessCache
+from de_classifier.preprocessing import NORMALIZE, Preprocessor
+
+CACHE_DIR = "feature_cache"
+CLASSIFIERS = {
+    "nb": lambda: MultinomialNB(),
+    "cnb": lambda: ComplementNB(),
+    "lr": lambda: LogisticRegression(max_iter=1000),
+    "svm": lambda: LinearSVC(),
+    "sgd": lambda: SGDClassifier(loss="modified_huber", random_state=0),
+}
+VECTORIZER_GRID = {
+    "ngram_range": [(1, 1), (1, 2), (1, 3)],
+    "min_df": [1, 2, 5],
+    "sublinear_tf": [False, True],
+}
+
+
+def vectorizer_configs(grid=VECTORIZER_GRID):
+    """Every combination of the grid's values, as dicts."""
+    keys = list(grid)
+    return [
+        dict(zip(keys, values))
+        for values in itertools.product(*(grid[key] for key in keys))
+    ]
+
+
+def split_fingerprint(dataset, train, test, version_tag):
+    """Identifies a preprocessed dataset and split, for feature cache keys."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(version_tag.encode())
+    for description in dataset.descriptions:
+        digest.update(description.encode() + b"\0")
+    for array in (dataset.desc_codes, dataset.label_codes, train, test):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """
+    Vectorized train and test matrices on disk, one set per vectorizer
+    config: <key>.train.npz, <key>.test.npz and <key>.json with the fit and
+    transform times.
+    """
+
+    def __init__(self, path=CACHE_DIR, fingerprint=""):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+
+    def key(self, params):
+        config = json.dumps(
+            {"fingerprint": self.fingerprint, **params}, sort_keys=True
+        )
+        return hashlib.blake2b(config.encode(), digest_size=16).hexdigest()
+
+    def _paths(self, params):
+        key = self.key(params)
+        return (
+            self.path / f"{key}.train.npz",
+            self.path / f"{key}.test.npz",
+            self.path / f"{key}.json",
+        )
+
+    def get(self, params):
+        """(X_train, X_test, timings), or None if not cached."""
+        train_fn, test_fn, meta_fn = self._paths(params)
+        if not meta_fn.exists():
+            return None
+        with open(meta_fn) as f:
+            timings = json.load(f)
+        return (
+            scipy.sparse.load_npz(train_fn),
+            scipy.sparse.load_npz(test_fn),
+            timings,
+        )
+
+    def put(self, params, X_train, X_test, timings):
+        self.path.mkdir(parents=True, exist_ok=True)
+        train_fn, test_fn, meta_fn = self._paths(params)
+        scipy.sparse.save_npz(train_fn, X_train)
+        scipy.sparse.save_npz(test_fn, X_test)
+        # Written last, so a partial entry is never read.
+        tmp = meta_fn.with_name(meta_fn.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(timings, f)
+        os.replace(tmp, meta_fn)
+
+
+def vectorize(cache, params, x_train, x_test):
+    """Fit one vectorizer config and cache its matrices, unless cached."""
+    if cache.get(params) is not None:
+        return params
+    vectorizer = TfidfVectorizer(**{**TFIDF_PARAMS, **params})
+    start = time.perf_counter()
+    X_train = vectorizer.fit_transform(x_train)
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    X_test = vectorizer.transform(x_test)
+    transform_s = time.perf_counter() - start
+    cache.put(
+        params,
+        X_train.tocsr(),
+        X_test.tocsr(),
+        {
+            "vectorizer_fit_s": fit_s,
+            "vectorizer_transform_s": transform_s,
+            "features": X_train.shape[1],
+        },
+    )
+    return params
+
+
+def evaluate(cache, params, classifier_name, y_train, y_test):
+    """Fit and score one candidate on cached features."""
+    X_train, X_test, timings = cache.get(params)
+    classifier = CLASSIFIERS[classifier_name]()
+    start = time.perf_counter()
+    classifier.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    y_pred = classifier.predict(X_test)
+    predict_s = time.perf_counter() - start
+    return {
+        "classifier": classifier_name,
+        **params,
+        "features": timings["features"],
+        "accuracy": accuracy_score(y_test, y_pred),
+        "macro_f1": f1_score(y_test, y_pred, average="macro"),
+        "fit_s": timings["vectorizer_fit_s"] + fit_s,
+        # Vectorizing and classifying, per test row.
+        "predict_us": (timings["vectorizer_transform_s"] + predict_s)
+        / len(y_test)
+        * 1e6,
+    }
+
+
+_worker_args = None
+
+
+def _init_worker(*args):
+    global _worker_args
+    _worker_args = args
+
+
+def _vectorize(params):
+    cache, x_train, x_test, _, _ = _worker_args
+    return vectorize(cache, params, x_train, x_test)
+
+
+def _evaluate(candidate):
+    cache, _, _, y_train, y_test = _worker_args
+    return evaluate(cache, *candidate, y_train, y_test)
+
+
+def search(
+    dataset,
+    train,
+    test,
+    version_tag,
+    configs=None,
+    classifiers=tuple(CLASSIFIERS),
+    workers=None,
+    budget=None,
+    cache_dir=CACHE_DIR,
+):
+    """
+    Evaluate every (vectorizer config, classifier) pair on a preprocessed
+    LabeledDataset split into `train` and `test` rows. Returns the results
+    of the candidates that finished within `budget` seconds (if given),
+    best accuracy first, and how many were skipped.
+    """
+    deadline = time.monotonic() + budget if budget else None
+    configs = configs or vectorizer_configs()
+    cache = FeatureCache(
+        cache_dir, split_fingerprint(dataset, train, test, version_tag)
+    )
+    args = (
+        cache,
+        dataset.texts(train),
+        dataset.texts(test),
+        dataset.y(train),
+        dataset.y(test),
+    )
+    results = []
+    skipped = 0
+    with ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count() or 1,
+        initializer=_init_worker,
+        initargs=args,
+    ) as executor:
+        # Each config's classifiers start as soon as its features are
+        # ready, rather than after every config has been vectorized.
+        vectorizing = {
+            executor.submit(_vectorize, params): params for params in configs
+        }
+        pending = set(vectorizing)
+        while pending:
+            timeout = None
+            if deadline is not None:
+                timeout = max(0, deadline - time.monotonic())
+            done, pending = wait(
+                pending, timeout=timeout, return_when=FIRST_COMPLETED
+            )
+            if not done:
+                # Out of time: drop what hasn't started, finish the rest.
+                for future in pending:
+                    if future.cancel():
+                        skipped += (
+                            len(classifiers) if future in vectorizing else 1
+                        )
+                done, pending = wait(pending)
+            for future in done:
+                if future.cancelled():
+                    continue
+                if future not in vectorizing:
+                    results.append(future.result())
+                elif deadline is None or time.monotonic() < deadline:
+                    params = future.result()
+                    pending |= {
+                        executor.submit(_evaluate, (params, name))
+                        for name in classifiers
+                    }
+                else:
+                    skipped += len(classifiers)
+    results.sort(key=lambda result: result["accuracy"], reverse=True)
+    return results, skipped
+
+
+COLUMNS = (
+    "classifier",
+    "ngram_range",
+    "min_df",
+    "sublinear_tf",
+    "features",
+    "accuracy",
+    "macro_f1",
+    "fit_s",
+    "predict_us",
+)
+
+
+def format_leaderboard(results):
+    lines = ["".join(f"{column:>13}" for column in COLUMNS)]
+    for result in results:
+        lines.append(
+            "".join(
+                (
+                    f"{result[column]:>13.4f}"
+                    if isinstance(result[column], float)
+                    else f"{str(result[column]):>13}"
+                )
+                for column in COLUMNS
+            )
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="de_classifier.search")
+    parser.add_argument("--input", default="output3.csv")
+    parser.add_argument("--layout", choices=LAYOUTS, default="output3")
+    parser.add_argument("--labels", default=LABELS3_FN)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--budget", type=float, default=None)
+    parser.add_argument(
+        "--classifiers", default=",".join(CLASSIFIERS), help="e.g. nb,lr"
+    )
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--out", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    dataset = load_dataset(args.input, args.labels, layout=args.layout)
+    print("Preprocessing...")
+    preprocessor = Preprocessor(normalize=NORMALIZE)
+    pp_cache = PreprocessCache()
+    preprocess(dataset, cache=pp_cache, preprocessor=preprocessor)
+    pp_cache.close()
+    train, test = dataset.split(seed=args.seed)
+    print(f"Training set: {len(train)}\nTesting set: {len(test)}\n")
+
+    start = time.perf_counter()
+    results, skipped = search(
+        dataset,
+        train,
+        test,
+        preprocessor.version_tag,
+        classifiers=args.classifiers.split(","),
+        workers=args.workers,
+        budget=args.budget,
+        cache_dir=args.cache_dir,
+    )
+    print(format_leaderboard(results))
+    print(
+        f"\n{len(results)} candidates in {time.perf_counter() - start:.1f}s"
+        + (f"; {skipped} skipped for time" if skipped else "")
+    )
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
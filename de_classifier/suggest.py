@@ -0,0 +1,90 @@
+"""
+Inline label suggestions for labeler3.py's prompt.
+
+Suggester wraps the warm, in-process online model (see online.py): for
+each entry the annotator sees, it predicts the TOP_K likeliest labels with
+their probabilities, so the prompt can pre-fill the first one (Enter
+accepts it) and show the rest. It's warmed up once at startup, so the
+preprocessor's resources are loaded before the first prompt, and a
+suggestion takes a millisecond or two.
+
+It keeps track of how long each suggestion took and whether the
+annotator went with it, and summary() reports the acceptance rate and
+latency percentiles.
+"""
+
+import logging
+import time
+
+import numpy as np
+
+TOP_K = 3
+
+log = logging.getLogger(__name__)
+
+
+class Suggester:
+    def __init__(self, model, top_k=TOP_K, clock=time.perf_counter):
+        self.model = model
+        self.top_k = top_k
+        self.clock = clock
+        self.latencies_ms = []
+        self.suggested = 0
+        self.accepted = 0
+
+    def warm_up(self):
+        """Make one throwaway prediction, so the first real one is fast."""
+        if self.model.fitted:
+            self.model.predict_proba(["warm up"])
+        return self
+
+    def suggest(self, description):
+        """
+        [(label, probability)] for the `top_k` likeliest labels, best
+        first, or [] if the model hasn't learned anything yet.
+        """
+        if not self.model.fitted:
+            return []
+        start = self.clock()
+        proba = self.model.predict_proba([description])[0]
+        top = np.argsort(proba)[::-1][: self.top_k]
+        suggestions = [(self.model.labels[i], float(proba[i])) for i in top]
+        latency_ms = (self.clock() - start) * 1000
+        self.latencies_ms.append(latency_ms)
+        log.debug(f"Suggested {suggestions} in {latency_ms:.2f} ms.")
+        return suggestions
+
+    def record(self, suggestions, label):
+        """Note whether the annotator chose the top suggestion."""
+        if not suggestions:
+            return
+        self.suggested += 1
+        accepted = suggestions[0][0] == label
+        self.accepted += accepted
+        log.info(
+            f"Suggestion '{suggestions[0][0]}' "
+            + ("accepted" if accepted else f"rejected for '{label}'")
+            + f"; acceptance rate {self.acceptance_rate():.1%}."
+        )
+
+    def acceptance_rate(self):
+        return self.accepted / self.suggested if self.suggested else 0.0
+
+    def summary(self):
+        latencies = np.asarray(self.latencies_ms)
+        summary = {
+            "suggested": self.suggested,
+            "accepted": self.accepted,
+            "acceptance_rate": self.acceptance_rate(),
+        }
+        if len(latencies):
+            summary.update(
+                latency_p50_ms=float(np.percentile(latencies, 50)),
+                latency_p95_ms=float(np.percentile(latencies, 95)),
+                latency_max_ms=float(latencies.max()),
+            )
+        return summary
+
+
+def format_suggestions(suggestions):
+    return "  ".join(f"{label} {p:.0%}" for label, p in suggestions)
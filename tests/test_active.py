@@ -0,0 +1,102 @@
+from unittest import TestCase
+
+import numpy as np
+import scipy.sparse
+
+from de_classifier.active import ActiveQueue, margin_uncertainty
+
+
+class FakeModel:
+    """Features and probabilities looked up by description."""
+
+    def __init__(self, features, proba):
+        self.features = features
+        self.proba = proba
+        self.n_learned = 0
+        self.fitted = True
+        self.transformed = []
+
+    def transform(self, descriptions):
+        self.transformed.extend(descriptions)
+        return scipy.sparse.csr_matrix(
+            [self.features[d] for d in descriptions], dtype=float
+        )
+
+    def predict_proba_features(self, X):
+        # Recover each row's description from its (unique) features.
+        by_row = {tuple(v): d for d, v in self.features.items()}
+        return np.array(
+            [self.proba[by_row[tuple(row)]] for row in X.toarray()]
+        )
+
+
+def items(*descriptions, known=()):
+    return [
+        ({"description": d}, "other" if d in known else None)
+        for d in descriptions
+    ]
+
+
+class ActiveQueueTest(TestCase):
+    def setUp(self):
+        self.model = FakeModel(
+            features={
+                "a": [1, 0, 0],
+                "b": [0, 1, 0],
+                "b2": [0, 0.995, 0.0998],
+                "c": [0, 0, 1],
+                "k": [1, 1, 0],
+            },
+            proba={
+                "a": [0.9, 0.1],
+                "b": [0.55, 0.45],
+                "b2": [0.5, 0.5],
+                "c": [0.6, 0.4],
+                "k": [1.0, 0.0],
+            },
+        )
+
+    def order(self, queue):
+        return [entry["description"] for entry, _ in queue]
+
+    def test_known_first_then_most_uncertain(self):
+        queue = ActiveQueue(
+            items("a", "k", "b", "c", known=("k",)),
+            self.model,
+            ready=lambda: 10,
+        )
+        self.assertEqual(self.order(queue), ["k", "b", "c", "a"])
+        # Known entries are never vectorized.
+        self.assertNotIn("k", self.model.transformed)
+
+    def test_unfitted_model_keeps_order(self):
+        self.model.fitted = False
+        queue = ActiveQueue(items("a", "b", "c"), self.model, ready=lambda: 3)
+        self.assertEqual(self.order(queue), ["a", "b", "c"])
+
+    def test_rescores_when_model_learns(self):
+        queue = ActiveQueue(items("a", "b", "c"), self.model, ready=lambda: 3)
+        picked = iter(queue)
+        self.assertEqual(next(picked)[0]["description"], "b")
+        # Now "a" is the uncertain one.
+        self.model.proba["a"] = [0.5, 0.5]
+        self.model.n_learned += 10
+        self.assertEqual(next(picked)[0]["description"], "a")
+        self.assertEqual(queue.rescores, 2)
+        # Unchanged model, no rescore.
+        next(picked)
+        self.assertEqual(queue.rescores, 2)
+
+    def test_diverse_skips_near_duplicates_of_recent_picks(self):
+        queue = ActiveQueue(
+            items("b", "b2", "c"),
+            self.model,
+            strategy="diverse",
+            ready=lambda: 3,
+        )
+        # "b2" is most uncertain, but "b" is nearly the same entry.
+        self.assertEqual(self.order(queue), ["b2", "c", "b"])
+
+    def test_margin_uncertainty(self):
+        proba = np.array([[0.7, 0.2, 0.1], [0.4, 0.35, 0.25]])
+        np.testing.assert_allclose(margin_uncertainty(proba), [0.5, 0.95])
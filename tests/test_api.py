@@ -0,0 +1,96 @@
+import json
+from http.server import BaseHTTPRequestHandler
+from unittest import TestCase
+
+import requests
+
+from de_classifier.api import APIClient, TokenBucket
+from tests.test_crawler import StubServerTestCase
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Fails each path's first requests as its name says, then succeeds."""
+
+    protocol_version = "HTTP/1.1"
+    failures = {
+        "/rate-limited": [(429, {"Retry-After": "7"})],
+        "/unavailable": [(503, {}), (503, {})],
+        "/missing": [(404, {})] * 10,
+    }
+
+    def do_GET(self):
+        seen = self.server.seen
+        seen.append((self.path, self.headers.get("Authorization")))
+        failures = self.failures.get(self.path, [])
+        attempt = sum(path == self.path for path, _ in seen) - 1
+        status, headers = (200, {})
+        if attempt < len(failures):
+            status, headers = failures[attempt]
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class APIClientTest(StubServerTestCase):
+    handler = FlakyHandler
+
+    def setUp(self):
+        super().setUp()
+        self.server.seen = []
+        self.now = 0.0
+        self.sleeps = []
+        self.client = APIClient(
+            token="secret",
+            rate_per_hour=3600,
+            burst=100,
+            clock=lambda: self.now,
+            sleep=self.sleep,
+        )
+        self.addCleanup(self.client.close)
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def test_honors_retry_after(self):
+        data = self.client(self.endpoint + "rate-limited")
+        self.assertEqual(data, {"path": "/rate-limited"})
+        # Retry-After, plus a second for the next token at 1 request/s.
+        self.assertEqual(self.sleeps, [8.0])
+        self.assertEqual(
+            self.server.seen, [("/rate-limited", "Token secret")] * 2
+        )
+
+    def test_backs_off_then_gives_up_on_client_errors(self):
+        self.assertEqual(
+            self.client(self.endpoint + "unavailable"),
+            {"path": "/unavailable"},
+        )
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertTrue(0 <= self.sleeps[0] <= 1 and 0 <= self.sleeps[1] <= 2)
+
+        with self.assertRaises(requests.HTTPError):
+            self.client(self.endpoint + "missing")
+        self.assertEqual(len(self.server.seen), 4)
+
+
+class TokenBucketTest(TestCase):
+    def test_limits_rate_after_burst(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(2, 3, clock=lambda: now[0], sleep=sleep)
+        for _ in range(5):
+            bucket.acquire()
+        self.assertEqual(sleeps, [0.5, 0.5])
@@ -0,0 +1,86 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from de_classifier.batch_predict import batch_predict
+from de_classifier.lookup import CachedPredictor
+from de_classifier.model import load_model
+from tests.test_evaluate import EXAMPLES
+from tests.test_model import example_model
+from tests.test_preprocessing import SuffixLemmatizer
+
+
+def load_test_model(path):
+    model = load_model(path)
+    # load_model() gives NLTK's lemmatizer; stand in for it.
+    model.preprocessor.lemmatizer = SuffixLemmatizer()
+    return model
+
+
+class BatchPredictTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.model_path = self.dir / "model"
+        example_model().save(self.model_path)
+        self.input_fn = self.dir / "input.csv"
+        with open(self.input_fn, "w") as f:
+            f.write("id,description\n")
+            for i, (description, _) in enumerate(EXAMPLES * 4):
+                f.write(f"{i},{description.upper()} {i}\n")
+        patcher = patch(
+            "de_classifier.batch_predict.load_model", load_test_model
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_batch(self, output_fn, **kwargs):
+        kwargs = {"chunk_size": 5, "workers": 1, **kwargs}
+        return batch_predict(
+            self.input_fn, output_fn, model_path=self.model_path, **kwargs
+        )
+
+    def test_resume_after_crash_matches_clean_run(self):
+        clean = self.dir / "clean.csv"
+        self.assertEqual(self.run_batch(clean), 28)
+
+        crashed = self.dir / "crashed.csv"
+        predict_best = CachedPredictor.predict_best
+        calls = 0
+
+        def crash_on_fourth_chunk(predictor, descriptions):
+            nonlocal calls
+            calls += 1
+            if calls == 4:
+                raise KeyboardInterrupt
+            return predict_best(predictor, descriptions)
+
+        with patch.object(
+            CachedPredictor, "predict_best", crash_on_fourth_chunk
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                self.run_batch(crashed)
+        checkpoint = Path(f"{crashed}.checkpoint")
+        self.assertEqual(json.loads(checkpoint.read_text())["rows"], 15)
+        # A torn write after the last checkpoint.
+        with open(crashed, "a") as f:
+            f.write("15,motion,0.9")
+
+        self.assertEqual(self.run_batch(crashed, resume=True), 28)
+        self.assertEqual(crashed.read_bytes(), clean.read_bytes())
+        self.assertFalse(checkpoint.exists())
+
+    def test_workers_keep_input_order(self):
+        serial = self.dir / "serial.csv"
+        parallel = self.dir / "parallel.csv"
+        self.run_batch(serial)
+        self.run_batch(parallel, workers=3, chunk_size=3)
+        self.assertEqual(parallel.read_bytes(), serial.read_bytes())
+        ids = [
+            line.split(",")[0]
+            for line in parallel.read_text().splitlines()[1:]
+        ]
+        self.assertEqual(ids, [str(i) for i in range(28)])
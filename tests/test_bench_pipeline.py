@@ -0,0 +1,52 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from de_classifier.bench_pipeline import compare, synthesize
+from de_classifier.dataset import LAYOUTS, iter_records
+
+ROWS = (
+    "Docket Entry ID,Document ID,Description,Label\n"
+    "1,,ORDER on 1/2/2024 in 1:21-cv-05807,order\n"
+    "2,,MOTION to Dismiss,motion\n"
+    "2,,MOTION to Dismiss,motion\n"
+)
+
+
+class SynthesizeTest(TestCase):
+    def test_scales_rows_with_fresh_ids(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = Path(tmp) / "labeled.csv"
+            src.write_text(ROWS)
+            out = Path(tmp) / "labeled.x3.csv.gz"
+            self.assertEqual(synthesize(src, out, 3), 6)
+            records = [
+                record
+                for chunk in iter_records(out, **LAYOUTS["labeled"])
+                for record in chunk
+            ]
+        self.assertEqual([r.de_id for r in records], list("123456"))
+        self.assertEqual(
+            records[0].description, "ORDER on 1/2/2024 in 1:21-cv-05807"
+        )
+        self.assertEqual([r.label for r in records], ["order", "motion"] * 3)
+        self.assertEqual(
+            {len(r.description) for r in records[::2]},
+            {len("ORDER on 1/2/2024 in 1:21-cv-05807")},
+        )
+
+
+class CompareTest(TestCase):
+    def test_flags_slower_stages(self):
+        def report(seconds):
+            stages = [
+                {"stage": "preprocess", "seconds": s, "peak_rss_mb": 100.0}
+                for s in seconds
+            ]
+            return {"corpora": [{"scale": 1, "stages": stages}]}
+
+        self.assertEqual(compare(report([1.0]), report([1.1])), [])
+        self.assertEqual(
+            compare(report([1.0]), report([2.0])),
+            [(1, "preprocess", "seconds", 1.0, 2.0)],
+        )
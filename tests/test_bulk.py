@@ -0,0 +1,105 @@
+import bz2
+import csv
+import gzip
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from de_classifier.batch_predict import iter_rows
+from de_classifier.bulk import BulkDialect, import_dump
+from de_classifier.dataset import iter_records
+
+COURTS = [
+    {"id": "nysd", "jurisdiction": "FD"},
+    {"id": "ca2", "jurisdiction": "F"},
+]
+DOCKETS = [
+    {"id": "1", "court_id": "nysd"},
+    {"id": "2", "court_id": "ca2"},
+    {"id": "3", "court_id": "nysd"},
+]
+ENTRIES = [
+    {"id": "10", "docket_id": "1", "description": 'MOTION to "Dismiss"'},
+    {"id": "11", "docket_id": "1", "description": ""},
+    {"id": "20", "docket_id": "2", "description": "OPINION"},
+    {"id": "30", "docket_id": "3", "description": "ORDER\nso ordered"},
+    {"id": "31", "docket_id": "3", "description": ""},
+]
+DOCUMENTS = [
+    {"id": "110", "docket_entry_id": "11", "description": "Exhibit A"},
+    {"id": "200", "docket_entry_id": "20", "description": "Slip opinion"},
+    {"id": "111", "docket_entry_id": "11", "description": "Exhibit B"},
+]
+
+
+def write_table(fn, rows, opener):
+    with opener(fn, "wt", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(
+            f, fieldnames=list(rows[0]), dialect=BulkDialect
+        )
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+class ImportDumpTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        # A small dump, compressed both ways.
+        self.dump = {}
+        for name, rows, opener, suffix in (
+            ("courts", COURTS, gzip.open, ".csv.gz"),
+            ("dockets", DOCKETS, bz2.open, ".csv.bz2"),
+            ("entries", ENTRIES, bz2.open, ".csv.bz2"),
+            ("documents", DOCUMENTS, gzip.open, ".csv.gz"),
+        ):
+            self.dump[name] = self.dir / (name + suffix)
+            write_table(self.dump[name], rows, opener)
+
+    def test_filters_and_falls_back_to_documents(self):
+        out_fn = self.dir / "output3.csv"
+        stats = import_dump(
+            self.dump["entries"],
+            out_fn,
+            documents_fn=self.dump["documents"],
+            dockets_fn=self.dump["dockets"],
+            courts_fn=self.dump["courts"],
+            chunk_size=2,
+        )
+        [records] = iter_records(out_fn, dedupe=False)
+        self.assertEqual(
+            [
+                (r.de_id, r.doc_id, r.docket_id, r.description, r.label)
+                for r in records
+            ],
+            [
+                ("10", "", "1", 'MOTION to "Dismiss"', ""),
+                ("30", "", "3", "ORDER\nso ordered", ""),
+                ("11", "110", "1", "Exhibit A", ""),
+                ("11", "111", "1", "Exhibit B", ""),
+            ],
+        )
+        self.assertEqual(
+            stats,
+            {
+                "entries": 5,
+                "out_of_jurisdiction": 1,
+                "without_description": 2,
+                "documents": 2,
+                "rows": 4,
+            },
+        )
+        # Ready for batch_predict.py.
+        self.assertEqual(
+            [de_id for de_id, _ in iter_rows(out_fn, "output3")],
+            ["10", "30", "11", "11"],
+        )
+
+    def test_without_filters(self):
+        out_fn = self.dir / "output3.csv.gz"
+        stats = import_dump(self.dump["entries"], out_fn)
+        self.assertEqual(stats["rows"], 3)
+        [records] = iter_records(out_fn)
+        self.assertEqual([r.de_id for r in records], ["10", "20", "30"])
+        self.assertEqual(list(self.dir.glob(".tmp.*")), [])
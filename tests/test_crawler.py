@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+from urllib.parse import parse_qs, urlparse
+
+from de_classifier.api import APIClient
+from de_classifier.crawler import fetch_entries
+
+# docket ID -> pages of docket entry results
+DOCKETS = {
+    1: [
+        [{"id": 11, "description": "COMPLAINT"}],
+        [
+            {
+                "id": 12,
+                "description": "",
+                "recap_documents": [
+                    {"id": 120, "description": "Exhibit A"},
+                    {"id": 121, "description": "Exhibit B"},
+                ],
+            }
+        ],
+    ],
+    2: [[{"id": 21, "description": "ANSWER"}, {"id": 22, "description": ""}]],
+    3: [[{"id": 31, "description": "ORDER"}]],
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        # Later dockets answer first, to shuffle completion order.
+        query = parse_qs(urlparse(self.path).query)
+        docket_id = int(query["docket"][0])
+        page = int(query.get("page", ["0"])[0])
+        time.sleep(0.05 * (4 - docket_id))
+        pages = DOCKETS[docket_id]
+        next_url = None
+        if page + 1 < len(pages):
+            next_url = (
+                f"http://127.0.0.1:{server.server_port}/"
+                f"?docket={docket_id}&page={page + 1}"
+            )
+        body = json.dumps({"next": next_url, "results": pages[page]})
+        with server.lock:
+            server.in_flight -= 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServerTestCase(TestCase):
+    """Runs StubHandler on a local port for the duration of each test."""
+
+    handler = StubHandler
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = self.server.max_in_flight = 0
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_port}/"
+
+
+class FetchEntriesTest(StubServerTestCase):
+    def test_concurrent_paginated_and_ordered(self):
+        fetched = fetch_entries(
+            [1, 2, 3], get=APIClient(), concurrency=2, endpoint=self.endpoint
+        )
+        self.assertEqual([docket_id for docket_id, _ in fetched], [1, 2, 3])
+        self.assertEqual(
+            [
+                (entry["docket_entry_id"], entry["doc_id"])
+                for entry in fetched[0][1]
+            ],
+            [(11, None), (12, 120), (12, 121)],
+        )
+        # The entry with no description and no documents is skipped.
+        self.assertEqual(
+            [entry["description"] for entry in fetched[1][1]], ["ANSWER"]
+        )
+        self.assertEqual(self.server.max_in_flight, 2)
@@ -0,0 +1,80 @@
+import csv
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+from de_classifier.dataset import LABELED_COLUMNS, LabeledDataset, iter_records
+
+
+class Output3TestCase(TestCase):
+    """Writes a small output3.csv, with one duplicated row."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output3_fn = Path(self.tmp.name) / "output3.csv"
+        with open(self.output3_fn, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["ORDER granting motion", "order", "7", "1", ""])
+            writer.writerow(["COMPLAINT", "pleading", "7", "2", "20"])
+            writer.writerow(["ORDER granting motion", "order", "7", "1", ""])
+            writer.writerow(["ANSWER", "pleading", "8", "3", ""])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+class IterRecordsTest(Output3TestCase):
+    def test_chunks_and_dedupe(self):
+        chunks = list(iter_records(self.output3_fn, chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        records = [record for chunk in chunks for record in chunk]
+        self.assertEqual([r.de_id for r in records], ["1", "2", "3"])
+        self.assertEqual(records[1].doc_id, "20")
+        self.assertEqual(records[1].label, "pleading")
+
+    def test_labeled_layout(self):
+        fn = Path(self.tmp.name) / "labeled.csv"
+        with open(fn, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Docket Entry ID", "Document ID", "Desc", "L"])
+            writer.writerow(["5", "", "MOTION to dismiss", "motion"])
+        (record,) = next(iter_records(fn, LABELED_COLUMNS, header=True))
+        self.assertEqual(record.description, "MOTION to dismiss")
+        self.assertIsNone(record.docket_id)
+
+
+class LabeledDatasetTest(Output3TestCase):
+    def test_columns(self):
+        dataset = LabeledDataset.from_csv(
+            self.output3_fn, labels=["order", "pleading"]
+        )
+        self.assertEqual(len(dataset), 3)
+        self.assertEqual(dataset.de_ids.tolist(), [1, 2, 3])
+        self.assertEqual(dataset.label_codes.dtype, np.int8)
+        self.assertEqual(dataset.y().tolist(), [0, 1, 1])
+        self.assertEqual(
+            dataset.label_names(dataset.y()).tolist(),
+            ["order", "pleading", "pleading"],
+        )
+
+    def test_descriptions_are_interned_and_unknown_labels_kept(self):
+        dataset = LabeledDataset.from_csv(
+            self.output3_fn, labels=["order"], dedupe=False
+        )
+        self.assertEqual(len(dataset), 4)
+        self.assertEqual(len(dataset.descriptions), 3)
+        self.assertEqual(dataset.labels, ["order", "pleading"])
+
+    def test_split_is_a_seeded_permutation(self):
+        dataset = LabeledDataset.from_csv(self.output3_fn)
+        dataset.pp = [d.lower() for d in dataset.descriptions]
+        train, test = dataset.split(train_size=0.7, seed=1)
+        self.assertEqual((len(train), len(test)), (2, 1))
+        self.assertEqual(sorted([*train, *test]), [0, 1, 2])
+        again, _ = dataset.split(train_size=0.7, seed=1)
+        self.assertEqual(train.tolist(), again.tolist())
+        self.assertEqual(
+            dataset.texts(test), [dataset.pp[dataset.desc_codes[test[0]]]]
+        )
@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+from de_classifier.dataset import LabeledDataset, Record
+from de_classifier.evaluate import cross_validate
+
+EXAMPLES = [
+    ("motion to dismiss", "motion"),
+    ("motion to seal", "motion"),
+    ("motion for extension of time", "motion"),
+    ("order granting motion", "order"),
+    ("order denying motion", "order"),
+    ("order of dismissal", "order"),
+    ("notice of appearance", "appearance"),
+]
+
+
+def example_dataset():
+    """A small preprocessed LabeledDataset, with every description unique."""
+    records = [
+        Record(i, f"{description} {i}", label, None, None)
+        for i, (description, label) in enumerate(EXAMPLES * 6)
+    ]
+    dataset = LabeledDataset.from_chunks([records], ["motion"])
+    dataset.pp = [d.lower() for d in dataset.descriptions]
+    return dataset
+
+
+class CrossValidateTest(TestCase):
+    def setUp(self):
+        self.dataset = example_dataset()
+
+    def test_reproducible_and_parallel_matches_serial(self):
+        serial = cross_validate(self.dataset, k=3, seed=1, workers=1)
+        self.assertEqual(
+            cross_validate(self.dataset, k=3, seed=1, workers=2), serial
+        )
+        self.assertEqual(serial["folds"], 3)
+        self.assertEqual(len(serial["accuracy"]["per_fold"]), 3)
+        self.assertEqual(
+            sorted(serial["labels"]), ["appearance", "motion", "order"]
+        )
+        motion = serial["labels"]["motion"]
+        self.assertEqual(motion["support"], 18)
+        self.assertGreater(motion["recall"]["mean"], 0.5)
+        self.assertGreaterEqual(motion["recall"]["std"], 0)
@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+from de_classifier.features import (
+    fit_vectorize,
+    make_vectorizer,
+    vectorize_chunks,
+)
+
+TEXTS = [
+    f"{verb} {noun} {i}"
+    for i, (verb, noun) in enumerate(
+        [
+            ("motion", "dismiss"),
+            ("order", "granting motion"),
+            ("notice", "appearance"),
+            ("motion", "extension time"),
+            ("order", "dismissal"),
+        ]
+        * 5
+    )
+]
+
+
+def same(X, Y):
+    return X.shape == Y.shape and (X != Y).nnz == 0
+
+
+class FeaturesTest(TestCase):
+    def test_hashing_in_parallel_chunks_matches_whole(self):
+        vectorizer = make_vectorizer("hashing", idf=False)
+        X = vectorize_chunks(vectorizer, TEXTS, workers=3, chunk_size=4)
+        self.assertTrue(same(X, vectorizer.transform(TEXTS)))
+
+    def test_fit_vectorize_matches_fit_transform(self):
+        for mode, idf in [
+            ("hashing", False),
+            ("hashing", True),
+            ("tfidf", True),
+        ]:
+            expected = make_vectorizer(mode, idf=idf).fit_transform(TEXTS)
+            vectorizer = make_vectorizer(mode, idf=idf)
+            X = fit_vectorize(vectorizer, TEXTS, workers=2, chunk_size=4)
+            self.assertTrue(same(X, expected), (mode, idf))
+            # And the vectorizer is fitted for later transforms.
+            self.assertTrue(same(vectorizer.transform(TEXTS), expected))
@@ -0,0 +1,106 @@
+import json
+import tempfile
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+
+from de_classifier.api import APIClient
+from de_classifier.crawler import fetch_entries
+from de_classifier.httpcache import ResponseCache, cache_url
+from tests.test_crawler import StubHandler, StubServerTestCase
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    """Serves a page with an ETag, and 304s requests that already have it."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.seen.append((self.path, self.headers.get("If-None-Match")))
+        etag = '"v1"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ResponseCacheTest(StubServerTestCase):
+    handler = ETagHandler
+
+    def setUp(self):
+        super().setUp()
+        self.server.seen = []
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.now = 1000.0
+        self.cache = ResponseCache(
+            Path(tmp.name) / "http_cache",
+            max_age=60,
+            clock=lambda: self.now,
+        )
+        self.client = APIClient(cache=self.cache)
+        self.addCleanup(self.client.close)
+
+    def test_serves_fresh_entries_without_requests(self):
+        params = {"docket": 1, "fields": "id,description"}
+        first = self.client.get_json(self.endpoint, params)
+        second = self.client.get_json(self.endpoint, params)
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.server.seen), 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        # Different params are a different page.
+        self.client.get_json(self.endpoint, {"docket": 2})
+        self.assertEqual(len(self.server.seen), 2)
+
+    def test_revalidates_stale_entries(self):
+        body = self.client.get_json(self.endpoint + "page")
+        self.now += 120
+        self.assertEqual(self.client.get_json(self.endpoint + "page"), body)
+        self.assertEqual(
+            self.server.seen, [("/page", None), ("/page", '"v1"')]
+        )
+        self.assertEqual(self.cache.revalidated, 1)
+        # Revalidating made it fresh again.
+        self.client.get_json(self.endpoint + "page")
+        self.assertEqual(len(self.server.seen), 2)
+
+    def test_keys_on_full_url(self):
+        self.assertEqual(
+            cache_url("http://x/?a=1", {"b": "c,d"}), "http://x/?a=1&b=c%2Cd"
+        )
+        self.cache.put("http://x/?a=1", {"results": []})
+        self.assertEqual(
+            self.cache.get("http://x/?a=1")["body"], {"results": []}
+        )
+        self.assertIsNone(self.cache.get("http://x/?a=2"))
+
+
+class ReplayTest(StubServerTestCase):
+    handler = StubHandler
+
+    def test_replayed_crawl_makes_no_requests(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = ResponseCache(tmp.name, max_age=None)
+        client = APIClient(cache=cache)
+        self.addCleanup(client.close)
+        fetched = fetch_entries([1, 2, 3], get=client, endpoint=self.endpoint)
+        misses = cache.misses
+        self.server.shutdown()
+
+        self.assertEqual(
+            fetch_entries([1, 2, 3], get=client, endpoint=self.endpoint),
+            fetched,
+        )
+        self.assertEqual(cache.misses, misses)
+        self.assertEqual(cache.hits, misses)
@@ -0,0 +1,45 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from de_classifier import instrument
+
+
+@instrument.timed(rows=len)
+def load(n):
+    return list(range(n))
+
+
+class InstrumentTest(TestCase):
+    def tearDown(self):
+        instrument.disable()
+
+    def test_disabled_records_nothing(self):
+        with instrument.run("test"):
+            with instrument.stage("noop") as stage:
+                stage["rows"] = 3
+            self.assertEqual(load(2), [0, 1])
+        self.assertIsNone(instrument.finish_run())
+
+    def test_run_emits_one_json_line(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "metrics.jsonl"
+            instrument.enable(str(path), trace=True)
+            with instrument.run("test"):
+                load(5)
+                with instrument.stage("sum") as stage:
+                    stage["rows"] = 7
+            lines = path.read_text().splitlines()
+
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertEqual(record["run"], "test")
+        self.assertEqual(
+            [(s["stage"], s["rows"]) for s in record["stages"]],
+            [("load", 5), ("sum", 7)],
+        )
+        for stage in record["stages"]:
+            self.assertGreaterEqual(stage["seconds"], 0)
+            self.assertGreater(stage["peak_rss_mb"], 0)
+            self.assertIn("tracemalloc_peak_mb", stage)
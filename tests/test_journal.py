@@ -0,0 +1,71 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from de_classifier.crawler import entries_from_results
+from de_classifier.journal import FetcherJournal
+
+
+def entries(docket_id, *de_ids):
+    return entries_from_results(
+        [{"id": de_id, "description": f"Entry {de_id}"} for de_id in de_ids],
+        docket_id,
+    )
+
+
+class FetcherJournalTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "fetcher.jsonl"
+
+    def test_replays_dockets_and_entries(self):
+        journal = FetcherJournal(self.path)
+        for docket_id in (1, 2, 3):
+            journal.add_docket(docket_id, {"id": docket_id})
+        journal.add_entries(3, entries(3, 30, 31))
+        journal.add_entries(1, entries(1, 10))
+        journal.close()
+
+        state = FetcherJournal(self.path).load()
+        self.assertEqual(list(state.dockets), [1, 2, 3])
+        self.assertEqual(
+            state.dockets[2], {"docket": {"id": 2}, "entries": []}
+        )
+        self.assertEqual(list(state.pending), [2])
+        self.assertEqual(
+            [entry["docket_entry_id"] for entry in state.entries()],
+            [10, 30, 31],
+        )
+
+    def test_drops_torn_record(self):
+        journal = FetcherJournal(self.path)
+        journal.add_docket(1, {"id": 1})
+        journal.add_entries(1, entries(1, 10))
+        journal.close()
+        with open(self.path, "a") as f:
+            f.write('{"entries": 2, "data": [{"docket_')
+
+        state = FetcherJournal(self.path).load()
+        self.assertEqual(list(state.dockets), [1])
+        self.assertTrue(self.path.read_text().endswith("\n"))
+
+        # Appends after the repair replay cleanly.
+        journal = FetcherJournal(self.path)
+        journal.add_docket(2, {"id": 2})
+        journal.close()
+        self.assertEqual(list(FetcherJournal(self.path).load().pending), [2])
+
+    def test_compacts_superseded_records(self):
+        journal = FetcherJournal(self.path)
+        for _ in range(3):
+            journal.add_docket(1, {"id": 1})
+            journal.add_entries(1, entries(1, 10))
+        journal.close()
+        self.assertEqual(len(self.path.read_text().splitlines()), 6)
+
+        state = FetcherJournal(self.path).load()
+        self.assertEqual(len(self.path.read_text().splitlines()), 2)
+        self.assertEqual(state.lines, 2)
+        self.assertEqual(len(state.dockets[1]["entries"]), 1)
+        self.assertEqual(FetcherJournal(self.path).load().pending, {})
@@ -0,0 +1,37 @@
+import contextlib
+import io
+import os
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class PromptLabelTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # labeler.py reads the API token and labels.json when imported.
+        with patch.dict(os.environ, {"CL_API_TOKEN": "test"}):
+            with contextlib.chdir(ROOT):
+                from de_classifier import labeler
+        cls.labeler = labeler
+
+    def prompt(self, responses, similar_label=None):
+        with patch("builtins.input", side_effect=responses), patch(
+            "sys.stdout", new_callable=io.StringIO
+        ):
+            return self.labeler.prompt_label("MOTION to seal", similar_label)
+
+    def test_enter_accepts_suggestion(self):
+        self.assertEqual(self.prompt([""], similar_label="motion"), "motion")
+
+    def test_enter_without_suggestion_is_default_label(self):
+        self.assertEqual(self.prompt([""]), "other")
+
+    def test_letters_and_retries(self):
+        self.assertEqual(self.prompt(["?", "x", "o"], "motion"), "order")
+
+    def test_ctrl_d_exits(self):
+        with self.assertRaises(SystemExit):
+            self.prompt(EOFError())
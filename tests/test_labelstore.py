@@ -0,0 +1,119 @@
+import csv
+import gzip
+import tempfile
+import threading
+from pathlib import Path
+from unittest import TestCase
+
+from de_classifier.dataset import iter_records
+from de_classifier.labelstore import LabelStore, open_store
+
+ROWS = [
+    ("Motion to dismiss", "motion", "10", "1", ""),
+    ("Notice of appearance", "notice", "10", "2", "7"),
+    ("MOTION TO DISMISS", "order", "11", "3", ""),
+    # Another document of entry 2.
+    ("Exhibit A", "exhibit", "10", "2", "8"),
+    # An exact repeat, as in labeled.csv.
+    ("Motion to dismiss", "motion", "10", "1", ""),
+]
+
+
+class LabelStoreTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+        self.csv_fn = self.dir / "output3.csv"
+        with open(self.csv_fn, "w", newline="") as f:
+            csv.writer(f).writerows(ROWS)
+
+    def open(self, **kwargs):
+        store = open_store(self.dir / "labels3.sqlite3", self.csv_fn, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_imports_csv_once(self):
+        store = self.open()
+        self.assertEqual(len(store), 4)
+        store.close()
+        self.assertEqual(len(self.open()), 4)
+
+    def test_lookups(self):
+        store = self.open()
+        self.assertTrue(store.has(1))
+        self.assertTrue(store.has("2", "7"))
+        self.assertTrue(store.has(2, 8))
+        self.assertFalse(store.has(2))
+        self.assertFalse(store.has(2, 9))
+        self.assertFalse(store.has(4))
+        # First label wins, matching on the upper-cased description.
+        self.assertEqual(store.known_label("motion to dismiss"), "motion")
+        self.assertEqual(store.get("NOTICE OF APPEARANCE"), "notice")
+        self.assertIsNone(store.get("ORDER"))
+
+    def test_adds_are_batched_and_visible_to_other_threads(self):
+        store = LabelStore(self.dir / "labels3.sqlite3", commit_every=2)
+        self.addCleanup(store.close)
+        store.add(4, "Order", "order", docket_id=12)
+        self.assertTrue(store.has(4))
+
+        def lookup():
+            seen.append(store.has(4))
+
+        seen = []
+        thread = threading.Thread(target=lookup)
+        thread.start()
+        thread.join()
+        store.add(5, "Order granting motion", "order", docket_id=12)
+        thread = threading.Thread(target=lookup)
+        thread.start()
+        thread.join()
+        # Uncommitted until the batch of two is full.
+        self.assertEqual(seen, [False, True])
+        self.assertEqual(len(store), 2)
+
+    def test_export_round_trips(self):
+        store = self.open()
+        store.add(4, "Order", "order", docket_id=12, doc_id=None)
+        out_fn = self.dir / "export.csv.gz"
+        store.export_csv(out_fn)
+        with gzip.open(out_fn, "rt", newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(
+            rows,
+            [list(row) for row in ROWS[:4]]
+            + [["Order", "order", "12", "4", ""]],
+        )
+
+        labeled_fn = self.dir / "labeled.csv"
+        store.export_csv(labeled_fn, "labeled")
+        [records] = iter_records(
+            labeled_fn,
+            columns=("de_id", "doc_id", "description", "label"),
+            header=True,
+        )
+        self.assertEqual(
+            [(r.de_id, r.doc_id, r.label) for r in records],
+            [
+                ("1", "", "motion"),
+                ("2", "7", "notice"),
+                ("3", "", "order"),
+                ("4", "", "order"),
+            ],
+        )
+
+    def test_export_keeps_rows_only_in_the_csv(self):
+        store = self.open()
+        # Labeled in an older session, or by hand.
+        with open(self.csv_fn, "a", newline="") as f:
+            csv.writer(f).writerow(("Order", "order", "12", "5", ""))
+        store.add(6, "Judgment", "judgment", docket_id=12)
+        self.assertEqual(store.export_csv(self.csv_fn), 1)
+        with open(self.csv_fn, newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(
+            [row[3] for row in rows], ["1", "2", "3", "2", "6", "5"]
+        )
+        self.assertTrue(store.has(5))
+        self.assertEqual(store.export_csv(self.csv_fn), 0)
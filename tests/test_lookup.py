@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+import numpy as np
+
+from de_classifier.lookup import CachedPredictor, LabelLookup, template
+
+
+class StubModel:
+    classes = ["order", "motion"]
+
+    def __init__(self):
+        self.seen = []
+
+    def predict_proba(self, descriptions):
+        self.seen.extend(descriptions)
+        return np.tile([0.25, 0.75], (len(descriptions), 1))
+
+
+class LookupTest(TestCase):
+    def test_template_masks_variable_spans(self):
+        self.assertEqual(
+            template(
+                "Minute Entry for proceedings held before Judge Lewis A. "
+                "Kaplan: Video-Conference held on 11/25/2024. Associated "
+                "Cases: 1:21-cv-05807-LAK-VF (Mohan, Andrew)"
+            ),
+            "MINUTE ENTRY FOR PROCEEDINGS HELD BEFORE JUDGE <NAME>: "
+            "VIDEO-CONFERENCE HELD ON <DATE>. ASSOCIATED CASES: <CASE> "
+            "(<NAME>)",
+        )
+
+    def test_cached_predictor_only_sends_misses_to_model(self):
+        lookup = LabelLookup()
+        lookup.add(
+            "Minute Entry held before Judge Ann Lee on 1/2/2024", "other"
+        )
+        lookup.add("ORDER of dismissal", "order")
+        lookup.add("Order of Dismissal", "judgment")  # conflicting
+        model = StubModel()
+        predictor = CachedPredictor(model, lookup)
+
+        labels, probabilities, hits = predictor.predict_best(
+            [
+                "Minute Entry held before Judge Bo Chu on 3/4/2025",
+                "ORDER OF DISMISSAL",
+                "MOTION to seal",
+            ]
+        )
+        self.assertEqual(labels, ["other", "motion", "motion"])
+        self.assertEqual(probabilities, [1.0, 0.75, 0.75])
+        self.assertEqual(hits, 1)
+        self.assertEqual(model.seen, ["ORDER OF DISMISSAL", "MOTION to seal"])
+        stats = lookup.stats()
+        self.assertEqual(stats["template_hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+
+    def test_cached_predictor_without_lookup(self):
+        predictor = CachedPredictor(StubModel())
+        self.assertEqual(predictor.predict(["ORDER"]), ["motion"])
+
+    def test_capitalized_docket_words_keep_templates_apart(self):
+        pairs = [
+            (
+                "NOTICE of Attorney Appearance",
+                "NOTICE of Attorney Substitution",
+            ),
+            ("MOTION for Attorney Fees", "MOTION for Attorney Conference"),
+            ("ORDER on Judge Assignment", "ORDER on Judge Reassignment"),
+        ]
+        lookup = LabelLookup()
+        for labeled, other in pairs:
+            self.assertNotEqual(template(labeled), template(other))
+            lookup.add(labeled, "appearance")
+        for _, other in pairs:
+            self.assertIsNone(lookup.get(other))
+        self.assertEqual(
+            template("ORDER on Judge Reassignment"),
+            "ORDER ON JUDGE REASSIGNMENT",
+        )
+        # Whereas names are masked.
+        self.assertEqual(
+            template("ORDER on Judge Ann Lee's calendar"),
+            template("ORDER on Judge Bo Chu's calendar"),
+        )
@@ -0,0 +1,73 @@
+import io
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from de_classifier.classify3 import preprocess
+from de_classifier.dataset import LabeledDataset, Record
+from de_classifier.model import Model, main, train
+from de_classifier.preprocessing import Preprocessor
+from tests.test_evaluate import EXAMPLES
+from tests.test_preprocessing import SuffixLemmatizer
+
+
+def example_model(feature_mode="tfidf"):
+    records = [
+        Record(i, f"{description} {i}", label, None, None)
+        for i, (description, label) in enumerate(EXAMPLES * 3)
+    ]
+    dataset = LabeledDataset.from_chunks([records])
+    preprocessor = Preprocessor(
+        stops=["to", "of", "for"], lemmatizer=SuffixLemmatizer()
+    )
+    preprocess(dataset, workers=1, preprocessor=preprocessor)
+    return train(dataset, preprocessor=preprocessor, feature_mode=feature_mode)
+
+
+class ModelTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "model"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_save_and_lazy_load(self):
+        descriptions = ["MOTION to compel", "ORDER granting", "Unseen words"]
+        for feature_mode in ("tfidf", "hashing"):
+            model = example_model(feature_mode)
+            model.save(self.path)
+
+            loaded = Model.load(self.path)
+            self.assertIsNone(loaded._vectorizer)
+            self.assertIsNone(loaded._classifier)
+            self.assertEqual(loaded.labels, model.labels)
+            self.assertEqual(loaded.features["mode"], feature_mode)
+            # Model.load() gives NLTK's lemmatizer; stand in for it.
+            loaded.preprocessor.lemmatizer = SuffixLemmatizer()
+            self.assertEqual(
+                loaded.preprocessor.config(), model.preprocessor.config()
+            )
+
+            np.testing.assert_allclose(
+                loaded.predict_proba(descriptions),
+                model.predict_proba(descriptions),
+            )
+            self.assertEqual(loaded.classes, model.classes)
+            self.assertEqual(
+                loaded.predict(descriptions)[:2], ["motion", "order"]
+            )
+            self.assertIsInstance(
+                loaded.classifier.feature_log_prob_, np.memmap
+            )
+
+    def test_predict_nothing_from_empty_stdin(self):
+        example_model().save(self.path)
+        with patch("sys.stdin", io.StringIO("")), patch(
+            "sys.stdout", new_callable=io.StringIO
+        ) as stdout:
+            main(["predict", "--model", str(self.path)])
+        self.assertEqual(stdout.getvalue(), "")
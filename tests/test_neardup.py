@@ -0,0 +1,67 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from de_classifier.dataset import Record
+from de_classifier.neardup import NearDuplicateIndex, open_index
+
+MINUTE_ENTRY = (
+    "Minute Entry for proceedings held before Judge Lewis A. Kaplan: "
+    "Status Conference held on 11/25/2024. (Court Reporter Devon Gerber)"
+)
+
+
+class NearDuplicateIndexTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "output3.minhash"
+
+    def test_query_finds_near_duplicates(self):
+        index = NearDuplicateIndex()
+        index.add(MINUTE_ENTRY, "other")
+        index.add("MOTION to Dismiss for Lack of Jurisdiction", "motion")
+
+        label, similarity = index.query(
+            "Minute Entry for proceedings held before Judge Lewis A. Kaplan: "
+            "Status Conference held on 1/2/2025. (Court Reporter Devon Gerber)"
+        )
+        self.assertEqual(label, "other")
+        self.assertEqual(similarity, 1.0)
+        self.assertEqual(
+            index.query("NOTICE of Appearance by counsel"), (None, 0.0)
+        )
+
+    def test_appends_survive_reload(self):
+        records = [Record(1, MINUTE_ENTRY, "other", 10, None)]
+        index = open_index(self.path, [records])
+        index.add("MOTION to Dismiss for Lack of Jurisdiction", "motion")
+        index.add("MOTION to Dismiss for Lack of Jurisdiction", "motion")
+        self.assertEqual(len(index), 2)
+
+        # A torn final append is dropped.
+        with open(self.path, "ab") as f:
+            f.write(b"\x01\x02")
+        reloaded = open_index(self.path, [])
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual(
+            reloaded.query("MOTION to Dismiss for Lack of Jurisdiction"),
+            ("motion", 1.0),
+        )
+        self.assertEqual(len(open_index(self.path, [])), 2)
+
+    def test_capitalized_words_after_titles_count(self):
+        index = NearDuplicateIndex()
+        index.add("NOTICE of Attorney Appearance filed on 1/2/2024", "other")
+        _, similarity = index.query(
+            "NOTICE of Attorney Substitution filed on 3/4/2025"
+        )
+        self.assertLess(similarity, 0.9)
+
+    def test_stale_header_is_rebuilt(self):
+        records = [Record(1, MINUTE_ENTRY, "other", 10, None)]
+        open_index(self.path, [records])
+        with patch("de_classifier.neardup.fingerprint", return_value="0" * 12):
+            self.assertFalse(NearDuplicateIndex(self.path).load())
+        self.assertTrue(NearDuplicateIndex(self.path).load())
@@ -0,0 +1,68 @@
+from unittest import TestCase
+
+from de_classifier.lookup import template
+from de_classifier.normalize import normalize
+
+
+class NormalizeTest(TestCase):
+    def test_replaces_spans_with_placeholders(self):
+        self.assertEqual(
+            normalize(
+                "Minute Entry for proceedings held before Judge Lewis A. "
+                "Kaplan: Conference held on 11/25/2024 at 02:15 PM. "
+                "Associated Cases: 1:21-cv-05807-LAK-VF (Mohan, Andrew)"
+            ),
+            "Minute Entry for proceedings held before Judge xxname: "
+            "Conference held on xxdate at xxtime "
+            "Associated Cases: xxcase (xxname)",
+        )
+        self.assertEqual(
+            normalize(
+                "dial +1 646-453-4442, conference ID: 857 461 522#, "
+                "re: 219 MOTION filed in 21CV5807"
+            ),
+            "dial xxphone, xxconfid, re: xxnum MOTION filed in xxcase",
+        )
+
+    def test_leaves_plain_text_alone(self):
+        text = "MOTION to Dismiss for Lack of Jurisdiction"
+        self.assertEqual(normalize(text), text)
+
+    def test_template_masks_the_same_spans(self):
+        description = (
+            "NOTICE by Ann Lee re 12 Order, filed 3/4/2025 in 1:24-cv-00001 "
+            "(jar)"
+        )
+        self.assertEqual(
+            normalize(description),
+            "NOTICE by Ann Lee re xxnum Order, filed xxdate in xxcase "
+            "(xxname)",
+        )
+        self.assertEqual(
+            template(description),
+            "NOTICE BY ANN LEE RE <NUM> ORDER, FILED <DATE> IN <CASE> "
+            "(<NAME>)",
+        )
+
+    def test_docket_words_after_titles_are_not_names(self):
+        for text in [
+            "MOTION for Attorney Fees",
+            "NOTICE of Attorney Appearance by Ann Lee on behalf of Acme",
+            "Judge Assignment",
+            "Attorney Civil Case Opening",
+            "MOTION for Referral to Magistrate Judge",
+            "Deputy Clerk Certificate of Service",
+            "Counsel Re: Consent to Proceed",
+            "Order in Judge Phillips' Courtroom",
+        ]:
+            self.assertEqual(normalize(text), text)
+
+    def test_names_after_titles(self):
+        self.assertEqual(
+            normalize(
+                "ORDER by Magistrate Judge Jon S Scoles. (Court Reporter "
+                "Ms. Tracie Spore) Judge Otis D. Wright II, as to all"
+            ),
+            "ORDER by Magistrate Judge xxname. (Court Reporter xxname) "
+            "Judge xxname, as to all",
+        )
@@ -0,0 +1,165 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+from de_classifier.labelstore import LabelStore
+from de_classifier.online import OnlineModel, load_online_model
+from de_classifier.preprocessing import Preprocessor
+from tests.test_preprocessing import SuffixLemmatizer
+
+
+class OnlineModelTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "online.joblib"
+        self.preprocessor = Preprocessor(
+            stops=["to", "the"], lemmatizer=SuffixLemmatizer()
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_learns_in_batches_and_checkpoints(self):
+        model = OnlineModel(
+            ["motion", "order", "other"],
+            path=self.path,
+            preprocessor=self.preprocessor,
+            batch_size=4,
+            checkpoint_every=8,
+        )
+        examples = [
+            ("MOTION to dismiss", "motion"),
+            ("ORDER granting motion to dismiss", "order"),
+            ("MOTION to seal", "motion"),
+            ("ORDER denying motion to seal", "order"),
+        ]
+        for description, label in examples[:3]:
+            model.add(description, label)
+        self.assertFalse(model.fitted)
+        model.add(*examples[3])
+        self.assertEqual(model.n_learned, 4)
+        self.assertFalse(self.path.exists())
+
+        model.add("Brand new thing", "not a label")
+        self.assertEqual(model.n_skipped, 1)
+        for description, label in examples:
+            model.add(description, label)
+        self.assertTrue(self.path.exists())
+
+        loaded = OnlineModel.load(self.path, preprocessor=self.preprocessor)
+        self.assertEqual(loaded.n_learned, 8)
+        self.assertEqual(
+            loaded.predict(["MOTION to compel", "ORDER granting"]),
+            ["motion", "order"],
+        )
+        self.assertEqual(loaded.predict_proba(["MOTION"]).shape, (1, 3))
+
+    def test_fast_proba_matches_classifier(self):
+        examples = [
+            ("MOTION to dismiss", "motion"),
+            ("ORDER granting motion to dismiss", "order"),
+            ("NOTICE of appearance", "other"),
+            ("ORDER denying motion to seal", "order"),
+        ]
+        for kind in ("nb", "sgd"):
+            model = OnlineModel(
+                ["motion", "order", "other"],
+                kind=kind,
+                path=self.path,
+                preprocessor=self.preprocessor,
+                batch_size=4,
+            )
+            for description, label in examples:
+                model.add(description, label)
+            X = model.transform(
+                ["MOTION to seal", "ORDER", "Unseen words", ""]
+            )
+            np.testing.assert_allclose(
+                model.predict_proba_features(X),
+                model.classifier.predict_proba(X),
+            )
+            # Refreshed after learning more.
+            for description, label in examples:
+                model.add(description, "other")
+            np.testing.assert_allclose(
+                model.predict_proba_features(X),
+                model.classifier.predict_proba(X),
+            )
+
+    def test_builds_from_store(self):
+        store = LabelStore(Path(self.tmp.name) / "labels.sqlite3")
+        self.addCleanup(store.close)
+        store.add(1, "MOTION to dismiss", "motion")
+        store.add(2, "ORDER granting motion to dismiss", "order")
+        store.add(3, "Unknown", "not a label")
+        labels = ["motion", "order", "other"]
+
+        model = load_online_model(
+            labels, store, path=self.path, preprocessor=self.preprocessor
+        )
+        self.assertEqual((model.n_learned, model.n_skipped), (2, 1))
+        self.assertTrue(self.path.exists())
+        self.assertEqual(model.predict(["MOTION to seal"]), ["motion"])
+
+        # Rebuilt from the store when the labels change.
+        model = load_online_model(
+            labels[:2], store, path=self.path, preprocessor=self.preprocessor
+        )
+        self.assertEqual(model.labels, labels[:2])
+        self.assertEqual(model.n_learned, 2)
+
+    def test_catches_up_with_store_after_crash(self):
+        store = LabelStore(Path(self.tmp.name) / "labels.sqlite3")
+        self.addCleanup(store.close)
+        labels = ["motion", "order", "other"]
+        model = load_online_model(
+            labels,
+            store,
+            path=self.path,
+            preprocessor=self.preprocessor,
+            batch_size=1,
+            checkpoint_every=2,
+        )
+        for de_id, (description, label) in enumerate(
+            [
+                ("MOTION to dismiss", "motion"),
+                ("Unknown", "not a label"),
+                ("ORDER granting motion to dismiss", "order"),
+                ("NOTICE of appearance", "other"),
+            ]
+        ):
+            store.add(de_id, description, label)
+            model.add(description, label)
+        # Checkpointed after the first three; the fourth is lost with it.
+        del model
+
+        model = load_online_model(
+            labels, store, path=self.path, preprocessor=self.preprocessor
+        )
+        self.assertEqual(model.n_learned, 3)
+        self.assertEqual(model.n_rows, 4)
+        self.assertEqual(model.predict(["NOTICE"]), ["other"])
+        self.assertEqual(OnlineModel.load(self.path).n_rows, 4)
+
+    def test_rebuilds_when_preprocessing_changes(self):
+        store = LabelStore(Path(self.tmp.name) / "labels.sqlite3")
+        self.addCleanup(store.close)
+        store.add(1, "MOTION filed 1/2/2024", "motion")
+        labels = ["motion", "other"]
+        load_online_model(
+            labels, store, path=self.path, preprocessor=self.preprocessor
+        )
+        normalizing = Preprocessor(
+            stops=["to", "the"], lemmatizer=SuffixLemmatizer(), normalize=True
+        )
+        with self.assertLogs("de_classifier.online") as logs:
+            model = load_online_model(
+                labels, store, path=self.path, preprocessor=normalizing
+            )
+        self.assertIn("Preprocessing has changed", logs.output[0])
+        self.assertEqual(
+            OnlineModel.load(self.path, preprocessor=normalizing).trained_tag,
+            normalizing.version_tag,
+        )
@@ -0,0 +1,47 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from de_classifier.ppcache import PreprocessCache
+from de_classifier.preprocessing import Preprocessor
+from tests.test_preprocessing import SuffixLemmatizer
+
+
+class PreprocessCacheTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = PreprocessCache(Path(self.tmp.name) / "pp.sqlite3")
+        self.preprocessor = Preprocessor(
+            stops=["the"], lemmatizer=SuffixLemmatizer()
+        )
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_rerun_only_preprocesses_new_rows(self):
+        first = ["Orders of the Court", "Motions"]
+        self.preprocessor.preprocess_descriptions(first, cache=self.cache)
+        pps = self.preprocessor.preprocess_descriptions(
+            first + ["Answers"], cache=self.cache
+        )
+        self.assertEqual(pps, ["order of court", "motion", "answer"])
+        stats = self.cache.stats()
+        self.assertEqual(stats["rows"], 3)
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 3)
+
+    def test_config_change_invalidates(self):
+        self.preprocessor.preprocess_descriptions(
+            ["Orders of the Court"], cache=self.cache
+        )
+        changed = Preprocessor(
+            stops=["the", "of"], lemmatizer=SuffixLemmatizer()
+        )
+        self.assertNotEqual(changed.version_tag, self.preprocessor.version_tag)
+        pps = changed.preprocess_descriptions(
+            ["Orders of the Court"], cache=self.cache
+        )
+        self.assertEqual(pps, ["order court"])
+        self.assertEqual(self.cache.invalidate(changed.version_tag), 1)
+        self.assertEqual(self.cache.stats()["rows"], 1)
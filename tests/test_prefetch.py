@@ -0,0 +1,40 @@
+import threading
+from unittest import TestCase
+
+from de_classifier.prefetch import Prefetcher
+
+
+class PrefetcherTest(TestCase):
+    def test_prefetches_ahead_with_known_labels(self):
+        full = threading.Event()
+
+        def items():
+            for i, description in enumerate(["Order", "Motion", "Answer"]):
+                yield {"id": i, "description": description}
+            full.set()
+
+        prefetcher = Prefetcher(
+            items(),
+            {"ORDER": "order"},
+            skip=lambda item: item["id"] == 1,
+            maxsize=5,
+        ).start()
+        # Everything is fetched before the first item is asked for.
+        self.assertTrue(full.wait(5))
+        self.assertGreaterEqual(prefetcher.ready(), 3)
+        self.assertEqual(
+            [(item["id"], label) for item, label in prefetcher],
+            [(0, "order"), (2, None)],
+        )
+
+    def test_bounded_and_reraises(self):
+        def items():
+            yield from ({"description": str(i)} for i in range(3))
+            raise ConnectionError("down")
+
+        prefetcher = Prefetcher(items(), maxsize=1).start()
+        results = iter(prefetcher)
+        self.assertEqual(next(results)[0], {"description": "0"})
+        self.assertLessEqual(prefetcher.ready(), 1)
+        with self.assertRaises(ConnectionError):
+            list(results)
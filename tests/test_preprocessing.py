@@ -0,0 +1,76 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from de_classifier.preprocessing import Preprocessor
+
+
+class SuffixLemmatizer:
+    """Stand-in for WordNetLemmatizer that just drops a trailing 's'."""
+
+    def lemmatize(self, word):
+        return word[:-1] if word.endswith("s") else word
+
+
+class PreprocessorTest(TestCase):
+    def setUp(self):
+        self.preprocessor = Preprocessor(
+            stops=["the", "for", "of"], lemmatizer=SuffixLemmatizer()
+        )
+
+    def test_preprocess_description(self):
+        """Lowercases, drops stopwords and lemmatizes."""
+        pp = self.preprocessor.preprocess_description(
+            "MOTION for Extension of Time to File Answers"
+        )
+        self.assertEqual(pp, "motion extension time to file answer")
+
+    def test_strip_pattern(self):
+        preprocessor = Preprocessor(
+            stops=[], lemmatizer=SuffixLemmatizer(), strip_pattern="[^a-z]"
+        )
+        self.assertEqual(
+            preprocessor.preprocess_description("Order (Doc. #12)"),
+            "order doc",
+        )
+
+    def test_normalize(self):
+        preprocessor = Preprocessor(
+            stops=["on"], lemmatizer=SuffixLemmatizer(), normalize=True
+        )
+        self.assertEqual(
+            preprocessor.preprocess_description("Orders on 1/2/2024"),
+            "order xxdate",
+        )
+        self.assertNotEqual(
+            preprocessor.version_tag,
+            Preprocessor(
+                stops=["on"], lemmatizer=SuffixLemmatizer()
+            ).version_tag,
+        )
+        # Changing the normalizer's patterns changes the tag too.
+        tag = preprocessor.version_tag
+        with patch.dict(
+            "de_classifier.normalize.PLACEHOLDERS", {"date": "xxday"}
+        ):
+            self.assertNotEqual(preprocessor.version_tag, tag)
+
+    def test_batch_keeps_order_and_caches_lemmas(self):
+        descriptions = ["Orders", "Motions", "Orders", "motions to seal"]
+        self.assertEqual(
+            self.preprocessor.preprocess_descriptions(descriptions),
+            ["order", "motion", "order", "motion to seal"],
+        )
+        info = self.preprocessor.cache_info()
+        self.assertEqual(info.misses, 4)
+        self.assertEqual(info.hits, 1)
+
+    def test_parallel_matches_serial(self):
+        descriptions = [f"Motions {n} for the Orders" for n in range(50)]
+        descriptions += descriptions[:10]
+        with patch("de_classifier.preprocessing.PARALLEL_MIN", 0):
+            parallel = self.preprocessor.preprocess_descriptions(
+                descriptions, workers=2, chunk_size=7
+            )
+        self.assertEqual(
+            parallel, self.preprocessor.preprocess_descriptions(descriptions)
+        )
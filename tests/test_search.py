@@ -0,0 +1,40 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from de_classifier.search import search, vectorizer_configs
+from tests.test_evaluate import example_dataset
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.dataset = example_dataset()
+
+    def test_leaderboard_and_feature_cache(self):
+        configs = vectorizer_configs(
+            {"ngram_range": [(1, 1), (1, 2)], "min_df": [1]}
+        )
+        train, test = self.dataset.split(seed=0)
+        with tempfile.TemporaryDirectory() as tmp:
+            results, skipped = search(
+                self.dataset,
+                train,
+                test,
+                "test",
+                configs=configs,
+                classifiers=("nb", "lr"),
+                workers=2,
+                cache_dir=tmp,
+            )
+            self.assertEqual(len(list(Path(tmp).glob("*.json"))), 2)
+
+        self.assertEqual(skipped, 0)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(
+            {(r["classifier"], r["ngram_range"]) for r in results},
+            {("nb", (1, 1)), ("nb", (1, 2)), ("lr", (1, 1)), ("lr", (1, 2))},
+        )
+        accuracies = [r["accuracy"] for r in results]
+        self.assertEqual(accuracies, sorted(accuracies, reverse=True))
+        for result in results:
+            self.assertGreater(result["predict_us"], 0)
@@ -0,0 +1,53 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from de_classifier.online import OnlineModel
+from de_classifier.preprocessing import Preprocessor
+from de_classifier.suggest import Suggester, format_suggestions
+from tests.test_preprocessing import SuffixLemmatizer
+
+
+class SuggesterTest(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.model = OnlineModel(
+            ["motion", "order", "notice", "other"],
+            path=Path(tmp.name) / "online.joblib",
+            preprocessor=Preprocessor(
+                stops=["to", "the", "of"], lemmatizer=SuffixLemmatizer()
+            ),
+            batch_size=1,
+        )
+
+    def test_suggests_nothing_before_learning(self):
+        suggester = Suggester(self.model).warm_up()
+        self.assertEqual(suggester.suggest("MOTION to dismiss"), [])
+        suggester.record([], "motion")
+        self.assertEqual(suggester.summary()["suggested"], 0)
+
+    def test_top_suggestions_and_acceptance(self):
+        for description, label in [
+            ("MOTION to dismiss", "motion"),
+            ("MOTION to compel discovery", "motion"),
+            ("ORDER granting motion to dismiss", "order"),
+            ("NOTICE of appearance", "notice"),
+        ]:
+            self.model.add(description, label)
+        suggester = Suggester(self.model).warm_up()
+
+        suggestions = suggester.suggest("MOTION to seal")
+        self.assertEqual(len(suggestions), 3)
+        self.assertEqual(suggestions[0][0], "motion")
+        probabilities = [p for _, p in suggestions]
+        self.assertEqual(probabilities, sorted(probabilities, reverse=True))
+        self.assertIn("motion ", format_suggestions(suggestions))
+
+        suggester.record(suggestions, "motion")
+        suggester.record(suggester.suggest("NOTICE of filing"), "other")
+        summary = suggester.summary()
+        self.assertEqual(summary["suggested"], 2)
+        self.assertEqual(summary["acceptance_rate"], 0.5)
+        self.assertEqual(len(suggester.latencies_ms), 2)
+        self.assertLess(summary["latency_max_ms"], 1000)